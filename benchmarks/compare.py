@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Compare two benchmark result files written by ``run.py``.
+Exits with a non-zero status when a benchmark regressed.
+"""
+import sys
+import json
+import argparse
+
+
+def compare(baseline, current, threshold):
+    """
+    Compare the median timings of the benchmarks in both results.
+
+    :returns:
+        A list of ``(name, baseline, current, ratio, regressed)`` tuples.
+    """
+    rows = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        before = baseline['results'][name]['median']
+        after = current['results'][name]['median']
+        ratio = after / before if before else float('inf')
+        rows.append((name, before, after, ratio, ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('baseline', type=argparse.FileType('r'))
+    parser.add_argument('current', type=argparse.FileType('r'))
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=1.2,
+        help='The slowdown ratio counted as a regression, defaults to 1.2.')
+    args = parser.parse_args(argv)
+
+    baseline = json.load(args.baseline)
+    current = json.load(args.current)
+    print '%-20s %12s %12s %8s' % ('benchmark', 'baseline', 'current', 'ratio')
+    regressions = 0
+    for name, before, after, ratio, regressed in compare(
+            baseline, current, args.threshold):
+        print '%-20s %11.4fs %11.4fs %7.2fx%s' % (
+            name, before, after, ratio, ' REGRESSED' if regressed else '')
+        regressions += regressed
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+import os
+import json
+import random
+
+from requests.models import Response
+
+from elasticsearch import Transport
+from elasticutils import get_es
+
+from elasticgit.localindex import LocalIndexManager
+from elasticgit.search import ESManager
+from elasticgit.storage import RemoteStorageManager
+from elasticgit.tests.base import TestPerson, TestPage
+from elasticgit.utils import fqcn
+from elasticgit.workspace import EG, RemoteWorkspace
+
+
+WORDS = (
+    'alpha bravo charlie delta echo foxtrot golf hotel india juliet '
+    'kilo lima mike november oscar papa quebec romeo sierra tango').split()
+
+LANGUAGES = ('eng_GB', 'swa_KE', 'fre_FR', 'por_PT')
+
+
+def mk_person(rand):
+    return TestPerson({
+        'age': rand.randint(1, 99),
+        'name': ' '.join(rand.sample(WORDS, 2)).title(),
+    })
+
+
+def mk_page(rand):
+    title = ' '.join(rand.sample(WORDS, 4))
+    return TestPage({
+        'title': title.title(),
+        'slug': title.replace(' ', '-'),
+        'language': rand.choice(LANGUAGES),
+    })
+
+
+def mk_models(size, seed=0):
+    """
+    Generate ``size`` people and ``size`` pages, reproducibly.
+    """
+    rand = random.Random(seed)
+    return ([mk_person(rand) for _ in range(size)] +
+            [mk_page(rand) for _ in range(size)])
+
+
+def mk_workspace(workdir, name):
+    """
+    Create an empty workspace backed by the local index, which stands
+    in for Elasticsearch so the benchmarks can run offline.
+    """
+    workspace = EG.local_workspace(
+        os.path.join(workdir, name), index_prefix=name)
+    workspace.repo.index.commit('Initial Commit')
+    workspace.setup('Bench Mark', 'bench@example.org')
+    return workspace
+
+
+def clone_workspace(workspace, workdir, name):
+    """
+    Clone a workspace, with the original as the ``origin`` remote.
+    """
+    EG.clone_repo(workspace.working_dir, os.path.join(workdir, name))
+    clone = EG.local_workspace(
+        os.path.join(workdir, name), index_prefix=name)
+    clone.setup('Bench Mark', 'bench@example.org')
+    return clone
+
+
+def populate(workspace, models):
+    for model in models:
+        workspace.save(model, 'Saving %s' % (model.uuid,))
+    workspace.refresh_index()
+    return models
+
+
+class FakeDistributeServer(object):
+    """
+    Answers the requests a :py:class:`RemoteStorageManager` makes to a
+    unicore.distribute server from a local workspace.
+
+    :param elasticgit.workspace.Workspace workspace:
+        The workspace to serve.
+    """
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.changes = []
+        self.requests = 0
+        self.model_classes = dict(
+            (fqcn(model_class), model_class)
+            for model_class in (TestPerson, TestPage))
+
+    def respond(self, data, status_code=200):
+        response = Response()
+        response.status_code = status_code
+        response._content = json.dumps(data)
+        return response
+
+    def __call__(self, method, url, **kwargs):
+        self.requests += 1
+        path, _, query = url.partition('?')
+        sm = self.workspace.sm
+        parent, name = path.rsplit('/', 2)[-2:]
+        name, _, suffix = name.rpartition('.')
+
+        if method == 'POST':
+            changes, self.changes = self.changes, []
+            return self.respond(changes)
+
+        if parent in self.model_classes:
+            # /repos/<repo>/<fqcn>/<uuid>.json
+            return self.respond(
+                dict(sm.get(self.model_classes[parent], name)))
+
+        if name in self.model_classes:
+            # /repos/<repo>/<fqcn>.json
+            return self.respond([
+                dict(model)
+                for model in sm.iterate(self.model_classes[name])])
+
+        return self.respond({
+            'branch': sm.active_branch(),
+            'commit': sm.head_sha(),
+        })
+
+    def queue_changes(self, models):
+        """
+        Queue the models to be reported as added by the next pull.
+        """
+        self.changes.extend([{
+            'type': 'A',
+            'path': self.workspace.sm.git_name(model),
+        } for model in models])
+
+
+class FakeRemoteStorageManager(RemoteStorageManager):
+
+    def __init__(self, repo_url, server, private_dir):
+        super(FakeRemoteStorageManager, self).__init__(repo_url)
+        self.server = server
+        self.private_dir = private_dir
+
+    def mk_request(self, *args, **kwargs):
+        return self.server(*args, **kwargs)
+
+    def private_path(self, *parts):
+        return os.path.join(self.private_dir, *parts)
+
+
+def mk_remote_workspace(workdir, name, server):
+    """
+    Create a :py:class:`RemoteWorkspace` talking to a
+    :py:class:`FakeDistributeServer` and indexing into a local index.
+    """
+    url = 'http://localhost/repos/%s.json' % (name,)
+    workspace = RemoteWorkspace(url, es={'urls': ['http://localhost']})
+    workspace.sm = FakeRemoteStorageManager(
+        url, server, os.path.join(workdir, name))
+    workspace.im = LocalIndexManager(workspace.sm, name)
+    workspace.im.create_index(workspace.sm.active_branch())
+    return workspace
+
+
+class FakeTransport(Transport):
+    """
+    Answers the requests of an :py:class:`elasticsearch.Elasticsearch`
+    client without a server. Searches return the documents given with
+    :py:meth:`set_documents`, as hits of the mapping type searched,
+    everything else returns an empty response.
+    """
+
+    documents = {}
+
+    def bulk(self, body):
+        lines = [line for line in body.splitlines() if line.strip()]
+        items = []
+        for line in lines[::2]:
+            [(action, meta)] = json.loads(line).items()
+            items.append({action: {
+                '_index': meta.get('_index'),
+                '_type': meta.get('_type'),
+                '_id': meta.get('_id'),
+                'status': 201,
+            }})
+        return {'took': 1, 'errors': False, 'items': items}
+
+    def set_documents(self, documents):
+        self.documents = documents
+
+    def perform_request(self, method, url, params=None, body=None):
+        parts = url.strip('/').split('/')
+        if parts[-1] == '_bulk':
+            return 200, self.bulk(body)
+        if parts[-1] != '_search':
+            return 200, {}
+
+        index, doc_type = parts[0], parts[1] if len(parts) > 2 else ''
+        size = (body or {}).get('size', 10)
+        documents = self.documents.get(doc_type, [])
+        return 200, {
+            'took': 1,
+            'timed_out': False,
+            'hits': {
+                'total': len(documents),
+                'max_score': 1.0,
+                'hits': [{
+                    '_index': index,
+                    '_type': doc_type,
+                    '_id': document['uuid'],
+                    '_score': 1.0,
+                    '_source': document,
+                } for document in documents[:size]],
+            },
+        }
+
+
+#: The settings of the Elasticsearch client answered by
+#: :py:class:`FakeTransport`. ``S(...).es(**FAKE_ES_SETTINGS)`` searches
+#: with the client of :py:func:`mk_es_manager` since elasticutils
+#: reuses clients created with the same settings.
+FAKE_ES_SETTINGS = {
+    'urls': ['localhost'],
+    'transport_class': FakeTransport,
+}
+
+
+def mk_es_manager(workspace, models):
+    """
+    Create an :py:class:`ESManager` for a workspace's storage manager
+    with an Elasticsearch client answered by :py:class:`FakeTransport`,
+    searches of it return the given models.
+    """
+    es = get_es(**FAKE_ES_SETTINGS)
+    im = ESManager(workspace.sm, es, workspace.index_prefix)
+    documents = {}
+    for model in models:
+        mapping_type = im.get_mapping_type(model.__class__)
+        documents.setdefault(
+            mapping_type.get_mapping_type_name(), []).append(
+                mapping_type.extract_document(model.uuid, model))
+    es.transport.set_documents(documents)
+    return im
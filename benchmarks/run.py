@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Run the benchmarks and write the results as JSON, see ``README.rst``.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))))
+
+import suite  # noqa
+
+
+def git_describe():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) / 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def measure(benchmark, repeat):
+    timings = []
+    ops = 0
+    for _ in range(repeat):
+        benchmark.setup()
+        start = time.time()
+        ops = benchmark.run()
+        timings.append(time.time() - start)
+    return {
+        'repeat': repeat,
+        'ops': ops,
+        'min': min(timings),
+        'max': max(timings),
+        'mean': sum(timings) / len(timings),
+        'median': median(timings),
+        'ops_per_second': ops / median(timings) if median(timings) else None,
+    }
+
+
+def run(names, size, repeat, workdir):
+    env = suite.Environment(workdir, size)
+    results = {}
+    for benchmark_class in suite.get_benchmarks(names):
+        sys.stderr.write('%s... ' % (benchmark_class.name,))
+        result = measure(benchmark_class(env), repeat)
+        sys.stderr.write('%.4fs\n' % (result['median'],))
+        results[benchmark_class.name] = result
+    return {
+        'meta': {
+            'commit': git_describe(),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'size': size,
+            'repeat': repeat,
+            'timestamp': time.time(),
+        },
+        'results': results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        'benchmarks', nargs='*', metavar='benchmark',
+        help='The benchmarks to run, defaults to all of them: %s.' % (
+            ', '.join(b.name for b in suite.BENCHMARKS),))
+    parser.add_argument(
+        '-s', '--size', type=int, default=100,
+        help='The number of people & pages in the repositories.')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=3,
+        help='The number of times to run every benchmark.')
+    parser.add_argument(
+        '-o', '--output', type=argparse.FileType('w'), default=sys.stdout,
+        help='Where to write the JSON results, defaults to stdout.')
+    parser.add_argument(
+        '-w', '--workdir',
+        help='Where to create the repositories, defaults to a '
+             'temporary directory that is removed afterwards.')
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='eg-bench-')
+    try:
+        results = run(args.benchmarks, args.size, args.repeat, workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir)
+    json.dump(results, args.output, indent=2, sort_keys=True)
+    args.output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+import os
+import sys
+import subprocess
+
+from elasticgit import search
+from elasticgit.tests.base import TestPerson, TestPage
+
+import fixtures
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = []
+
+
+def register(benchmark_class):
+    BENCHMARKS.append(benchmark_class)
+    return benchmark_class
+
+
+class Environment(object):
+    """
+    The fixtures shared by the benchmarks of a run. Repositories are
+    created lazily and reused between benchmarks that do not change them.
+
+    :param str workdir:
+        The directory to create the repositories in.
+    :param int size:
+        The number of people and of pages in the repositories.
+    """
+
+    def __init__(self, workdir, size):
+        self.workdir = workdir
+        self.size = size
+        self.counter = 0
+        self._populated = None
+
+    def mk_workspace(self, prefix):
+        self.counter += 1
+        return fixtures.mk_workspace(
+            self.workdir, '%s-%s' % (prefix, self.counter))
+
+    def mk_models(self, size=None):
+        self.counter += 1
+        return fixtures.mk_models(size or self.size, seed=self.counter)
+
+    @property
+    def populated(self):
+        """
+        A workspace with ``size`` people and pages, not to be changed.
+        """
+        if self._populated is None:
+            workspace = self.mk_workspace('populated')
+            models = fixtures.populate(workspace, self.mk_models())
+            self._populated = (workspace, models)
+        return self._populated
+
+
+class Benchmark(object):
+    """
+    A benchmark, :py:meth:`setup` is called before every timed call
+    of :py:meth:`run`.
+    """
+
+    name = None
+
+    def __init__(self, env):
+        self.env = env
+
+    def setup(self):
+        pass
+
+    def run(self):
+        """
+        The code being timed.
+
+        :returns: int, the number of operations performed.
+        """
+        raise NotImplementedError()
+
+
+@register
+class Save(Benchmark):
+    name = 'save'
+
+    def setup(self):
+        self.workspace = self.env.mk_workspace('save')
+        self.models = self.env.mk_models()
+
+    def run(self):
+        for model in self.models:
+            self.workspace.save(model, 'Saving %s' % (model.uuid,))
+        return len(self.models)
+
+
+@register
+class Get(Benchmark):
+    name = 'get'
+
+    def run(self):
+        workspace, models = self.env.populated
+        for model in models:
+            workspace.sm.get(model.__class__, model.uuid)
+        return len(models)
+
+
+@register
+class Iterate(Benchmark):
+    name = 'iterate'
+
+    def run(self):
+        workspace, models = self.env.populated
+        return (len(list(workspace.sm.iterate(TestPerson))) +
+                len(list(workspace.sm.iterate(TestPage))))
+
+
+@register
+class IterateOnly(Benchmark):
+    name = 'iterate_only'
+
+    def run(self):
+        workspace, models = self.env.populated
+        return len(list(workspace.sm.iterate(TestPerson, only=['age'])))
+
+
+@register
+class Reindex(Benchmark):
+    name = 'reindex'
+
+    def run(self):
+        workspace, models = self.env.populated
+        return (len(workspace.reindex(TestPerson)) +
+                len(workspace.reindex(TestPage)))
+
+
+@register
+class Sync(Benchmark):
+    name = 'sync'
+
+    def run(self):
+        workspace, models = self.env.populated
+        reindexed, removed = workspace.sync(TestPerson)
+        return len(reindexed)
+
+
+@register
+class GetMappingType(Benchmark):
+    name = 'get_mapping_type'
+
+    def run(self):
+        workspace, models = self.env.populated
+        for _ in range(1000):
+            workspace.im.get_mapping_type(TestPerson)
+        return 1000
+
+
+@register
+class Search(Benchmark):
+    name = 'search'
+
+    def run(self):
+        workspace, models = self.env.populated
+        S = workspace.S
+        S(TestPerson).count()
+        S(TestPerson).filter(age__gte=50).count()
+        S(TestPerson).query(name__match='alpha').order_by('-age')[:10]
+        len(S(TestPage).filter(language='eng_GB').everything())
+        list(S(TestPage).filter(language='swa_KE').only('slug')[:20])
+        return 5
+
+
+@register
+class ESGetMappingType(Benchmark):
+    name = 'es_get_mapping_type'
+
+    def setup(self):
+        workspace, models = self.env.populated
+        self.im = fixtures.mk_es_manager(workspace, models)
+
+    def run(self):
+        for _ in range(1000):
+            self.im.get_mapping_type(TestPerson)
+        return 1000
+
+
+@register
+class ESSearch(ESGetMappingType):
+    name = 'es_search'
+
+    def run(self):
+        def S(model_class):
+            return search.S(self.im.get_mapping_type(model_class)).es(
+                **fixtures.FAKE_ES_SETTINGS)
+
+        S(TestPerson).count()
+        S(TestPerson).filter(age__gte=50).count()
+        list(S(TestPerson).query(name__match='alpha').order_by('-age')[:10])
+        len(S(TestPage).filter(language='eng_GB').everything())
+        [hit.to_object()
+         for hit in S(TestPage).filter(language='swa_KE').only('slug')[:20]]
+        return 5
+
+
+@register
+class ESBulkIndex(ESGetMappingType):
+    name = 'es_bulk_index'
+
+    def run(self):
+        workspace, models = self.env.populated
+        people = [model for model in models if isinstance(model, TestPerson)]
+        self.im.bulk_index(TestPerson, people)
+        return len(people)
+
+
+@register
+class Pull(Benchmark):
+    name = 'pull'
+
+    def setup(self):
+        self.upstream = self.env.mk_workspace('upstream')
+        self.env.counter += 1
+        self.workspace = fixtures.clone_workspace(
+            self.upstream, self.env.workdir, 'pull-%s' % (self.env.counter,))
+        self.models = fixtures.populate(
+            self.upstream, self.env.mk_models(max(self.env.size / 10, 1)))
+
+    def run(self):
+        self.workspace.pull()
+        return len(self.models)
+
+
+@register
+class IndexDiff(Pull):
+    name = 'index_diff'
+
+    def setup(self):
+        super(IndexDiff, self).setup()
+        self.changes = self.workspace.sm.pull()
+
+    def run(self):
+        self.workspace.index_diff(self.changes)
+        return len(self.models)
+
+
+@register
+class RemotePull(Benchmark):
+    name = 'remote_pull'
+
+    def setup(self):
+        workspace, models = self.env.populated
+        self.server = fixtures.FakeDistributeServer(workspace)
+        self.env.counter += 1
+        self.workspace = fixtures.mk_remote_workspace(
+            self.env.workdir, 'remote-%s' % (self.env.counter,),
+            self.server)
+        self.models = models[:max(len(models) / 10, 1)]
+        self.server.queue_changes(self.models)
+
+    def run(self):
+        self.workspace.pull()
+        return len(self.models)
+
+
+@register
+class ImportTime(Benchmark):
+    name = 'import'
+
+    def run(self):
+        for _ in range(5):
+            subprocess.check_call(
+                [sys.executable, '-c', 'import elasticgit.models'],
+                cwd=ROOT)
+        return 5
+
+
+def get_benchmarks(names=None):
+    if not names:
+        return list(BENCHMARKS)
+    known = dict((benchmark.name, benchmark) for benchmark in BENCHMARKS)
+    unknown = set(names) - set(known)
+    if unknown:
+        raise ValueError('Unknown benchmarks: %s' % (
+            ', '.join(sorted(unknown)),))
+    return [known[name] for name in names]
@@ -1,6 +1,44 @@
-import pkg_resources
+import sys
+import types
 
-from elasticgit.workspace import EG, F, Q
+from elasticgit.utils import package_version
 
+
+#: The names that are only imported from :py:mod:`elasticgit.workspace`
+#: when they are first looked up.
+LAZY_ATTRIBUTES = ('EG', 'F', 'Q')
+
+
+class _LazyModule(types.ModuleType):
+    """
+    The ``elasticgit`` package module, which imports the objects named
+    in :py:data:`LAZY_ATTRIBUTES` when they are first looked up and then
+    keeps them like any other attribute.
+    """
+
+    def __getattr__(self, name):
+        if name not in LAZY_ATTRIBUTES:
+            raise AttributeError(
+                "'module' object has no attribute %r" % (name,))
+        module = __import__('elasticgit.workspace', None, None, [name])
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__.keys()) | set(LAZY_ATTRIBUTES))
+
+
+# NOTE: Importing the workspace pulls in GitPython, elasticutils,
+#       elasticsearch, requests & unidecode. It is only imported when
+#       EG, F or Q are first looked up, to keep short lived processes
+#       quick to start. Python 2 modules can not have a __getattr__ so
+#       the package module is swapped for a _LazyModule, the original
+#       is kept because Python 2 clears a collected module's globals.
 __all__ = ['EG', 'F', 'Q']
-__version__ = pkg_resources.require('elastic-git')[0].version
+__version__ = package_version()
+
+_module = _LazyModule(__name__, __doc__)
+_module.__dict__.update(sys.modules[__name__].__dict__)
+_module._original_module = sys.modules[__name__]
+sys.modules[__name__] = _module
@@ -0,0 +1,179 @@
+import json
+import hashlib
+import threading
+
+from collections import OrderedDict
+
+
+class LRUCacheBackend(object):
+    """
+    An in-process, thread safe, least recently used cache backend
+    for :py:class:`QueryCache`.
+
+    :param int max_size:
+        The maximum number of entries to keep.
+
+    >>> from elasticgit.cache import LRUCacheBackend
+    >>> backend = LRUCacheBackend(max_size=2)
+    >>> backend.set('a', '1')
+    >>> backend.set('b', '2')
+    >>> backend.get('a')
+    '1'
+    >>> backend.set('c', '3')
+    >>> backend.get('b') is None
+    True
+    >>>
+
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.pop(key, None)
+            if value is not None:
+                self.data[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = value
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+class ClientCacheBackend(object):
+    """
+    A cache backend for :py:class:`QueryCache` that is shared between
+    processes by delegating to a client object with memcache or redis
+    style ``get(key)`` and ``set(key, value)`` methods.
+
+    Keys are namespaced with a generation number stored in the cache
+    too, :py:func:`clear` moves on to the next generation rather than
+    deleting the entries, which the cache then evicts. Every lookup
+    reads the generation first, so a clear in one process is seen by
+    all of them.
+
+    :param object client:
+        The cache client.
+    :param str key_prefix:
+        The prefix to namespace the keys with.
+    """
+
+    def __init__(self, client, key_prefix='elasticgit:'):
+        self.client = client
+        self.key_prefix = key_prefix
+        self.generation_key = '%sgeneration' % (key_prefix,)
+
+    def make_key(self, key):
+        return '%s%s:%s' % (
+            self.key_prefix, self.client.get(self.generation_key) or 0, key)
+
+    def get(self, key):
+        return self.client.get(self.make_key(key))
+
+    def set(self, key, value):
+        self.client.set(self.make_key(key), value)
+
+    def clear(self):
+        incr = getattr(self.client, 'incr', None)
+        # NOTE: memcache's incr returns None for a missing key,
+        #       redis' starts it at 0.
+        if incr is None or incr(self.generation_key) is None:
+            self.client.set(
+                self.generation_key,
+                int(self.client.get(self.generation_key) or 0) + 1)
+
+
+class QueryCache(object):
+    """
+    A cache for Elasticsearch query results. Results are keyed on the
+    query body and on the SHA of the commit each queried index reflects,
+    so the entries are invalidated as soon as a save, delete or pull
+    moves the repository on. Searches of an index that may not show
+    recent writes yet are not cached, see
+    :py:func:`elasticgit.search.ESManager.index_version`.
+
+    :param backend:
+        A :py:class:`LRUCacheBackend` or :py:class:`ClientCacheBackend`,
+        defaults to an :py:class:`LRUCacheBackend`.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend or LRUCacheBackend()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def make_key(self, search, indexes, doctypes, versions):
+        """
+        Generate a cache key for a query.
+
+        :param dict search:
+            The query body sent to Elasticsearch.
+        :param list indexes:
+            The indexes being queried.
+        :param list doctypes:
+            The doctypes being queried.
+        :param dict versions:
+            A mapping of index names to the commit SHA they reflect.
+        :returns: str
+        """
+        return hashlib.sha1(json.dumps({
+            'search': search,
+            'indexes': indexes,
+            'doctypes': doctypes,
+            'versions': versions,
+        }, sort_keys=True)).hexdigest()
+
+    def get_or_search(self, key, search):
+        """
+        Return the cached response for ``key`` or call ``search``
+        and cache its response.
+
+        :param str key:
+        :param callable search:
+        :returns: dict
+        """
+        cached = self.backend.get(key)
+        if cached is not None:
+            with self.lock:
+                self.hits += 1
+            return json.loads(cached)
+
+        with self.lock:
+            self.misses += 1
+        response = search()
+        self.backend.set(key, json.dumps(response))
+        return response
+
+    def stats(self):
+        """
+        Return the hit & miss counts and the hit rate.
+
+        :returns: dict
+        """
+        with self.lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': float(hits) / total if total else 0.0,
+        }
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+
+    def clear(self):
+        self.backend.clear()
@@ -0,0 +1,300 @@
+import os
+import json
+import uuid
+import errno
+import socket
+
+from elasticgit.layout import parse_path
+
+
+class NullChangeFeed(object):
+    """
+    The default change feed, which publishes nothing.
+
+    >>> from elasticgit.changes import NullChangeFeed
+    >>> NullChangeFeed().publish([{'uuid': 'foo'}])
+    >>>
+
+    """
+
+    def publish(self, changes):
+        pass
+
+
+#: The shared no-op change feed used when none is configured.
+NULL_CHANGE_FEED = NullChangeFeed()
+
+
+def make_change(repo_path, old_sha, new_sha, commit):
+    """
+    Return the change event for a file or ``None`` if the file is not
+    a model instance's.
+
+    >>> from elasticgit.changes import make_change
+    >>> change = make_change('foo/Bar/abcdef.json', None, 'a' * 40, 'b' * 40)
+    >>> change['model'], change['uuid'], change['old_sha']
+    ('foo.Bar', 'abcdef', None)
+    >>> make_change('README.md', None, 'a' * 40, 'b' * 40)
+    >>>
+
+    :param str repo_path:
+        The path of the file in the repository.
+    :param str old_sha:
+        The SHA of the blob before the change, ``None`` if it was added.
+    :param str new_sha:
+        The SHA of the blob after the change, ``None`` if it was deleted.
+    :param str commit:
+        The SHA of the commit the change was made in.
+    :returns: dict
+    """
+    info = parse_path(repo_path)
+    if info is None:
+        return None
+    class_path, uuid = info
+    return {
+        'model': class_path,
+        'uuid': uuid,
+        'path': repo_path,
+        'old_sha': old_sha,
+        'new_sha': new_sha,
+        'commit': commit,
+    }
+
+
+def diff_changes(diff_index, commit):
+    """
+    Return the change events for a :py:class:`git.diff.DiffIndex`.
+
+    :param git.diff.DiffIndex diff_index:
+    :param str commit:
+        The SHA of the commit the diff leads to.
+    :returns: list
+    """
+    changes = []
+    for diff in diff_index:
+        a_path = diff.a_blob.path if diff.a_blob else None
+        b_path = diff.b_blob.path if diff.b_blob else None
+        a_sha = diff.a_blob.hexsha if diff.a_blob else None
+        b_sha = diff.b_blob.hexsha if diff.b_blob else None
+        if a_path == b_path:
+            changes.append(make_change(a_path, a_sha, b_sha, commit))
+            continue
+        # NOTE: a rename, the object is gone from one path and added at
+        #       the other.
+        if a_path is not None:
+            changes.append(make_change(a_path, a_sha, None, commit))
+        if b_path is not None:
+            changes.append(make_change(b_path, None, b_sha, commit))
+    return filter(None, changes)
+
+
+class ChangeFeed(object):
+    """
+    Publishes the objects changed by a workspace's saves, deletes and
+    pulls to the subscribed callbacks, so caches built on top of a
+    workspace can drop exactly the entries that went stale. Each callback
+    is called with a list of changes, dictionaries with the ``model``
+    class path, the object's ``uuid`` and ``path``, the ``old_sha`` and
+    ``new_sha`` of its blob, ``None`` when it was added or deleted, and
+    the ``commit`` SHA.
+
+    Changes are also sent to the transports, through which the change
+    feeds of other processes receive them when :py:func:`poll` is called.
+
+    >>> from elasticgit.changes import ChangeFeed
+    >>> feed = ChangeFeed()
+    >>> @feed.subscribe
+    ... def callback(changes):
+    ...     print [change['uuid'] for change in changes]
+    ...
+    >>> feed.publish([{'uuid': 'foo'}])
+    ['foo']
+    >>>
+
+    :param list callbacks:
+        The callbacks to subscribe.
+    :param list transports:
+        :py:class:`FileTransport` or :py:class:`UnixSocketTransport`
+        instances.
+    """
+
+    def __init__(self, callbacks=(), transports=()):
+        self.callbacks = list(callbacks)
+        self.transports = list(transports)
+        self.source = uuid.uuid4().hex
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def dispatch(self, changes):
+        for callback in self.callbacks:
+            callback(changes)
+
+    def publish(self, changes):
+        """
+        Call the subscribed callbacks with the changes and send them to
+        the transports.
+
+        :param list changes:
+        """
+        if not changes:
+            return
+        self.dispatch(changes)
+        for transport in self.transports:
+            transport.send(self.source, changes)
+
+    def poll(self):
+        """
+        Call the subscribed callbacks with the changes other processes
+        published since the last poll.
+
+        :returns:
+            The number of changes received.
+        """
+        count = 0
+        for transport in self.transports:
+            for source, changes in transport.receive():
+                if source == self.source:
+                    continue
+                self.dispatch(changes)
+                count += len(changes)
+        return count
+
+
+class FileTransport(object):
+    """
+    A transport appending changes to a file as JSON lines, which every
+    process reads on from where it was when it started.
+
+    :param str path:
+        The file to write to and read from.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            self.offset = os.path.getsize(path)
+        except OSError:
+            self.offset = 0
+
+    def send(self, source, changes):
+        line = '%s\n' % (json.dumps({'source': source, 'changes': changes}),)
+        # NOTE: a single write to a file opened for appending, so
+        #       concurrent writers do not interleave.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def receive(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # NOTE: the file was truncated, start over.
+            self.offset = 0
+        if size == self.offset:
+            return []
+
+        with open(self.path, 'r') as fp:
+            fp.seek(self.offset)
+            data = fp.read(size - self.offset)
+        # NOTE: leave a partially written last line for the next read.
+        data = data[:data.rfind('\n') + 1]
+        self.offset += len(data)
+        messages = map(json.loads, filter(None, data.split('\n')))
+        return [(message['source'], message['changes'])
+                for message in messages]
+
+
+class UnixSocketTransport(object):
+    """
+    A transport sending changes as datagrams to the Unix sockets in a
+    directory, one for every listening process. Writers never wait for
+    readers, changes for a process whose socket buffer is full are
+    dropped.
+
+    :param str directory:
+        The directory the sockets are in.
+    :param int batch_size:
+        The maximum number of changes to send in one datagram.
+    """
+
+    def __init__(self, directory, batch_size=100):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.sock = None
+        self.sock_path = None
+
+    def listen(self):
+        """
+        Bind a socket in the directory to receive changes from other
+        processes on.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        self.sock_path = os.path.join(
+            self.directory, '%s-%s.sock' % (os.getpid(), uuid.uuid4().hex))
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        self.sock.bind(self.sock_path)
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            os.remove(self.sock_path)
+            self.sock = self.sock_path = None
+
+    def peers(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith('.sock')]
+
+    def send(self, source, changes):
+        datagrams = [
+            json.dumps({
+                'source': source,
+                'changes': changes[i:i + self.batch_size],
+            }) for i in range(0, len(changes), self.batch_size)]
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.setblocking(False)
+        try:
+            for peer in self.peers():
+                try:
+                    for datagram in datagrams:
+                        sock.sendto(datagram, peer)
+                except socket.error as e:
+                    if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        continue
+                    if e.errno not in (errno.ECONNREFUSED, errno.ENOENT):
+                        raise
+                    # NOTE: a process exited without closing its socket.
+                    try:
+                        os.remove(peer)
+                    except OSError:
+                        pass
+        finally:
+            sock.close()
+
+    def receive(self):
+        if self.sock is None:
+            return []
+        messages = []
+        while True:
+            try:
+                datagram = self.sock.recv(1024 * 1024)
+            except socket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+                raise
+            message = json.loads(datagram)
+            messages.append((message['source'], message['changes']))
+        return messages
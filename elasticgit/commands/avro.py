@@ -1,16 +1,17 @@
 from __future__ import absolute_import
 
-from jinja2 import Environment, PackageLoader
 from functools import partial
 import argparse
+import hashlib
 import imp
 import json
+import marshal
+import os
 import pprint
+import stat
 
 from datetime import datetime
 
-import avro.schema
-
 from elasticgit.models import (
     Model, IntegerField, TextField, FloatField,
     BooleanField, ListField, DictField, UUIDField,
@@ -18,13 +19,93 @@ from elasticgit.models import (
 
 from elasticgit.commands.base import (
     ToolCommand, ToolCommandError, CommandArgument)
-from elasticgit.utils import load_class
+from elasticgit.utils import load_class, load_model_class, fqcn
+from elasticgit.cache import LRUCacheBackend
+
+
+#: The metadata key the model class is stored under in data files.
+MODEL_META_KEY = 'elasticgit.model'
+#: The file name suffix of the compiled model code cached on disk.
+CODE_CACHE_SUFFIX = 'marshal'
+#: The model classes most recently generated by :py:func:`deserialize`,
+#: by schema hash.
+MODEL_CLASS_CACHE = LRUCacheBackend(max_size=256)
+
+
+def schema_hash(data, module_name=None):
+    """
+    Return the hash :py:func:`deserialize` caches the model class
+    generated for a schema under.
+
+    :param dict data:
+        The Avro schema
+    :param str module_name:
+        The name of the module the class is put in.
+    :returns: str
+    """
+    return hashlib.sha1(json.dumps(
+        [data, module_name], sort_keys=True)).hexdigest()
 
 
-def deserialize(data, field_mapping={}, module_name=None):
+def is_trusted_path(path, stat_result=None):
+    """
+    Check that a path is owned by the current user and is not writable
+    by the group or by others, so nobody else could have put it there.
+
+    :param str path:
+    :param posix.stat_result stat_result:
+        An optional result of :py:func:`os.fstat` to check instead of
+        stat-ing ``path`` again.
+    :returns: bool
+    """
+    stat_result = stat_result or os.stat(path)
+    return (stat_result.st_uid == os.getuid() and
+            not stat_result.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+
+
+def load_cached_code(cache_dir, key):
+    path = os.path.join(cache_dir, '%s.%s' % (key, CODE_CACHE_SUFFIX))
+    try:
+        with open(path, 'rb') as fp:
+            # NOTE: unmarshalling a file runs its code, only trust the
+            #       ones nobody but the current user could have written.
+            if not (is_trusted_path(cache_dir) and
+                    is_trusted_path(path, os.fstat(fp.fileno()))):
+                return None
+            if fp.read(4) != imp.get_magic():
+                return None
+            return marshal.load(fp)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def save_cached_code(cache_dir, key, model_name, code):
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, 0700)
+    path = os.path.join(cache_dir, '%s.%s' % (key, CODE_CACHE_SUFFIX))
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0600)
+    with os.fdopen(fd, 'wb') as fp:
+        fp.write(imp.get_magic())
+        marshal.dump((model_name, code), fp)
+    os.rename(tmp_path, path)
+
+
+def deserialize(data, field_mapping={}, module_name=None, cache_dir=None):
     """
     Deserialize an Avro schema and define it within a module (if specified)
 
+    The most recently generated classes are cached in
+    :py:data:`MODEL_CLASS_CACHE` by the hash of the schema and module
+    name, deserializing the same schema again returns the same class.
+    If ``cache_dir`` is given the marshalled compiled code is also
+    stored there so other processes can skip the code generation.
+
+    Loading the cached code executes it, so ``cache_dir`` must only be
+    writable by the current user. Cached files are ignored unless they
+    and ``cache_dir`` are owned by the current user and are not
+    writable by the group or by others.
+
     :param dict data:
         The Avro schema
     :param dict field_mapping:
@@ -33,6 +114,8 @@ def deserialize(data, field_mapping={}, module_name=None):
         The name of the module to put this in. This module is dynamically
         generated with :py:func:`imp.new_module` and only available
         during code generation for setting the class' ``__module__``.
+    :param str cache_dir:
+        An optional directory to cache the compiled model code in.
     :returns:
         :py:class:`elasticgit.models.Model`
 
@@ -47,13 +130,31 @@ def deserialize(data, field_mapping={}, module_name=None):
     ... }
     >>> deserialize(schema)
     <class 'Foo'>
+    >>> deserialize(schema) is deserialize(schema)
+    True
     >>>
 
     """
-    schema_loader = SchemaLoader()
-    schema = avro.schema.make_avsc_object(data, avro.schema.Names()).to_json()
-    model_code = schema_loader.generate_model(schema)
-    model_name = schema['name']
+    key = schema_hash(data, module_name)
+    model_class = MODEL_CLASS_CACHE.get(key)
+    if model_class is not None:
+        return model_class
+
+    cached = (load_cached_code(cache_dir, key)
+              if cache_dir is not None else None)
+    if cached is not None:
+        model_name, code = cached
+    else:
+        import avro.schema
+
+        schema_loader = SchemaLoader()
+        schema = avro.schema.make_avsc_object(
+            data, avro.schema.Names()).to_json()
+        model_code = schema_loader.generate_model(schema)
+        model_name = schema['name']
+        code = compile(model_code, '<%s>' % (model_name,), 'exec')
+        if cache_dir is not None:
+            save_cached_code(cache_dir, key, model_name, code)
 
     if module_name is not None:
         mod = imp.new_module(module_name)
@@ -61,9 +162,11 @@ def deserialize(data, field_mapping={}, module_name=None):
     else:
         scope = {}
 
-    exec model_code in scope
+    exec code in scope
 
-    return scope.pop(model_name)
+    model_class = scope.pop(model_name)
+    MODEL_CLASS_CACHE.set(key, model_class)
+    return model_class
 
 
 def serialize(model_class):
@@ -87,6 +190,59 @@ def serialize(model_class):
     return schema_dumper.dump_schema(model_class)
 
 
+def write_models(model_class, models, fp, codec='deflate'):
+    """
+    Write model instances to an Avro object container file.
+
+    The file's schema is the one :py:func:`serialize` returns for the model
+    class and the model class itself is stored in the file's metadata so
+    :py:func:`read_models` can load it again.
+
+    :param elasticgit.models.Model model_class:
+    :param iterable models:
+        The model instances, written one at a time.
+    :param file fp:
+        The file to write to, it is flushed but not closed.
+    :param str codec:
+        The block compression codec, ``null`` or ``deflate``.
+    :returns: int, the number of models written.
+    """
+    import avro.schema
+    from avro.datafile import DataFileWriter
+    from avro.io import DatumWriter
+
+    schema = avro.schema.parse(serialize(model_class))
+    writer = DataFileWriter(fp, DatumWriter(), schema, codec=codec)
+    writer.set_meta(MODEL_META_KEY, fqcn(model_class))
+    count = 0
+    for model in models:
+        writer.append(dict(model))
+        count += 1
+    writer.flush()
+    return count
+
+
+def read_models(fp):
+    """
+    Read model instances from an Avro object container file written with
+    :py:func:`write_models`.
+
+    :param file fp:
+        The file to read from.
+    :returns:
+        A tuple of the model class and an iterator over the instances.
+    """
+    from avro.datafile import DataFileReader
+    from avro.io import DatumReader
+
+    reader = DataFileReader(fp, DatumReader())
+    class_path = reader.get_meta(MODEL_META_KEY)
+    model_class = load_model_class(class_path)
+    if model_class is None:
+        raise ToolCommandError('%s is not a model class' % (class_path,))
+    return model_class, (model_class(datum) for datum in reader)
+
+
 class FieldMapType(object):
     """
     A custom type for providing mappings on the command line for the
@@ -289,6 +445,8 @@ class SchemaLoader(ToolCommand):
             every time.
         :returns: str
         """
+        from jinja2 import Environment, PackageLoader
+
         env = Environment(loader=PackageLoader('elasticgit', 'templates'))
         env.globals['model_class_for'] = partial(
             self.model_class_for, model_renames=model_renames)
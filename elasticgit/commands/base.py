@@ -28,6 +28,8 @@ class ToolCommand(object):
 
     #: Where the write the output to, override for testing.
     stdout = sys.stdout
+    #: Where the write progress information to, override for testing.
+    stderr = sys.stderr
 
     def run(self, **kwargs):  # pragma: no cover
         raise NotImplementedError('Subclasses are to implement this.')
@@ -1,19 +1,62 @@
 import os
-import glob
 import json
+import itertools
 import warnings
 
+from multiprocessing import Pool
+
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir
+
 from elasticgit.commands.base import ToolCommand, CommandArgument
+from elasticgit.commands.utils import Progress
 from elasticgit.commands import avro
-from elasticgit.storage import StorageManager
-
-from git import Repo
 
 
 class NotAGitModelException(Exception):
     pass
 
 
+def guess_type(value):
+    return {
+        int: 'int',
+        bool: 'boolean',
+        float: 'float',
+        str: 'string',
+        unicode: 'string',
+        list: {
+            'type': 'array',
+            'items': ['string'],
+        },
+        None: 'null',
+    }[None if value is None else type(value)]
+
+
+def load_data(data_folder):
+    data_file = os.path.join(data_folder, 'data.json')
+
+    if not os.path.isfile(data_file):
+        raise NotAGitModelException()
+
+    with open(data_file, 'r') as fp:
+        return json.load(fp)
+
+
+def guess_types(data_folder):
+    """
+    Return the types guessed for the non null fields of a GitModel
+    data folder. Module level so it can be run in a process pool.
+    """
+    data = load_data(data_folder)
+    return dict((key, guessed_type)
+                for key, guessed_type in (
+                    (key, guess_type(value))
+                    for key, value in data['fields'].items())
+                if guessed_type != 'null')
+
+
 class MigrateGitModelRepo(ToolCommand):
 
     command_name = 'migrate-gitmodel-repo'
@@ -26,18 +69,28 @@ class MigrateGitModelRepo(ToolCommand):
         CommandArgument(
             'module_name',
             help='The module to put the migrated data in.'),
+        CommandArgument(
+            '-w', '--workers',
+            dest='workers',
+            help='The number of processes to inspect the data with.',
+            type=int, default=1),
     )
 
     default_type = 'string'
     file_opener = open
+    #: How many records to migrate between progress updates.
+    progress_interval = 100
+
+    def run(self, working_dir, module_name, workers=1):
+        from git import Repo
+        from elasticgit.storage import StorageManager
 
-    def run(self, working_dir, module_name):
         repo = Repo(working_dir)
         storage_manager = StorageManager(repo)
-        records = []
+        model_classes = []
         target_dir = os.path.join(repo.working_dir, module_name)
-        gitmodel_info = self.inspect_repo(repo, target_dir)
-        for directory, schema, data_records in gitmodel_info:
+        gitmodel_info = self.inspect_repo(repo, target_dir, workers=workers)
+        for directory, schema, count in gitmodel_info:
 
             # GitModel uses ``id``, ElasticGit uses ``uuid`` so add an alias.
             schema = self.add_alias(schema, 'uuid', 'id')
@@ -45,11 +98,16 @@ class MigrateGitModelRepo(ToolCommand):
             schema['namespace'] = module_name
 
             model_class = avro.deserialize(schema, module_name=module_name)
-            for data_record in data_records:
-                record = model_class(data_record)
-                storage_manager.store(record, 'Migrated %s.' % (
-                    record.uuid.encode('utf-8'),))
-                records.append(record)
+            model_classes.append(model_class)
+
+            # NOTE: the records are read from disk again one at a time and
+            #       streamed into a single commit per model class.
+            progress = Progress(schema['name'], count, self.stderr)
+            storage_manager.store_many(
+                self.iter_records(model_class, directory, progress),
+                'Migrated %d %s records.' % (
+                    count, schema['name'].encode('utf-8')))
+            progress.finish()
 
             # Save the schema in the new module's dir
             file_path = os.path.join(target_dir,
@@ -57,7 +115,19 @@ class MigrateGitModelRepo(ToolCommand):
             with self.file_opener(file_path, 'w') as stdout:
                 json.dump(schema, fp=stdout, indent=2)
 
-        return schema, records
+        # NOTE: the migrated records are read back from Git lazily, one
+        #       at a time.
+        return schema, itertools.chain.from_iterable(
+            storage_manager.iterate(model_class)
+            for model_class in model_classes)
+
+    def iter_records(self, model_class, data_dir, progress):
+        count = 0
+        for count, data_folder in enumerate(self.iter_dirs(data_dir), 1):
+            yield model_class(self.get_data(data_folder)['fields'])
+            if count % self.progress_interval == 0:
+                progress.update(self.progress_interval)
+        progress.update(count % self.progress_interval)
 
     def add_alias(self, schema, field_name, alias):
         schema = schema.copy()
@@ -70,13 +140,17 @@ class MigrateGitModelRepo(ToolCommand):
         schema['fields'].append(replacement)
         return schema
 
-    def list_dirs(self, path):
-        return [dir_path
-                for dir_path in glob.glob(os.path.join(path, '*'))
-                if os.path.isdir(dir_path)]
+    def iter_dirs(self, path):
+        """
+        Yield the paths of the directories in a directory, without
+        listing all of it at once. Hidden directories are skipped.
+        """
+        for entry in scandir(path):
+            if not entry.name.startswith('.') and entry.is_dir():
+                yield entry.path
 
-    def inspect_repo(self, repo, target_dir):
-        for directory in self.list_dirs(repo.working_dir):
+    def inspect_repo(self, repo, target_dir, workers=1):
+        for directory in self.iter_dirs(repo.working_dir):
 
             # Don't inspect the directory we're writing our migrated
             # models to.
@@ -84,24 +158,49 @@ class MigrateGitModelRepo(ToolCommand):
                 continue
 
             try:
-                schema, records = self.inspect_data_dir(directory)
-                yield directory, schema, records
+                schema, count = self.inspect_data_dir(
+                    directory, workers=workers)
+                if schema is not None:
+                    yield directory, schema, count
             except NotAGitModelException:
                 warnings.warn(
                     'Directory %s does not look like a git model.' % (
                         directory,))
 
-    def inspect_data_dir(self, data_dir):
-        data_folders = self.list_dirs(data_dir)
-        if not data_folders:
+    def inspect_data_dir(self, data_dir, workers=1):
+        """
+        Guess the schema of the records in a GitModel data directory,
+        reading the directory as a stream.
+
+        :returns:
+            The schema and the number of records, ``(None, 0)`` for an
+            empty directory.
+        """
+        data_folders = self.iter_dirs(data_dir)
+        first_folder = next(data_folders, None)
+        if first_folder is None:
             warnings.warn('Directory %s is empty.' % (data_dir,))
-
-        schema = self.guess_initial_schema(data_folders[0])
-        records = []
-        for data_folder in data_folders:
-            data = self.get_data(data_folder)
-            schema = self.update_null_types(data, schema)
-            records.append(data['fields'])
+            return None, 0
+
+        schema = self.guess_initial_schema(first_folder)
+        fields = dict((field['name'], field) for field in schema['fields'])
+        data_folders = itertools.chain([first_folder], data_folders)
+        count = 0
+        if workers > 1:
+            pool = Pool(workers)
+            try:
+                # NOTE: imap keeps the order so the last non null value
+                #       seen still decides a field's type.
+                for guessed_types in pool.imap(
+                        guess_types, data_folders, chunksize=100):
+                    self.update_types(fields, guessed_types)
+                    count += 1
+            finally:
+                pool.terminate()
+        else:
+            for data_folder in data_folders:
+                self.update_types(fields, guess_types(data_folder))
+                count += 1
 
         null_types = self.get_null_types(schema)
         for field in null_types:
@@ -109,30 +208,19 @@ class MigrateGitModelRepo(ToolCommand):
                 self.default_type, schema['name'], field['name'],))
             field['type'] = self.default_type
 
-        return schema, records
+        return schema, count
 
     def get_null_types(self, schema):
         return [field for field in schema['fields']
                 if field['type'] == 'null']
 
     def get_data(self, data_folder):
-        data_file = os.path.join(data_folder, 'data.json')
+        return load_data(data_folder)
 
-        if not os.path.isfile(data_file):
-            raise NotAGitModelException()
-
-        with open(data_file, 'r') as fp:
-            return json.load(fp)
-
-    def update_null_types(self, data, schema):
-        schema = schema.copy()
-        for key, value in data['fields'].items():
-            guessed_type = self.guess_type(value)
-            if guessed_type != 'null':
-                for field in schema['fields']:
-                    if field['name'] == key:
-                        field['type'] = guessed_type
-        return schema
+    def update_types(self, fields, guessed_types):
+        for key, guessed_type in guessed_types.items():
+            if key in fields:
+                fields[key]['type'] = guessed_type
 
     def guess_initial_schema(self, data_folder):
         data = self.get_data(data_folder)
@@ -147,15 +235,4 @@ class MigrateGitModelRepo(ToolCommand):
         }
 
     def guess_type(self, value):
-        return {
-            int: 'int',
-            bool: 'boolean',
-            float: 'float',
-            str: 'string',
-            unicode: 'string',
-            list: {
-                'type': 'array',
-                'items': ['string'],
-            },
-            None: 'null',
-        }[None if value is None else type(value)]
+        return guess_type(value)
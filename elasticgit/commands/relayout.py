@@ -0,0 +1,46 @@
+from elasticgit.commands.base import ToolCommand, CommandArgument
+from elasticgit.layout import LAYOUTS
+
+
+class RelayoutTool(ToolCommand):
+    """
+    Move the model files in a repository to another layout, see
+    :py:mod:`elasticgit.layout`.
+
+    ::
+
+        python -m elasticgit.tools relayout -l sharded path/to/repo
+
+    """
+
+    command_name = 'relayout'
+    command_help_text = ('Move the model files in a repository to another '
+                         'layout.')
+    command_arguments = (
+        CommandArgument(
+            'working_dir',
+            help='The path to the repository.'),
+        CommandArgument(
+            '-l', '--layout',
+            dest='layout',
+            help='The layout to move to.',
+            choices=LAYOUTS, required=True),
+        CommandArgument(
+            '-m', '--message',
+            dest='message',
+            help='The commit message.'),
+    )
+
+    def run(self, working_dir, layout, message=None):
+        from git import Repo
+        from elasticgit.storage import StorageManager
+
+        sm = StorageManager(Repo(working_dir))
+        commit = sm.relayout(
+            layout, message or 'Moving to the %s layout.' % (layout,))
+        if commit is None:
+            self.stdout.write('Nothing to move, using the %s layout.\n' % (
+                layout,))
+        else:
+            self.stdout.write('Moved to the %s layout in %s.\n' % (
+                layout, commit.hexsha))
@@ -3,16 +3,20 @@ import os
 import sys
 import json
 
+from itertools import islice
+from multiprocessing.pool import ThreadPool
+
 from ConfigParser import ConfigParser
 
-from elasticgit import EG
 from elasticgit.commands.base import (
     ToolCommand, CommandArgument, ToolCommandError)
-from elasticgit.commands.utils import ModelClassType, BooleanType
+from elasticgit.commands.utils import (
+    ModelClassType, BooleanType, Progress)
 from elasticgit.utils import fqcn
 
 
 DEFAULT_SECTION = 'app:cmsfrontend'
+DEFAULT_BATCH_SIZE = 500
 
 
 class ResyncTool(ToolCommand):
@@ -28,8 +32,11 @@ class ResyncTool(ToolCommand):
             type=argparse.FileType('r')),
         CommandArgument(
             '-m', '--model',
-            dest='model_class',
-            help='The model class to load.', required=True,
+            dest='model_class', action='append',
+            help=('The model class to load, can be specified multiple '
+                  'times. A single -m only resyncs that model class, '
+                  'as before. Defaults to all models found in the '
+                  'repository.'),
             type=ModelClassType()),
         CommandArgument(
             '-s', '--section-name',
@@ -58,17 +65,58 @@ class ResyncTool(ToolCommand):
             dest='recreate_index',
             help='Whether or not to recreate the index from scratch.',
             type=BooleanType(), default=False),
+        CommandArgument(
+            '-w', '--workers',
+            dest='workers',
+            help='The number of batches to index in parallel.',
+            type=int, default=1),
+        CommandArgument(
+            '-b', '--batch-size',
+            dest='batch_size',
+            help='The number of objects to index per bulk request.',
+            type=int, default=DEFAULT_BATCH_SIZE),
+        CommandArgument(
+            '--index-per-model',
+            dest='index_per_model',
+            help='Whether every model class has an index of its own.',
+            type=BooleanType(), default=False),
+        CommandArgument(
+            '--index-settings',
+            dest='index_settings_file',
+            help=('The path to a JSON file with the settings to create '
+                  'the index of each model class with, keyed by the '
+                  'fully qualified class name.'),
+            type=argparse.FileType('r')),
+        CommandArgument(
+            '--git-metadata',
+            dest='git_metadata',
+            help=('Whether to add the blob SHA and the SHA, time and '
+                  'author of the last commit to each document.'),
+            type=BooleanType(), default=False),
+        CommandArgument(
+            '--checkpoint',
+            dest='checkpoint_file',
+            help=('Where to keep track of the progress to resume an '
+                  'interrupted resync from. Defaults to a file in the '
+                  'repository\'s .git directory.')),
     )
 
     stdout = sys.stdout
+    stderr = sys.stderr
 
     def run(self, config_file, model_class, index_prefix, git_path,
             mapping_file=None, recreate_index=False,
-            section_name=DEFAULT_SECTION, es_host=None):
+            section_name=DEFAULT_SECTION, es_host=None,
+            workers=1, batch_size=DEFAULT_BATCH_SIZE, checkpoint_file=None,
+            index_per_model=False, index_settings_file=None,
+            git_metadata=False):
 
         mapping = (json.load(mapping_file)
                    if mapping_file is not None
                    else None)
+        index_settings = (json.load(index_settings_file)
+                          if index_settings_file is not None
+                          else None)
 
         # resync
         if config_file is not None:
@@ -82,9 +130,18 @@ class ResyncTool(ToolCommand):
                 'Please specify either `--config` or `--index-prefix` and '
                 '`--git-path`.')
 
-        return self.resync(git_path, index_prefix, model_class,
+        if model_class is None or isinstance(model_class, (list, tuple)):
+            model_classes = model_class
+        else:
+            model_classes = [model_class]
+
+        return self.resync(git_path, index_prefix, model_classes,
                            mapping=mapping, recreate_index=recreate_index,
-                           es=es)
+                           es=es, workers=workers, batch_size=batch_size,
+                           checkpoint_file=checkpoint_file,
+                           index_per_model=index_per_model,
+                           index_settings=index_settings,
+                           git_metadata=git_metadata)
 
     def read_config_file(self, config_file, section_name):
         # NOTE: ConfigParser's DEFAULT handling is kind of nuts
@@ -112,30 +169,161 @@ class ResyncTool(ToolCommand):
 
         return index_prefix, working_dir, es_host
 
-    def resync(self, working_dir, index_prefix, model_class,
-               mapping=None, recreate_index=False, es={}):
+    def resync(self, working_dir, index_prefix, model_classes=None,
+               mapping=None, recreate_index=False, es={}, workers=1,
+               batch_size=DEFAULT_BATCH_SIZE, checkpoint_file=None,
+               index_per_model=False, index_settings=None,
+               git_metadata=False, model_class=None):
+        from elasticgit.workspace import EG
 
-        workspace = EG.workspace(working_dir, index_prefix=index_prefix, es=es)
+        # NOTE: a single model class, passed positionally or with the
+        #       ``model_class`` keyword, is still accepted.
+        if model_class is not None:
+            model_classes = [model_class]
+        elif isinstance(model_classes, type):
+            model_classes = [model_classes]
+
+        workspace = EG.workspace(
+            working_dir, index_prefix=index_prefix, es=es,
+            index_per_model=index_per_model, index_settings=index_settings,
+            git_metadata=git_metadata)
         branch = workspace.sm.repo.active_branch
+        checkpoint = Checkpoint(
+            checkpoint_file or workspace.sm.private_path(
+                'resync', '%s.json' % (index_prefix,)),
+            workspace.sm.head_sha())
+
+        if model_classes is None:
+            model_classes = workspace.sm.model_classes()
+
+        # NOTE: with an index per model class only the indexes of the
+        #       model classes being resynced are touched.
+        indexes = ([(fqcn(model_class), model_class)
+                    for model_class in model_classes]
+                   if index_per_model else [(branch.name, None)])
 
-        if recreate_index and workspace.im.index_exists(branch.name):
-            self.stdout.writelines(
-                'Destroying index for %s.\n' % (branch.name,))
-            workspace.im.destroy_index(branch.name)
+        for label, model_class in indexes:
+            if (recreate_index and
+                    workspace.im.index_exists(branch.name, model_class)):
+                self.stdout.writelines(
+                    'Destroying index for %s.\n' % (label,))
+                workspace.im.destroy_index(branch.name, model_class)
+                checkpoint.clear()
 
-        if not workspace.im.index_exists(branch.name):
-            self.stdout.writelines(
-                'Creating index for %s.\n' % (branch.name,))
-            # create the index and wait for it to become ready
-            workspace.im.create_index(branch.name)
-            while not workspace.index_ready():
-                pass
+            if not workspace.im.index_exists(branch.name, model_class):
+                self.stdout.writelines(
+                    'Creating index for %s.\n' % (label,))
+                # create the index and wait for it to become ready
+                workspace.im.create_index(branch.name, model_class)
+                while not workspace.im.index_ready(branch.name, model_class):
+                    pass
 
         if mapping is not None:
-            self.stdout.writelines(
-                'Creating mapping for %s.\n' % (fqcn(model_class),))
-            workspace.setup_custom_mapping(model_class, mapping)
+            for model_class in model_classes:
+                self.stdout.writelines(
+                    'Creating mapping for %s.\n' % (fqcn(model_class),))
+                workspace.setup_custom_mapping(model_class, mapping)
+
+        pool = ThreadPool(workers)
+        try:
+            for model_class in model_classes:
+                updated, removed = self.sync(
+                    workspace, model_class, pool, batch_size, checkpoint,
+                    workers=workers)
+                self.stdout.writelines('%s: %d updated, %d removed.\n' % (
+                    fqcn(model_class), len(updated), len(removed)))
+        finally:
+            pool.close()
+            pool.join()
+        checkpoint.clear()
+
+    def sync(self, workspace, model_class, pool, batch_size, checkpoint,
+             workers=1):
+        """
+        Index everything Git knows about a model class in bulk batches,
+        then unindex what Git does not know about.
+
+        Batches are read and indexed in parallel by the pool's workers.
+        The number of batches indexed in order is checkpointed so an
+        interrupted resync can resume from there.
+
+        The UUIDs are streamed from Git into the batches, only the set
+        of them needed to find what to unindex is kept in memory.
+        """
+        git_uuids = set(workspace.sm.iter_uuids(model_class))
+        name = fqcn(model_class)
+        done = checkpoint.get(name)
+        progress = Progress(
+            name, len(git_uuids), self.stderr,
+            done=min(done * batch_size, len(git_uuids)))
+
+        def index_batch(batch):
+            workspace.im.bulk_index(
+                model_class, workspace.sm.get_many(model_class, batch))
+            return len(batch)
+
+        uuids = workspace.sm.iter_uuids(model_class)
+        batches = islice(
+            iter(lambda: list(islice(uuids, batch_size)), []), done, None)
+        if done * batch_size < len(git_uuids):
+            # NOTE: the pool queues all the work it is given up front,
+            #       it gets a few batches at a time to bound memory.
+            while True:
+                window = list(islice(batches, 2 * workers))
+                if not window:
+                    break
+                for count in pool.imap(index_batch, window):
+                    done += 1
+                    checkpoint.set(name, done)
+                    progress.update(count)
+            progress.finish()
+        workspace.refresh_index()
+
+        removed_uuids = set([])
+        for result in workspace.S(model_class).only('uuid').iter_all(
+                batch_size=batch_size):
+            if result.uuid not in git_uuids:
+                workspace.im.raw_unindex(model_class, result.uuid)
+                removed_uuids.add(result.uuid)
+
+        return git_uuids, removed_uuids
+
+
+class Checkpoint(object):
+    """
+    Tracks the number of batches indexed per model class for the commit
+    being resynced. A checkpoint for a different commit is ignored.
+
+    :param str path:
+        The file to store the checkpoint in.
+    :param str commit:
+        The SHA of the commit being resynced.
+    """
+
+    def __init__(self, path, commit):
+        self.path = path
+        self.commit = commit
+        self.batches = {}
+        if os.path.isfile(path):
+            with open(path, 'r') as fp:
+                data = json.load(fp)
+            if data.get('commit') == commit:
+                self.batches = data['batches']
+
+    def get(self, name):
+        return self.batches.get(name, 0)
+
+    def set(self, name, batches):
+        self.batches[name] = batches
+        dir_name = os.path.dirname(self.path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+        tmp_path = '%s.tmp' % (self.path,)
+        with open(tmp_path, 'w') as fp:
+            json.dump({'commit': self.commit, 'batches': self.batches}, fp)
+        os.rename(tmp_path, self.path)
 
-        updated, removed = workspace.sync(model_class)
-        self.stdout.writelines('%s: %d updated, %d removed.\n' % (
-            fqcn(model_class), len(updated), len(removed)))
+    def clear(self):
+        self.batches = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
@@ -2,16 +2,12 @@ import os
 
 from elasticgit.commands.base import ToolCommand, CommandArgument
 from elasticgit.commands.utils import load_models
-from elasticgit import EG, F, Q
 
-try:
-    from IPython import start_ipython
 
-    def default_launcher(scope):
-        return start_ipython(argv=[], user_ns=scope)
-
-except ImportError:
-    def default_launcher(scope):
+def default_launcher(scope):
+    try:
+        from IPython import start_ipython
+    except ImportError:
         import code
         import readline
         import rlcompleter
@@ -19,6 +15,8 @@ except ImportError:
             rlcompleter.Completer(scope).complete)
         readline.parse_and_bind("tab:complete")
         code.interact(local=scope)
+    else:
+        return start_ipython(argv=[], user_ns=scope)
 
 
 class EGShell(ToolCommand):
@@ -70,6 +68,8 @@ class EGShell(ToolCommand):
         self.launcher = launcher
 
     def run(self, workdir, models=None, introspect_models=None):
+        from elasticgit.workspace import EG, F, Q
+
         namespace = {}
         if models is not None:
             namespace.update(load_models(models))
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import os
 import json
 
 import avro.schema
@@ -6,6 +7,8 @@ from avro.datafile import DataFileReader, DataFileWriter
 from avro.io import DatumReader, DatumWriter
 
 from elasticgit import models
+from elasticgit.commands import avro as avro_command
+from elasticgit.commands.base import ToolCommandError
 from elasticgit.tests.base import ToolBaseTest
 
 
@@ -445,3 +448,88 @@ class TestAvroDataWriter(ToolBaseTest):
         model = Foo(data)
         self.assertEqual(model.age, 5)
         self.assertEqual(model.name, None)
+
+    def test_read_models_not_a_model(self):
+        schema_dumper = self.mk_schema_dumper()
+        schema = avro.schema.parse(
+            schema_dumper.dump_schema(DumpAndLoadModel))
+
+        fp, file_name = self.get_tempfile(text=False)
+        with DataFileWriter(fp, DatumWriter(), schema) as writer:
+            writer.set_meta(
+                avro_command.MODEL_META_KEY,
+                'elasticgit.tests.base.ModelBaseTest')
+
+        with open(file_name, 'rb') as fp:
+            self.assertRaises(
+                ToolCommandError, avro_command.read_models, fp)
+
+
+class TestDeserializeCache(ToolBaseTest):
+
+    schema = {
+        'name': 'CachedModel',
+        'type': 'record',
+        'fields': [{
+            'name': 'age',
+            'type': 'int',
+        }]
+    }
+
+    def setUp(self):
+        self.addCleanup(avro_command.MODEL_CLASS_CACHE.clear)
+
+    def test_memory_cache(self):
+        model_class = avro_command.deserialize(self.schema)
+        self.assertTrue(avro_command.deserialize(self.schema) is model_class)
+        foo_class = avro_command.deserialize(self.schema, module_name='foo')
+        self.assertFalse(foo_class is model_class)
+        self.assertEqual(foo_class.__module__, 'foo')
+
+    def test_memory_cache_bounded(self):
+        max_size = avro_command.MODEL_CLASS_CACHE.max_size
+        for i in range(max_size + 1):
+            avro_command.deserialize(self.schema, module_name='m%s' % (i,))
+        self.assertEqual(
+            len(avro_command.MODEL_CLASS_CACHE.data), max_size)
+
+    def test_disk_cache(self):
+        cache_dir = self.mk_tempdir()
+        model_class = avro_command.deserialize(
+            self.schema, cache_dir=cache_dir)
+        self.assertEqual(os.listdir(cache_dir), [
+            '%s.%s' % (avro_command.schema_hash(self.schema),
+                       avro_command.CODE_CACHE_SUFFIX)])
+
+        avro_command.MODEL_CLASS_CACHE.clear()
+
+        def generate_model(*args, **kwargs):
+            raise AssertionError('The cached code should be used.')
+
+        original = avro_command.SchemaLoader.generate_model
+        avro_command.SchemaLoader.generate_model = generate_model
+        self.addCleanup(
+            setattr, avro_command.SchemaLoader, 'generate_model', original)
+        cached_class = avro_command.deserialize(
+            self.schema, cache_dir=cache_dir)
+        self.assertFalse(cached_class is model_class)
+        self.assertEqual(cached_class.__name__, 'CachedModel')
+        self.assertEqual(
+            cached_class._fields.keys(), model_class._fields.keys())
+
+    def test_disk_cache_untrusted(self):
+        cache_dir = self.mk_tempdir()
+        avro_command.deserialize(self.schema, cache_dir=cache_dir)
+        key = avro_command.schema_hash(self.schema)
+        [file_name] = os.listdir(cache_dir)
+        path = os.path.join(cache_dir, file_name)
+        self.assertEqual(os.stat(path).st_mode & 0777, 0600)
+        self.assertNotEqual(
+            avro_command.load_cached_code(cache_dir, key), None)
+
+        os.chmod(path, 0620)
+        self.assertEqual(avro_command.load_cached_code(cache_dir, key), None)
+        os.chmod(path, 0600)
+        os.chmod(cache_dir, 0777)
+        self.addCleanup(os.chmod, cache_dir, 0700)
+        self.assertEqual(avro_command.load_cached_code(cache_dir, key), None)
@@ -1,5 +1,6 @@
 import os
 import json
+import warnings
 
 from StringIO import StringIO
 from uuid import uuid4
@@ -74,6 +75,7 @@ class TestMigrateGitModelRepo(ToolBaseTest):
 
         migrator = MigrateGitModelRepo()
         migrator.file_opener = patched_get_fileopener
+        migrator.stderr = StringIO()
         return migrator, stdouts
 
     def assertFields(self, schema, fields):
@@ -115,6 +117,7 @@ class TestMigrateGitModelRepo(ToolBaseTest):
         schema, records = migrator.run(
             self.workspace.repo.working_dir, self.__module__)
         model_class = avro.deserialize(schema, module_name=self.__module__)
+        self.assertFalse(isinstance(records, list))
         [record] = records
         self.assertEqual(record.uuid, category_uuid)
         [reindexed] = self.workspace.reindex(model_class)
@@ -180,3 +183,40 @@ class TestMigrateGitModelRepo(ToolBaseTest):
             dict(record) ==
             dict(reindexed) ==
             dict(result.get_object()))
+
+    def test_migrate_single_commit(self):
+        page_uuids = set(
+            self.mk_gitmodel_page_data(self.workspace) for i in range(3))
+        migrator, stdouts = self.mk_gitmodel_migrator()
+        migrator.progress_interval = 2
+        commits = len(list(self.workspace.repo.iter_commits()))
+        schema, records = migrator.run(
+            self.workspace.repo.working_dir, self.__module__)
+        self.assertEqual(set(record.uuid for record in records), page_uuids)
+        [commit] = list(self.workspace.repo.iter_commits())[:-commits]
+        self.assertEqual(commit.message, 'Migrated 3 GitPageModel records.')
+        self.assertTrue(
+            'GitPageModel: 3/3 (100%)' in migrator.stderr.getvalue())
+
+    def test_introspect_schema_workers(self):
+        for i in range(3):
+            self.mk_gitmodel_page_data(self.workspace)
+        migrator, stdouts = self.mk_gitmodel_migrator()
+        directory = os.path.join(
+            self.workspace.repo.working_dir, 'gitpagemodel')
+        schema, count = migrator.inspect_data_dir(directory)
+        pooled_schema, pooled_count = migrator.inspect_data_dir(
+            directory, workers=2)
+        self.assertEqual(schema, pooled_schema)
+        self.assertEqual(count, pooled_count)
+        self.assertEqual(count, 3)
+
+    def test_introspect_empty_dir(self):
+        migrator, stdouts = self.mk_gitmodel_migrator()
+        directory = os.path.join(self.workspace.repo.working_dir, 'empty')
+        os.mkdir(directory)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(migrator.inspect_data_dir(directory), (None, 0))
+        [warning] = caught
+        self.assertTrue('is empty' in str(warning.message))
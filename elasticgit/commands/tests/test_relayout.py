@@ -0,0 +1,30 @@
+from StringIO import StringIO
+
+from elasticgit.tests.base import ToolBaseTest, TestPerson
+from elasticgit.commands.relayout import RelayoutTool
+from elasticgit.storage import StorageManager
+
+
+class TestRelayoutTool(ToolBaseTest):
+
+    def setUp(self):
+        self.workspace = self.mk_workspace()
+
+    def relayout(self, layout):
+        tool = RelayoutTool()
+        tool.stdout = StringIO()
+        tool.run(self.workspace.working_dir, layout)
+        return tool.stdout.getvalue()
+
+    def test_relayout(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        self.workspace.save(person, 'Saving a person.')
+        output = self.relayout('sharded')
+        sm = StorageManager(self.workspace.repo)
+        self.assertEqual(
+            output, 'Moved to the sharded layout in %s.\n' % (
+                sm.head_sha(),))
+        self.assertEqual(sm.get(TestPerson, person.uuid), person)
+        self.assertEqual(
+            self.relayout('sharded'),
+            'Nothing to move, using the sharded layout.\n')
@@ -3,8 +3,11 @@ import json
 from StringIO import StringIO
 from ConfigParser import ConfigParser
 
-from elasticgit.tests.base import ToolBaseTest, TestPerson
-from elasticgit.commands.resync import ResyncTool, DEFAULT_SECTION
+from elasticgit.tests.base import ToolBaseTest, TestPerson, TestPage
+from elasticgit.workspace import EG
+from elasticgit.tools import get_parser
+from elasticgit.commands.resync import (
+    ResyncTool, Checkpoint, DEFAULT_SECTION)
 
 
 class TestResyncTool(ToolBaseTest):
@@ -26,6 +29,7 @@ class TestResyncTool(ToolBaseTest):
                recreate_index=False):
         tool = ResyncTool()
         tool.stdout = StringIO()
+        tool.stderr = StringIO()
         tool.run(None, model_class,
                  workspace.index_prefix, workspace.working_dir,
                  mapping_file=mapping_file,
@@ -172,6 +176,7 @@ class TestResyncToolWithConfigFile(TestResyncTool):
 
         tool = ResyncTool()
         tool.stdout = StringIO()
+        tool.stderr = StringIO()
         tool.run(sio, models_module, None, None, mapping_file=mapping_file,
                  recreate_index=recreate_index)
         return tool.stdout.getvalue()
@@ -194,6 +199,7 @@ class TestResyncToolConfigFileWithEsHost(TestResyncTool):
 
         tool = ResyncTool()
         tool.stdout = StringIO()
+        tool.stderr = StringIO()
         tool.run(sio, models_module, None, None, mapping_file=mapping_file,
                  recreate_index=recreate_index)
         return tool.stdout.getvalue()
@@ -205,9 +211,142 @@ class TestResyncToolWithEsHost(TestResyncTool):
                recreate_index=False):
         tool = ResyncTool()
         tool.stdout = StringIO()
+        tool.stderr = StringIO()
         tool.run(None, model_class,
                  workspace.index_prefix, workspace.working_dir,
                  mapping_file=mapping_file,
                  recreate_index=recreate_index,
                  es_host='http://localhost:9200')
         return tool.stdout.getvalue()
+
+
+class TestResyncToolBatches(ToolBaseTest):
+
+    def setUp(self):
+        self.workspace = self.mk_workspace()
+        self.checkpoint_file = self.workspace.sm.private_path(
+            'test-checkpoint.json')
+        self.people = [TestPerson({'age': i, 'name': 'Name %s' % (i,)})
+                       for i in range(5)]
+        for person in self.people:
+            self.workspace.save(person, 'Saving a person.')
+        self.page = TestPage({
+            'title': 'Title', 'slug': 'title', 'language': 'eng_GB'})
+        self.workspace.save(self.page, 'Saving a page.')
+        self.workspace.im.destroy_index(self.workspace.sm.active_branch())
+
+    def resync(self, model_class=None, **kwargs):
+        tool = ResyncTool()
+        tool.stdout = StringIO()
+        tool.stderr = StringIO()
+        kwargs.setdefault('checkpoint_file', self.checkpoint_file)
+        tool.run(None, model_class, self.workspace.index_prefix,
+                 self.workspace.working_dir, **kwargs)
+        return tool.stdout.getvalue(), tool.stderr.getvalue()
+
+    def test_multiple_models(self):
+        output, progress = self.resync(
+            [TestPerson, TestPage], batch_size=2, workers=3)
+        self.assertEqual(output, '\n'.join([
+            'Creating index for master.',
+            'elasticgit.tests.base.TestPerson: 5 updated, 0 removed.',
+            'elasticgit.tests.base.TestPage: 1 updated, 0 removed.',
+            '']))
+        self.assertTrue(
+            'elasticgit.tests.base.TestPerson: 5/5 (100%)' in progress)
+        self.workspace.refresh_index()
+        self.assertEqual(self.workspace.S(TestPerson).count(), 5)
+        self.assertEqual(self.workspace.S(TestPage).count(), 1)
+
+    def test_all_models(self):
+        output, _ = self.resync()
+        self.assertTrue(
+            'elasticgit.tests.base.TestPerson: 5 updated, 0 removed.'
+            in output)
+        self.assertTrue(
+            'elasticgit.tests.base.TestPage: 1 updated, 0 removed.'
+            in output)
+
+    def test_resync_single_model(self):
+        for kwargs in [{'model_classes': TestPerson},
+                       {'model_class': TestPerson}]:
+            tool = ResyncTool()
+            tool.stdout = StringIO()
+            tool.stderr = StringIO()
+            tool.resync(
+                self.workspace.working_dir, self.workspace.index_prefix,
+                checkpoint_file=self.checkpoint_file, **kwargs)
+            self.assertEqual(
+                tool.stdout.getvalue().splitlines()[-1],
+                'elasticgit.tests.base.TestPerson: 5 updated, 0 removed.')
+
+    def test_single_model_option(self):
+        # NOTE: ``-m`` used to take a single model class, passing it
+        #       once still only resyncs that model class.
+        args = vars(get_parser().parse_args([
+            'resync', '-m', 'elasticgit.tests.base.TestPerson',
+            '-i', self.workspace.index_prefix,
+            '-p', self.workspace.working_dir,
+            '--checkpoint', self.checkpoint_file]))
+        args.pop('dispatcher')
+        self.assertEqual(args['model_class'], [TestPerson])
+
+        tool = ResyncTool()
+        tool.stdout = StringIO()
+        tool.stderr = StringIO()
+        tool.run(**args)
+        self.assertEqual(tool.stdout.getvalue(), '\n'.join([
+            'Creating index for master.',
+            'elasticgit.tests.base.TestPerson: 5 updated, 0 removed.',
+            '']))
+
+    def test_resume(self):
+        # pretend a previous run indexed the first two batches
+        checkpoint = Checkpoint(
+            self.checkpoint_file, self.workspace.sm.head_sha())
+        checkpoint.set('elasticgit.tests.base.TestPerson', 2)
+
+        output, progress = self.resync([TestPerson], batch_size=2)
+        self.assertTrue(progress.startswith(
+            'elasticgit.tests.base.TestPerson: 5/5 (100%)'))
+        self.workspace.refresh_index()
+        # only the last batch was indexed
+        self.assertEqual(self.workspace.S(TestPerson).count(), 1)
+        # and the checkpoint is cleared when done
+        self.assertEqual(Checkpoint(
+            self.checkpoint_file, self.workspace.sm.head_sha()).batches, {})
+
+    def test_stale_checkpoint(self):
+        checkpoint = Checkpoint(self.checkpoint_file, 'a' * 40)
+        checkpoint.set('elasticgit.tests.base.TestPerson', 2)
+        self.resync([TestPerson], batch_size=2)
+        self.workspace.refresh_index()
+        self.assertEqual(self.workspace.S(TestPerson).count(), 5)
+
+    def test_index_per_model(self):
+        index_settings = StringIO(json.dumps({
+            'elasticgit.tests.base.TestPerson': {'number_of_shards': 2},
+        }))
+        output, _ = self.resync(
+            [TestPerson, TestPage], index_per_model=True,
+            index_settings_file=index_settings)
+        self.assertEqual(output, '\n'.join([
+            'Creating index for elasticgit.tests.base.TestPerson.',
+            'Creating index for elasticgit.tests.base.TestPage.',
+            'elasticgit.tests.base.TestPerson: 5 updated, 0 removed.',
+            'elasticgit.tests.base.TestPage: 1 updated, 0 removed.',
+            '']))
+
+        workspace = EG.workspace(
+            self.workspace.working_dir,
+            index_prefix=self.workspace.index_prefix, index_per_model=True)
+        self.addCleanup(workspace.im.destroy_index, 'master')
+        workspace.refresh_index()
+        self.assertFalse(self.workspace.im.index_exists('master'))
+        self.assertEqual(workspace.S(TestPerson).count(), 5)
+        self.assertEqual(workspace.S(TestPage).count(), 1)
+
+        index = workspace.im.index_name('master', TestPerson)
+        settings = workspace.im.es.indices.get_settings(index=index)
+        self.assertEqual(
+            settings[index]['settings']['index']['number_of_shards'], '2')
@@ -0,0 +1,37 @@
+import os
+
+from StringIO import StringIO
+
+from elasticgit.tests.base import ToolBaseTest, TestPerson
+from elasticgit.commands.transfer import ExportTool, ImportTool
+
+
+class TestTransferTools(ToolBaseTest):
+
+    def setUp(self):
+        self.workspace = self.mk_workspace()
+
+    def test_export_import(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        self.workspace.save(person, 'Saving a person.')
+        file_name = os.path.join(self.mk_tempdir(), 'people.avro')
+
+        export_tool = ExportTool()
+        export_tool.stdout = StringIO()
+        with open(file_name, 'wb') as fp:
+            export_tool.run(self.workspace.working_dir, TestPerson, fp)
+        self.assertEqual(
+            export_tool.stdout.getvalue(),
+            'elasticgit.tests.base.TestPerson: 1 exported.\n')
+
+        workspace = self.mk_workspace(
+            name='%s_import' % (self.id(),),
+            index_prefix='%s_import' % (self.workspace.index_prefix,))
+        import_tool = ImportTool()
+        import_tool.stdout = StringIO()
+        with open(file_name, 'rb') as fp:
+            import_tool.run(
+                workspace.working_dir, fp,
+                index_prefix=workspace.index_prefix)
+        self.assertEqual(import_tool.stdout.getvalue(), '1 imported.\n')
+        self.assertEqual(workspace.sm.get(TestPerson, person.uuid), person)
@@ -0,0 +1,105 @@
+import argparse
+
+from elasticgit.commands.base import ToolCommand, CommandArgument
+from elasticgit.commands.utils import ModelClassType
+from elasticgit.utils import fqcn
+
+
+DEFAULT_BATCH_SIZE = 500
+
+
+class ExportTool(ToolCommand):
+    """
+    Export all objects of a model class in a repository to an Avro_
+    object container file.
+
+    ::
+
+        python -m elasticgit.tools export -m some.models.Page \\
+            -o pages.avro path/to/repo
+
+    .. _Avro: avro.apache.org/docs/1.7.7/spec.html
+
+    """
+
+    command_name = 'export'
+    command_help_text = ('Export the objects of a model class to an Avro '
+                         'data file.')
+    command_arguments = (
+        CommandArgument(
+            'working_dir',
+            help='The path to the repository.'),
+        CommandArgument(
+            '-m', '--model',
+            dest='model_class',
+            help='The model class to export.',
+            type=ModelClassType(), required=True),
+        CommandArgument(
+            '-o', '--output',
+            dest='output_file',
+            help='The file to write to.',
+            type=argparse.FileType('wb'), required=True),
+        CommandArgument(
+            '-c', '--codec',
+            dest='codec',
+            help='The block compression codec.',
+            choices=['null', 'deflate'], default='deflate'),
+    )
+
+    def run(self, working_dir, model_class, output_file, codec='deflate'):
+        from elasticgit.workspace import EG
+
+        workspace = EG.workspace(working_dir)
+        count = workspace.export(model_class, output_file, codec=codec)
+        self.stdout.write('%s: %d exported.\n' % (fqcn(model_class), count))
+
+
+class ImportTool(ToolCommand):
+    """
+    Import the objects in an Avro_ object container file written by
+    :py:class:`ExportTool` into a repository and its search index.
+
+    ::
+
+        python -m elasticgit.tools import -i pages.avro path/to/repo
+
+    .. _Avro: avro.apache.org/docs/1.7.7/spec.html
+
+    """
+
+    command_name = 'import'
+    command_help_text = ('Import the objects in an Avro data file into a '
+                         'repository.')
+    command_arguments = (
+        CommandArgument(
+            'working_dir',
+            help='The path to the repository.'),
+        CommandArgument(
+            '-i', '--input',
+            dest='input_file',
+            help='The file to read from.',
+            type=argparse.FileType('rb'), required=True),
+        CommandArgument(
+            '-p', '--index-prefix',
+            dest='index_prefix',
+            help='The index prefix to use'),
+        CommandArgument(
+            '-u', '--es-host',
+            dest='es_host',
+            help='The elasticsearch url to use'),
+        CommandArgument(
+            '-b', '--batch-size',
+            dest='batch_size',
+            help='The number of objects to commit and index at a time.',
+            type=int, default=DEFAULT_BATCH_SIZE),
+    )
+
+    def run(self, working_dir, input_file, index_prefix=None, es_host=None,
+            batch_size=DEFAULT_BATCH_SIZE):
+        from elasticgit.workspace import EG
+
+        es = {'urls': [es_host]} if es_host else {}
+        workspace = EG.workspace(
+            working_dir, index_prefix=index_prefix, es=es)
+        count = workspace.import_(input_file, batch_size=batch_size)
+        self.stdout.write('%d imported.\n' % (count,))
@@ -1,8 +1,9 @@
+import time
 import inspect
 
 from elasticgit.commands.base import ToolCommandError
 from elasticgit.models import Model
-from elasticgit.utils import load_class
+from elasticgit.utils import load_class, load_model_class
 
 
 def load_models(models):
@@ -55,6 +56,12 @@ class ModelClassType(ClassType):
     def __init__(self):
         super(ModelClassType, self).__init__(Model)
 
+    def __call__(self, fqcn):
+        model_class = load_model_class(fqcn)
+        if model_class is None:
+            raise ToolCommandError('%s is not a model class' % (fqcn,))
+        return model_class
+
 
 class BooleanType(object):
     """
@@ -84,3 +91,62 @@ class BooleanType(object):
 
     def __call__(self, value):
         return value.lower() in ("yes", "true", "t", "1")
+
+
+class Progress(object):
+    """
+    Reports the progress, throughput and estimated time remaining of
+    a long running command.
+
+    >>> from StringIO import StringIO
+    >>> from elasticgit.commands.utils import Progress
+    >>> stream = StringIO()
+    >>> progress = Progress('foo', 10, stream, done=5, clock=iter(
+    ...     [0, 2.5]).next)
+    >>> progress.update(5)
+    >>> stream.getvalue()
+    'foo: 10/10 (100%), 2.0/s, ETA 0:00:00\\r'
+    >>>
+
+    :param str label:
+        What is being processed.
+    :param int total:
+        The total number of items to process.
+    :param file stream:
+        Where to write the progress to.
+    :param int done:
+        The number of items already processed, by a previous run.
+    :param callable clock:
+        Returns the current time in seconds.
+    """
+
+    def __init__(self, label, total, stream, done=0, clock=time.time):
+        self.label = label
+        self.total = total
+        self.stream = stream
+        self.done = done
+        self.clock = clock
+        self.started = self.clock()
+        self.processed = 0
+
+    def update(self, count):
+        """
+        Record that ``count`` more items have been processed.
+        """
+        self.done += count
+        self.processed += count
+        elapsed = self.clock() - self.started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        remaining = ((self.total - self.done) / rate
+                     if rate else 0)
+        minutes, seconds = divmod(int(remaining), 60)
+        hours, minutes = divmod(minutes, 60)
+        self.stream.write('%s: %d/%d (%d%%), %.1f/s, ETA %d:%02d:%02d\r' % (
+            self.label, self.done, self.total,
+            100 * self.done / self.total if self.total else 100,
+            rate, hours, minutes, seconds))
+        self.stream.flush()
+
+    def finish(self):
+        self.stream.write('\n')
+        self.stream.flush()
@@ -0,0 +1,263 @@
+import time
+import socket
+import threading
+
+from elasticgit.utils import fqcn
+from elasticgit.layout import parse_path
+
+
+class NullTimer(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class NullInstrumentation(object):
+    """
+    The default instrumentation, which records nothing.
+
+    >>> from elasticgit.instrumentation import NullInstrumentation
+    >>> instrumentation = NullInstrumentation()
+    >>> with instrumentation.timer('store_data', model='foo'):
+    ...     pass
+    ...
+    >>>
+
+    """
+
+    def timer(self, operation, **tags):
+        return NULL_TIMER
+
+
+#: The shared no-op instrumentation used when none is configured.
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def path_model(repo_path):
+    info = parse_path(repo_path)
+    if info is None:
+        return None
+    return info[0]
+
+
+def format_tag(value):
+    if isinstance(value, type):
+        return fqcn(value)
+    if callable(value):
+        value = value()
+    if isinstance(value, (list, tuple)):
+        return ','.join(map(str, value))
+    return str(value)
+
+
+class Timer(object):
+
+    def __init__(self, instrumentation, operation, tags):
+        self.instrumentation = instrumentation
+        self.operation = operation
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # NOTE: GeneratorExit means a timed generator was not consumed
+        #       completely, that is not an error.
+        self.instrumentation.emit(
+            self.operation, time.time() - self.start, self.tags,
+            exc_type is not None and not issubclass(exc_type, GeneratorExit))
+        return False
+
+
+class Instrumentation(object):
+    """
+    Times operations and calls the subscribed callbacks with
+    ``(operation, duration, tags, error)`` after each one. ``tags`` is a
+    dictionary of strings like ``{'model': 'foo.Bar', 'index': 'baz'}``
+    and ``error`` is whether the operation raised an exception.
+
+    >>> from elasticgit.instrumentation import Instrumentation
+    >>> events = []
+    >>> instrumentation = Instrumentation()
+    >>> @instrumentation.subscribe
+    ... def callback(operation, duration, tags, error):
+    ...     events.append((operation, tags, error))
+    ...
+    >>> with instrumentation.timer('get_data', index='master'):
+    ...     pass
+    ...
+    >>> events
+    [('get_data', {'index': 'master'}, False)]
+    >>>
+
+    :param list callbacks:
+        The callbacks to subscribe.
+    """
+
+    def __init__(self, callbacks=()):
+        self.callbacks = list(callbacks)
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.callbacks.remove(callback)
+
+    def timer(self, operation, **tags):
+        """
+        Return a context manager timing an operation.
+
+        :param str operation:
+            The name of the operation, like ``store_data``.
+        :param tags:
+            Tags to record the timing with. Model classes are turned into
+            their fully qualified class names, callables are only called
+            when the timing is recorded and a ``path`` tag is turned into
+            a ``model`` tag for the model the path is for.
+        """
+        return Timer(self, operation, tags)
+
+    def emit(self, operation, duration, tags, error):
+        if 'path' in tags:
+            tags = dict(tags)
+            tags.setdefault('model', path_model(tags.pop('path')))
+        tags = dict((key, format_tag(value))
+                    for key, value in tags.items() if value is not None)
+        for callback in self.callbacks:
+            callback(operation, duration, tags, error)
+
+
+class MetricsCollector(object):
+    """
+    An :py:class:`Instrumentation` callback aggregating counts and
+    timings per operation and tags, which can be rendered for statsd or
+    Prometheus.
+
+    >>> from elasticgit.instrumentation import (
+    ...     Instrumentation, MetricsCollector)
+    >>> collector = MetricsCollector()
+    >>> instrumentation = Instrumentation([collector])
+    >>> collector('index', 0.5, {'model': 'foo.Bar'}, False)
+    >>> print collector.prometheus()
+    # TYPE elasticgit_operation_seconds summary
+    elasticgit_operation_seconds_count{model="foo.Bar",operation="index"} 1
+    elasticgit_operation_seconds_sum{model="foo.Bar",operation="index"} 0.5
+    # TYPE elasticgit_operation_errors_total counter
+    elasticgit_operation_errors_total{model="foo.Bar",operation="index"} 0
+    >>>
+
+    :param str prefix:
+        The prefix for the metric names.
+    """
+
+    def __init__(self, prefix='elasticgit'):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.metrics = {}
+
+    def __call__(self, operation, duration, tags, error):
+        key = (operation, tuple(sorted(tags.items())))
+        with self.lock:
+            metric = self.metrics.get(key)
+            if metric is None:
+                metric = self.metrics[key] = {
+                    'count': 0,
+                    'errors': 0,
+                    'total': 0.0,
+                    'min': duration,
+                    'max': duration,
+                }
+            metric['count'] += 1
+            metric['errors'] += int(error)
+            metric['total'] += duration
+            metric['min'] = min(metric['min'], duration)
+            metric['max'] = max(metric['max'], duration)
+
+    def stats(self):
+        """
+        Return the aggregated metrics.
+
+        :returns:
+            A list of ``(operation, tags, metric)`` tuples, ``metric``
+            is a dictionary with ``count``, ``errors``, ``total``, ``min``
+            and ``max`` keys.
+        """
+        with self.lock:
+            return [(operation, dict(tags), dict(metric))
+                    for (operation, tags), metric
+                    in sorted(self.metrics.items())]
+
+    def reset(self):
+        with self.lock:
+            self.metrics.clear()
+
+    def statsd(self):
+        """
+        Render the metrics as statsd lines, with the tags in the
+        DogStatsD format.
+
+        :returns: list
+        """
+        lines = []
+        for operation, tags, metric in self.stats():
+            suffix = ('|#%s' % (','.join(
+                '%s:%s' % item for item in sorted(tags.items())),)
+                if tags else '')
+            name = '%s.%s' % (self.prefix, operation)
+            lines.extend([
+                '%s.count:%d|c%s' % (name, metric['count'], suffix),
+                '%s.errors:%d|c%s' % (name, metric['errors'], suffix),
+                '%s.time:%d|ms%s' % (
+                    name, round(metric['total'] * 1000), suffix),
+            ])
+        return lines
+
+    def send_statsd(self, host='localhost', port=8125):
+        """
+        Send the metrics to a statsd server over UDP and reset them.
+        """
+        lines = self.statsd()
+        self.reset()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for line in lines:
+                sock.sendto(line, (host, port))
+        finally:
+            sock.close()
+
+    def prometheus(self):
+        """
+        Render the metrics in the Prometheus text exposition format.
+
+        :returns: str
+        """
+        def labels(operation, tags):
+            items = sorted(tags.items() + [('operation', operation)])
+            return ','.join('%s="%s"' % (
+                key, value.replace('\\', '\\\\').replace('"', '\\"'))
+                for key, value in items)
+
+        stats = self.stats()
+        seconds = '%s_operation_seconds' % (self.prefix,)
+        errors = '%s_operation_errors_total' % (self.prefix,)
+        lines = ['# TYPE %s summary' % (seconds,)]
+        for operation, tags, metric in stats:
+            lines.extend([
+                '%s_count{%s} %d' % (
+                    seconds, labels(operation, tags), metric['count']),
+                '%s_sum{%s} %r' % (
+                    seconds, labels(operation, tags), metric['total']),
+            ])
+        lines.append('# TYPE %s counter' % (errors,))
+        for operation, tags, metric in stats:
+            lines.append('%s{%s} %d' % (
+                errors, labels(operation, tags), metric['errors']))
+        return '\n'.join(lines)
@@ -8,6 +8,12 @@ class IStorageManager(Interface):
         Return the name of the currently active branch
         """
 
+    def head_sha():
+        """
+        Return the SHA of the commit the repository is at or ``None``
+        if unknown.
+        """
+
     def write_config(section, data):
         """
         Write a config block for a git repository.
@@ -41,18 +47,23 @@ class IStorageManager(Interface):
         Destroy the repository's working dir.
         """
 
-    def iterate(model_class):
+    def iterate(model_class, only=None, at=None):
         """
         This loads all known instances of this model from Git
         because we need to know how to re-populate Elasticsearch.
 
         :param elasticgit.models.Model model_class:
             The class to look for instances of.
+        :param list only:
+            Optionally only load these fields, returning partial
+            read only model instances.
+        :param str at:
+            Optionally the commit to load the instances at.
 
         :returns: generator
         """
 
-    def get(model_class, uuid):
+    def get(model_class, uuid, at=None):
         """
         Get a model instance by loading the data from git and constructing
         the model_class
@@ -61,10 +72,27 @@ class IStorageManager(Interface):
             The model class of which an instance to return
         :param str uuid:
             The uuid for the object to retrieve
+        :param str at:
+            Optionally the commit to get the instance at.
         :returns:
             :py:class:elasticgit.models.Model
         """
 
+    def get_many(model_class, uuids, at=None):
+        """
+        Get several model instances of the same class at once.
+
+        :param elasticgit.models.Model model_class:
+            The model class of which instances to return
+        :param list uuids:
+            The uuids of the objects to retrieve
+        :param str at:
+            Optionally the commit to get the instances at.
+        :returns:
+            list of :py:class:elasticgit.models.Model, in the order of
+            the uuids.
+        """
+
     def store(model, message, author=None, committer=None):
         """
         Store an instance's data in Git.
@@ -80,7 +108,37 @@ class IStorageManager(Interface):
             The committer information (name, email address).
             Defaults to the author if unspecified.
         :returns:
-            The commit.
+            The commit or ``None`` if the instance is already stored
+            with the same data.
+        """
+
+    def store_many(models, message, author=None, committer=None):
+        """
+        Store several instances' data in Git in a single commit.
+
+        :param iterable models:
+            The model instances, consumed one at a time.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if there were no models or all of them
+            are already stored with the same data.
+        """
+
+    def changed_models(models):
+        """
+        Return the instances whose data differs from what is stored,
+        the ones :py:func:`store` and :py:func:`store_many` would write.
+
+        :param iterable models:
+            The model instances.
+        :returns: list
         """
 
     def store_data(repo_path, data, message,
@@ -122,6 +180,28 @@ class IStorageManager(Interface):
             The commit.
         """
 
+    def delete_many(model_class, uuids, message, author=None,
+                    committer=None):
+        """
+        Delete several instances of a model class from Git in a single
+        commit.
+
+        :param elasticgit.models.Model model_class:
+        :param list uuids:
+            The UUIDs of the instances to delete, UUIDs without an
+            instance in the repository are skipped.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if there was nothing to delete.
+        """
+
     def delete_data(repo_path, message,
                     author=None, committer=None):
         """
@@ -0,0 +1,97 @@
+#: Every object of a model class in one directory,
+#: ``module/Class/<uuid>.json``.
+FLAT = 'flat'
+#: Objects spread over two levels of directories named after the
+#: first four characters of their UUIDs, ``module/Class/ab/cd/<uuid>.json``.
+#: This keeps the tree objects Git rewrites for every commit small for
+#: model classes with many objects.
+SHARDED = 'sharded'
+
+LAYOUTS = (FLAT, SHARDED)
+
+#: The file in a repository that names its layout, committed along with
+#: the data so clones use the same layout. Without it the layout is
+#: :py:data:`FLAT`.
+LAYOUT_FILE = '.elasticgit/layout'
+
+
+def shards(uuid):
+    """
+    Return the directory names an object is put in with the sharded
+    layout.
+
+    >>> from elasticgit.layout import shards
+    >>> shards('abcdef')
+    ['ab', 'cd']
+    >>>
+
+    """
+    return [uuid[0:2], uuid[2:4]]
+
+
+def object_path(model_dir, uuid, suffix, layout=FLAT):
+    """
+    Return the path of an object in a repository.
+
+    :param str model_dir:
+        The directory of the object's model class.
+    :param str uuid:
+        The object's UUID.
+    :param str suffix:
+        The file name suffix for the serializer used.
+    :param str layout:
+        One of :py:data:`LAYOUTS`. UUIDs shorter than four characters
+        are always stored with the flat layout.
+    :returns: str
+
+    >>> from elasticgit.layout import object_path, SHARDED
+    >>> object_path('foo/Bar', 'abcdef', 'json')
+    'foo/Bar/abcdef.json'
+    >>> object_path('foo/Bar', 'abcdef', 'json', layout=SHARDED)
+    'foo/Bar/ab/cd/abcdef.json'
+    >>>
+
+    """
+    file_name = '%s.%s' % (uuid, suffix)
+    if layout == SHARDED and len(uuid) >= 4:
+        return '/'.join([model_dir] + shards(uuid) + [file_name])
+    return '/'.join([model_dir, file_name])
+
+
+def parse_path(file_path):
+    """
+    Split the path of an object in either layout into the class path of
+    its model class and its UUID.
+
+    :param str file_path:
+    :returns:
+        A ``(class_path, uuid)`` tuple or ``None`` if the path does not
+        look like the path of an object.
+
+    >>> from elasticgit.layout import parse_path
+    >>> parse_path('foo/Bar/abcdef.json')
+    ('foo.Bar', 'abcdef')
+    >>> parse_path('foo/Bar/ab/cd/abcdef.json')
+    ('foo.Bar', 'abcdef')
+    >>> parse_path('foo/Bar/xx/yy/abcdef.json')
+    >>> parse_path('README.md')
+    >>>
+
+    """
+    parts = file_path.split('/')
+    if len(parts) == 3:
+        module_name, class_name, file_name = parts
+        shard_names = None
+    elif len(parts) == 5:
+        module_name, class_name = parts[:2]
+        shard_names, file_name = parts[2:4], parts[4]
+    else:
+        return None
+
+    name_parts = file_name.split('.')
+    if len(name_parts) != 2:
+        return None
+    uuid = name_parts[0]
+    if shard_names is not None and shard_names != shards(uuid):
+        return None
+    return '%s.%s' % (module_name, class_name), uuid
@@ -0,0 +1,874 @@
+import os
+import re
+import json
+import threading
+
+from elasticgit.search import ReadWriteModelMappingType, index_name
+from elasticgit.utils import projected_fields
+from elasticgit.instrumentation import NULL_INSTRUMENTATION
+
+
+class LocalIndexException(Exception):
+    pass
+
+
+def analyze(value):
+    """
+    A rough approximation of Elasticsearch's ``standard`` analyzer,
+    lowercases text and splits it into word tokens.
+
+    :param str value:
+    :returns: list
+
+    >>> from elasticgit.localindex import analyze
+    >>> analyze('Foo Bar-baz')
+    [u'foo', u'bar', u'baz']
+    >>>
+
+    """
+    if isinstance(value, str):
+        value = value.decode('utf-8')
+    return re.findall(r'\w+', value.lower(), re.UNICODE)
+
+
+def get_value(source, field):
+    """
+    Get a possibly dotted field from a document.
+
+    :param dict source:
+    :param str field:
+
+    >>> from elasticgit.localindex import get_value
+    >>> get_value({'a': {'b': 1}}, 'a.b')
+    1
+    >>> get_value({'a': 1}, 'b') is None
+    True
+    >>>
+
+    """
+    value = source
+    for part in field.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def is_analyzed(mapping):
+    return (mapping.get('type', 'string') == 'string' and
+            mapping.get('index') != 'not_analyzed')
+
+
+def coerce(mapping, value):
+    """
+    Coerce a value given in a query to the type the field is mapped as.
+    """
+    if value is None:
+        return value
+    field_type = mapping.get('type', 'string')
+    try:
+        if field_type in ('integer', 'long', 'short', 'byte'):
+            return int(value)
+        if field_type in ('float', 'double'):
+            return float(value)
+    except (ValueError, TypeError):
+        raise LocalIndexException(
+            'Cannot use %r with a field of type %s.' % (value, field_type))
+    if field_type == 'boolean' and isinstance(value, basestring):
+        return value.strip().lower() not in ('false', '0', '')
+    return value
+
+
+def field_terms(mapping, value):
+    """
+    Return the terms a value is indexed as for the inverted index.
+    """
+    if value is None or mapping.get('index') == 'no':
+        return []
+    if isinstance(value, (list, tuple)):
+        terms = []
+        for item in value:
+            terms.extend(field_terms(mapping, item))
+        return terms
+    if isinstance(value, dict):
+        return []
+    if isinstance(value, basestring) and is_analyzed(mapping):
+        return analyze(value)
+    return [value]
+
+
+class LocalIndex(object):
+    """
+    An in-process inverted index over documents, persisted as a JSON
+    snapshot plus an append only journal of changes made since the
+    snapshot was written.
+
+    Only a single process should write to an index, any number of
+    processes can read from it and will pick up the changes written.
+
+    :param str path:
+        The path of the snapshot file, the journal lives next to it.
+    """
+
+    #: The size in bytes at which the journal is compacted into a
+    #: fresh snapshot.
+    journal_size = 4 * 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = '%s.journal' % (path,)
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.mappings = {}
+        self.documents = {}
+        self.terms = {}
+        self.snapshot_mtime = None
+        self.journal_offset = 0
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def create(self):
+        with self.lock:
+            self.reset()
+            self.write_snapshot()
+
+    def destroy(self):
+        with self.lock:
+            for path in [self.path, self.journal_path]:
+                if os.path.isfile(path):
+                    os.unlink(path)
+            self.reset()
+
+    def load(self):
+        """
+        Bring the in-memory index up to date with what is on disk.
+        """
+        with self.lock:
+            if not self.exists():
+                raise LocalIndexException('Index %s does not exist.' % (
+                    self.path,))
+
+            mtime = os.path.getmtime(self.path)
+            if mtime != self.snapshot_mtime:
+                self.reset()
+                with open(self.path, 'r') as fp:
+                    snapshot = json.load(fp)
+                self.snapshot_mtime = mtime
+                for doc_type, properties in snapshot['mappings'].items():
+                    self.mappings[doc_type] = properties
+                for doc_type, documents in snapshot['documents'].items():
+                    for doc_id, doc in documents.items():
+                        self.add(doc_type, doc_id, doc)
+
+            if not os.path.isfile(self.journal_path):
+                return
+
+            if os.path.getsize(self.journal_path) < self.journal_offset:
+                # NOTE: the journal was compacted into a snapshot since
+                #       it was last read, start over from that snapshot.
+                self.snapshot_mtime = None
+                return self.load()
+
+            with open(self.journal_path, 'r') as fp:
+                fp.seek(self.journal_offset)
+                for line in iter(fp.readline, ''):
+                    if not line.endswith('\n'):
+                        # partially written entry, read it next time.
+                        break
+                    self.replay(json.loads(line))
+                    self.journal_offset = fp.tell()
+
+    def replay(self, entry):
+        if entry['op'] == 'index':
+            self.add(entry['type'], entry['id'], entry['doc'])
+        elif entry['op'] == 'delete':
+            self.remove(entry['type'], entry['id'])
+        elif entry['op'] == 'mapping':
+            self.put_mapping(entry['type'], entry['properties'])
+
+    def write(self, entry):
+        with self.lock:
+            self.load()
+            self.replay(entry)
+            with open(self.journal_path, 'a') as fp:
+                fp.write('%s\n' % (json.dumps(entry),))
+                self.journal_offset = fp.tell()
+            if self.journal_offset > self.journal_size:
+                self.write_snapshot()
+
+    def write_snapshot(self):
+        """
+        Write all documents to the snapshot and truncate the journal.
+        """
+        with self.lock:
+            dir_name = os.path.dirname(self.path)
+            if not os.path.isdir(dir_name):
+                os.makedirs(dir_name)
+            tmp_path = '%s.tmp' % (self.path,)
+            with open(tmp_path, 'w') as fp:
+                json.dump({
+                    'mappings': self.mappings,
+                    'documents': self.documents,
+                }, fp)
+            os.rename(tmp_path, self.path)
+            with open(self.journal_path, 'w'):
+                pass
+            self.snapshot_mtime = os.path.getmtime(self.path)
+            self.journal_offset = 0
+
+    def get_properties(self, doc_type):
+        return self.mappings.get(doc_type, {})
+
+    def put_mapping(self, doc_type, properties):
+        self.mappings[doc_type] = properties
+        documents = self.documents.get(doc_type, {})
+        self.terms[doc_type] = {}
+        for doc_id, doc in documents.items():
+            self.add_terms(doc_type, doc_id, doc)
+
+    def add(self, doc_type, doc_id, doc):
+        self.remove(doc_type, doc_id)
+        self.documents.setdefault(doc_type, {})[doc_id] = doc
+        self.add_terms(doc_type, doc_id, doc)
+
+    def add_terms(self, doc_type, doc_id, doc):
+        properties = self.get_properties(doc_type)
+        type_terms = self.terms.setdefault(doc_type, {})
+        for field, value in doc.items():
+            field_index = type_terms.setdefault(field, {})
+            for term in field_terms(properties.get(field, {}), value):
+                field_index.setdefault(term, set([])).add(doc_id)
+
+    def remove(self, doc_type, doc_id):
+        doc = self.documents.get(doc_type, {}).pop(doc_id, None)
+        if doc is None:
+            return False
+        type_terms = self.terms.get(doc_type, {})
+        properties = self.get_properties(doc_type)
+        for field, value in doc.items():
+            field_index = type_terms.get(field, {})
+            for term in field_terms(properties.get(field, {}), value):
+                ids = field_index.get(term)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del field_index[term]
+        return True
+
+    def lookup(self, doc_type, field, terms):
+        """
+        Return the ids of the documents with any of the given terms
+        for the field.
+        """
+        field_index = self.terms.get(doc_type, {}).get(field, {})
+        ids = set([])
+        for term in terms:
+            ids.update(field_index.get(term, ()))
+        return ids
+
+    def count(self, doc_type):
+        return len(self.documents.get(doc_type, {}))
+
+
+class LocalIndexManager(object):
+    """
+    A drop-in replacement for :py:class:`elasticgit.search.ESManager`
+    that keeps an in-process inverted index persisted in the
+    repository's ``.git`` directory rather than using Elasticsearch.
+
+    :param elasticgit.storage.StorageManager storage_manager:
+        The storage manager of the repository to index.
+    :param str index_prefix:
+        The prefix to use when generating index names.
+    """
+
+    #: The :py:class:`elasticgit.instrumentation.Instrumentation` to use.
+    instrumentation = NULL_INSTRUMENTATION
+
+    def __init__(self, storage_manager, index_prefix):
+        self.sm = storage_manager
+        self.es = None
+        self.index_prefix = index_prefix
+        self.indexes = {}
+        self.lock = threading.Lock()
+
+    def get_mapping_type(self, model_class):
+        return ReadWriteModelMappingType.subclass(
+            im=self,
+            sm=self.sm,
+            model_class=model_class)
+
+    def index_name(self, name, model_class=None):
+        """
+        Generate an index name using given name and prefixing
+        it with the ``index_prefix``. Local indexes always keep every
+        model class in one index.
+
+        :param str name:
+            The name to use for the index.
+        :param elasticgit.models.Model model_class:
+        """
+        return index_name(self.index_prefix, name)
+
+    def get_index(self, name):
+        index_name = self.index_name(name)
+        with self.lock:
+            if index_name not in self.indexes:
+                self.indexes[index_name] = LocalIndex(
+                    self.sm.private_path(
+                        'local-index', '%s.json' % (index_name,)))
+            return self.indexes[index_name]
+
+    def loaded_index(self, name):
+        index = self.get_index(name)
+        index.load()
+        return index
+
+    def writable_index(self, name):
+        """
+        Return the loaded index, creating it first if it does not exist
+        yet, like Elasticsearch does when an index is first written to.
+
+        :param str name:
+        """
+        index = self.get_index(name)
+        with index.lock:
+            if not index.exists():
+                index.create()
+            index.load()
+        return index
+
+    def index_exists(self, name, model_class=None):
+        """
+        Check if the index already exists
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+            Ignored, the local index keeps every model class in one index.
+        :returns: bool
+        """
+        return self.get_index(name).exists()
+
+    def create_index(self, name, model_class=None):
+        """
+        Creates the index
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+            Ignored, the local index keeps every model class in one index.
+        """
+        return self.get_index(name).create()
+
+    def destroy_index(self, name, model_class=None):
+        """
+        Destroys the index
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+            Ignored, the local index keeps every model class in one index.
+        """
+        return self.get_index(name).destroy()
+
+    def index_status(self, name, model_class=None):
+        """
+        Get an index status
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+            Ignored, the local index keeps every model class in one index.
+        """
+        index = self.loaded_index(name)
+        return {
+            'docs': {
+                'num_docs': sum([index.count(doc_type)
+                                 for doc_type in index.documents]),
+            },
+        }
+
+    def index_ready(self, name, model_class=None):
+        """
+        Check if an index is ready for use.
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+            Ignored, the local index keeps every model class in one index.
+        :returns: bool
+        """
+        return self.index_exists(name)
+
+    def get_properties(self, model_class):
+        MappingType = self.get_mapping_type(model_class)
+        return MappingType.get_mapping()['properties']
+
+    def index(self, model, refresh_index=False):
+        """
+        Index a :py:class:`elasticgit.models.Model` instance
+
+        :param elasticgit.models.Model model:
+            The model instance
+        :param bool refresh_index:
+            Whether or not to write a fresh snapshot of the index.
+        :returns:
+            :py:class:`elasticgit.models.Model`
+        """
+        name = self.sm.active_branch()
+        with self.instrumentation.timer(
+                'index', model=model.__class__, index=self.index_name(name)):
+            index = self.writable_index(name)
+            MappingType = self.get_mapping_type(model.__class__)
+            doc_type = MappingType.get_mapping_type_name()
+            if doc_type not in index.mappings:
+                index.write({
+                    'op': 'mapping',
+                    'type': doc_type,
+                    'properties': self.get_properties(model.__class__),
+                })
+            index.write({
+                'op': 'index',
+                'type': doc_type,
+                'id': model.uuid,
+                'doc': MappingType.extract_document(model.uuid, model),
+            })
+            if refresh_index:
+                self.refresh_indices(name)
+        return model
+
+    def bulk_index(self, model_class, models, refresh_index=False):
+        """
+        Index several :py:class:`elasticgit.models.Model` instances of the
+        same class.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param list models:
+            The model instances
+        :param bool refresh_index:
+            Whether or not to write a fresh snapshot of the index.
+        :returns:
+            list of :py:class:`elasticgit.models.Model`
+        """
+        name = self.sm.active_branch()
+        with self.instrumentation.timer(
+                'bulk_index', model=model_class, index=self.index_name(name)):
+            for model in models:
+                self.index(model)
+            if refresh_index:
+                self.refresh_indices(name)
+        return models
+
+    def raw_unindex(self, model_class, uuid, refresh_index=False):
+        """
+        Remove an entry from the index.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param str uuid:
+            The model's UUID
+        :param bool refresh_index:
+            Whether or not to write a fresh snapshot of the index.
+        """
+        name = self.sm.active_branch()
+        with self.instrumentation.timer(
+                'raw_unindex', model=model_class,
+                index=self.index_name(name)):
+            MappingType = self.get_mapping_type(model_class)
+            self.writable_index(name).write({
+                'op': 'delete',
+                'type': MappingType.get_mapping_type_name(),
+                'id': uuid,
+            })
+            if refresh_index:
+                self.refresh_indices(name)
+
+    def bulk_unindex(self, model_class, uuids, refresh_index=False):
+        """
+        Remove several entries of the same model class from the index.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param list uuids:
+            The models' UUIDs
+        :param bool refresh_index:
+            Whether or not to write a fresh snapshot of the index.
+        :returns:
+            A dictionary of UUIDs to ``deleted`` or ``not_found``.
+        """
+        name = self.sm.active_branch()
+        doc_type = self.get_mapping_type(model_class).get_mapping_type_name()
+        statuses = {}
+        with self.instrumentation.timer(
+                'bulk_unindex', model=model_class,
+                index=self.index_name(name)):
+            index = self.writable_index(name)
+            for uuid in uuids:
+                statuses[uuid] = (
+                    'deleted' if uuid in index.documents.get(doc_type, {})
+                    else 'not_found')
+                index.write({'op': 'delete', 'type': doc_type, 'id': uuid})
+            if refresh_index:
+                self.refresh_indices(name)
+        return statuses
+
+    def unindex(self, model, refresh_index=False):
+        """
+        Remove a :py:class:`elasticgit.models.Model` instance from the
+        index.
+
+        :param elasticgit.models.Model model:
+            The model instance
+        :param bool refresh_index:
+            Whether or not to write a fresh snapshot of the index.
+        :returns:
+            :py:class:`elasticgit.models.Model`
+        """
+        self.raw_unindex(
+            model.__class__, model.uuid, refresh_index=refresh_index)
+        return model
+
+    def refresh_indices(self, name):
+        """
+        Write a fresh snapshot of the index, compacting the journal.
+
+        :param str name:
+        """
+        index = self.loaded_index(name)
+        index.write_snapshot()
+
+    def setup_mapping(self, name, model_class):
+        """
+        Specify a mapping for a model class in a specific index
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+        :returns: dict
+        """
+        MappingType = self.get_mapping_type(model_class)
+        return self.setup_custom_mapping(
+            name, model_class, MappingType.get_mapping())
+
+    def setup_custom_mapping(self, name, model_class, mapping):
+        """
+        Specify a mapping for a model class in a specific index
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+        :param dict mapping: The Elasticsearch style mapping definition
+        :returns: dict
+        """
+        MappingType = self.get_mapping_type(model_class)
+        self.writable_index(name).write({
+            'op': 'mapping',
+            'type': MappingType.get_mapping_type_name(),
+            'properties': mapping['properties'],
+        })
+        return {'acknowledged': True}
+
+    def get_mapping(self, name, model_class):
+        """
+        Retrieve a mapping for a model class in a specific index
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+        :returns: dict
+        """
+        MappingType = self.get_mapping_type(model_class)
+        index = self.loaded_index(name)
+        doc_type = MappingType.get_mapping_type_name()
+        if doc_type not in index.mappings:
+            raise LocalIndexException('No mapping for %s in %s.' % (
+                doc_type, self.index_name(name)))
+        return {'properties': index.mappings[doc_type]}
+
+
+class LocalMetadata(object):
+    """
+    Mirrors the ``es_meta`` of Elasticsearch search results.
+    """
+
+    def __init__(self, id, index, type, score):
+        self.id = id
+        self.index = index
+        self.type = type
+        self.score = score
+
+
+class LocalSearchResult(object):
+    """
+    A search hit from a :py:class:`LocalS` search, exposes the same
+    interface as the mapping types returned by
+    :py:class:`elasticgit.search.S`.
+    """
+
+    def __init__(self, mapping_type, source, es_meta, projection=None):
+        self._mapping_type = mapping_type
+        self._results_dict = source
+        self._id = es_meta.id
+        self.es_meta = es_meta
+        self.projection = projection
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._results_dict[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_object(self):
+        model_class = self._mapping_type.model_class
+        obj = model_class(
+            self._results_dict, es_meta=self.es_meta,
+            partial=self.projection)
+        obj.set_read_only()  # might not be in sync with Git
+        return obj
+
+    def get_object(self):
+        return self._mapping_type.sm.get(
+            self._mapping_type.model_class, self._id)
+
+
+class LocalS(object):
+    """
+    A subset of the :py:class:`elasticgit.search.S` API that searches a
+    :py:class:`LocalIndexManager` index.
+
+    Supported are keyword filters & queries for terms and the
+    ``in``, ``gt``, ``gte``, ``lt``, ``lte``, ``prefix``, ``match``
+    and ``term`` actions, ``order_by``, ``only``, slicing, ``count``
+    and ``everything``. As with Elasticsearch only the first 10 hits
+    are returned unless sliced.
+
+    :param elasticgit.search.ReadWriteModelMappingType type_:
+        The mapping type for the model class to search.
+    """
+
+    default_size = 10
+    instrumentation = NULL_INSTRUMENTATION
+
+    def __init__(self, type_):
+        self.type = type_
+        self.steps = []
+        self.start = 0
+        self.stop = None
+        self._results_cache = None
+
+    def _clone(self, next_step=None):
+        new = self.__class__(self.type)
+        new.steps = list(self.steps)
+        if next_step:
+            new.steps.append(next_step)
+        new.start = self.start
+        new.stop = self.stop
+        new.instrumentation = self.instrumentation
+        return new
+
+    def es(self, **settings):
+        return self._clone()
+
+    def cache(self, query_cache):
+        return self._clone()
+
+    def instrument(self, instrumentation):
+        new = self._clone()
+        new.instrumentation = instrumentation
+        return new
+
+    def filter(self, *filters, **kwargs):
+        if filters:
+            raise LocalIndexException(
+                'Only keyword filters are supported by local indexes.')
+        return self._clone(next_step=('filter', kwargs.items()))
+
+    def query(self, *queries, **kwargs):
+        if queries:
+            raise LocalIndexException(
+                'Only keyword queries are supported by local indexes.')
+        return self._clone(next_step=('query', kwargs.items()))
+
+    def order_by(self, *fields):
+        return self._clone(next_step=('order_by', fields))
+
+    def only(self, *fields):
+        return self._clone(next_step=('only', fields))
+
+    def get_projection(self):
+        fields = None
+        for action, value in self.steps:
+            if action == 'only':
+                fields = value
+        if fields is None:
+            return None
+        return projected_fields(self.type.model_class, fields)
+
+    def get_index(self):
+        return self.type.im.loaded_index(self.type.sm.active_branch())
+
+    def match_clause(self, index, doc_type, key, value, scores):
+        properties = index.get_properties(doc_type)
+        field, _, action = key.partition('__')
+        action = action or 'term'
+        mapping = properties.get(field, {})
+        documents = index.documents.get(doc_type, {})
+
+        if action == 'term':
+            return index.lookup(doc_type, field, [coerce(mapping, value)])
+        if action == 'in':
+            return index.lookup(
+                doc_type, field, [coerce(mapping, v) for v in value])
+        if action == 'match':
+            terms = (analyze(value)
+                     if is_analyzed(mapping)
+                     else [coerce(mapping, value)])
+            ids = set([])
+            for term in terms:
+                matches = index.lookup(doc_type, field, [term])
+                for doc_id in matches:
+                    scores[doc_id] = scores.get(doc_id, 0) + 1
+                ids.update(matches)
+            return ids
+        if action == 'prefix':
+            field_index = index.terms.get(doc_type, {}).get(field, {})
+            return index.lookup(doc_type, field, [
+                term for term in field_index
+                if isinstance(term, basestring) and term.startswith(value)])
+        if action in ('gt', 'gte', 'lt', 'lte'):
+            compare = {
+                'gt': lambda a, b: a > b,
+                'gte': lambda a, b: a >= b,
+                'lt': lambda a, b: a < b,
+                'lte': lambda a, b: a <= b,
+            }[action]
+            value = coerce(mapping, value)
+            return set([
+                doc_id for doc_id, doc in documents.items()
+                if (get_value(doc, field) is not None and
+                    compare(get_value(doc, field), value))])
+        raise LocalIndexException(
+            'Unsupported action %r for local indexes.' % (action,))
+
+    def _do_search(self):
+        if self._results_cache is None:
+            with self.instrumentation.timer(
+                    'search', model=self.type.model_class,
+                    index=self.type.get_index):
+                self._results_cache = self._search()
+        return self._results_cache
+
+    def _search(self):
+        index = self.get_index()
+        with index.lock:
+            hits, scores = self._hits(index)
+            stop = (self.stop
+                    if self.stop is not None
+                    else self.start + self.default_size)
+            return len(hits), self._results(
+                index, hits[self.start:stop], scores)
+
+    def _hits(self, index):
+        """
+        Return the ids of the matching documents in order and their
+        scores. The index's lock must be held.
+        """
+        doc_type = self.type.get_mapping_type_name()
+        documents = index.documents.get(doc_type, {})
+        ids = set(documents.keys())
+        scores = {}
+        order_by = []
+        for action, value in self.steps:
+            if action in ('filter', 'query'):
+                for key, clause_value in value:
+                    ids &= self.match_clause(
+                        index, doc_type, key, clause_value, scores)
+            elif action == 'order_by':
+                order_by.extend(value)
+
+        hits = sorted(ids, key=lambda doc_id: (-scores.get(doc_id, 1),
+                                               doc_id))
+        for field in reversed(order_by):
+            reverse = field.startswith('-')
+            field = field.lstrip('-')
+            hits.sort(
+                key=lambda doc_id: get_value(documents[doc_id], field),
+                reverse=reverse)
+        return hits, scores
+
+    def _results(self, index, doc_ids, scores):
+        """
+        Return the search results for documents, skipping the ones
+        removed since they were matched. The index's lock must be held.
+        """
+        doc_type = self.type.get_mapping_type_name()
+        documents = index.documents.get(doc_type, {})
+        projection = self.get_projection()
+        results = []
+        for doc_id in doc_ids:
+            source = documents.get(doc_id)
+            if source is None:
+                continue
+            if projection is not None:
+                source = dict((key, source[key])
+                              for key in projection if key in source)
+            results.append(LocalSearchResult(
+                self.type, source,
+                LocalMetadata(doc_id, index_name(self.type.im.index_prefix,
+                                                 self.type.sm.active_branch()),
+                              doc_type, float(scores.get(doc_id, 1))),
+                projection=projection))
+        return results
+
+    def execute(self):
+        total, results = self._do_search()
+        return results
+
+    def count(self):
+        total, results = self._do_search()
+        return total
+
+    def everything(self):
+        return self[:self.count()].execute()
+
+    def iter_all(self, batch_size=500):
+        """
+        Iterate over all the results of this search. The matching
+        documents are found once, their results are built a batch at
+        a time. Slicing of the search is ignored.
+
+        :param int batch_size:
+            The number of results to build at a time.
+        :returns: generator
+        """
+        index = self.get_index()
+        with self.instrumentation.timer(
+                'search', model=self.type.model_class,
+                index=self.type.get_index):
+            with index.lock:
+                hits, scores = self._hits(index)
+        for start in range(0, len(hits), batch_size):
+            with index.lock:
+                results = self._results(
+                    index, hits[start:start + batch_size], scores)
+            for result in results:
+                yield result
+
+    def get_objects(self):
+        results = self.execute()
+        return self.type.sm.get_many(
+            self.type.model_class, [result._id for result in results])
+
+    def __iter__(self):
+        return iter(self.execute())
+
+    def __len__(self):
+        return len(self.execute())
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            new = self._clone()
+            new.start = (self.start + key.start) if key.start else self.start
+            if key.stop is not None:
+                new.stop = self.start + key.stop
+            return new
+        return self.execute()[key]
@@ -1,13 +1,14 @@
 import sys
-import pkg_resources
 from copy import deepcopy
-from urllib2 import urlparse
+import urlparse
 import uuid
 
 from confmodel.config import Config, ConfigField
 from confmodel.errors import ConfigError
 from confmodel.fallbacks import SingleFieldFallback
 
+from elasticgit.utils import package_version
+
 
 version_info = {
     'language': 'python',
@@ -18,7 +19,7 @@ version_info = {
         sys.version_info.micro,
     ),
     'package': 'elastic-git',
-    'package_version': pkg_resources.require('elastic-git')[0].version
+    'package_version': package_version()
 }
 
 
@@ -225,6 +226,10 @@ class Model(Config):
     :param dict config_data:
         A dictionary with keys & values to populate this Model
         instance with.
+    :param list partial:
+        Optionally the names of the only fields loaded into
+        ``config_data``, see :py:func:`set_partial`. Only these fields
+        are validated, the others are missing rather than invalid.
     """
     _version = DictField(
         'Model Version Identifier',
@@ -250,10 +255,26 @@ class Model(Config):
 
     uuid = UUIDField('Unique Identifier')
 
-    def __init__(self, config_data, static=False, es_meta=None):
-        super(Model, self).__init__(config_data, static=static)
+    def __init__(self, config_data, static=False, es_meta=None,
+                 partial=None):
         self._read_only = False
+        self._partial_fields = (
+            frozenset(partial) if partial is not None else None)
         self.es_meta = es_meta
+        super(Model, self).__init__(config_data, static=static)
+        if partial is not None:
+            self.set_partial(partial)
+
+    def _get_fields(self):
+        """
+        Return the fields :py:class:`confmodel.Config` validates, only
+        the ones loaded for a partial model instance.
+        """
+        fields = super(Model, self)._get_fields()
+        if self._partial_fields is None:
+            return fields
+        return [field for field in fields
+                if field.name in self._partial_fields]
 
     def __eq__(self, other):
         own_data = dict(self)
@@ -264,6 +285,10 @@ class Model(Config):
                 own_version_info == other_version_info)
 
     def update(self, fields, mark_read_only=True):
+        if self.is_partial():
+            raise ConfigError(
+                'Cannot update a partial model, missing fields: %s' % (
+                    ', '.join(self.missing_fields()),))
         model_class = self.__class__
         data = dict(self)
         data.update(fields)
@@ -285,6 +310,33 @@ class Model(Config):
     def is_read_only(self):
         return self._read_only
 
+    def set_partial(self, fields):
+        """
+        Mark this model instance as only having been loaded with a
+        subset of its fields. Partial models are always read only.
+        Returns self to allow it to be chainable.
+
+        :param list fields:
+            The names of the fields that were loaded.
+        :returns: self
+        """
+        self._partial_fields = frozenset(fields)
+        return self.set_read_only()
+
+    def is_partial(self):
+        return self._partial_fields is not None
+
+    def missing_fields(self):
+        """
+        Return the names of the fields that were not loaded for
+        a partial model instance.
+
+        :returns: list
+        """
+        if not self.is_partial():
+            return []
+        return sorted(set(self._fields.keys()) - self._partial_fields)
+
     def __iter__(self):
         for field in self._get_fields():
             yield field.name, field.get_value(self)
@@ -1,5 +1,7 @@
 import os
+import time
 from urllib import quote
+from multiprocessing.pool import ThreadPool
 
 from git import Repo
 
@@ -7,8 +9,10 @@ from elasticutils import (
     MappingType, Indexable, S as SBase,
     ObjectSearchResults, DictSearchResults, ListSearchResults)
 
-from elasticgit.utils import introspect_properties
+from elasticgit.cache import LRUCacheBackend
+from elasticgit.utils import fqcn, introspect_properties, projected_fields
 from elasticgit.storage.remote import RemoteStorageManager
+from elasticgit.instrumentation import NULL_INSTRUMENTATION
 
 
 def index_name(prefix, name):
@@ -26,9 +30,60 @@ def index_name(prefix, name):
     return '-'.join(map(quote, [prefix, name]))
 
 
+class SearchException(Exception):
+    pass
+
+
+#: The field of an Elasticsearch document holding its Git metadata when
+#: :py:class:`ESManager` is created with ``git_metadata=True``.
+GIT_METADATA_FIELD = '_git'
+
+GIT_METADATA_MAPPING = {
+    'type': 'object',
+    'properties': {
+        'blob': {'type': 'string', 'index': 'not_analyzed'},
+        'commit': {'type': 'string', 'index': 'not_analyzed'},
+        'timestamp': {'type': 'date'},
+        'author': {
+            'type': 'object',
+            'properties': {
+                'name': {'type': 'string'},
+                'email': {'type': 'string', 'index': 'not_analyzed'},
+            },
+        },
+    },
+}
+
+
+def model_index_name(prefix, name, model_class):
+    """
+    Generate the name of the Elasticsearch index of a single model class
+    when every model class is indexed separately, see
+    :py:class:`ESManager`. Elasticsearch index names are lower case.
+
+    >>> from elasticgit.search import model_index_name
+    >>> from elasticgit.tests.base import TestPerson
+    >>> model_index_name('prefix', 'master', TestPerson)
+    'prefix-master-elasticgit.tests.base.testperson'
+    >>>
+
+    :param str prefix:
+        The prefix to use for the index.
+    :param str name:
+        The name to use for the index.
+    :param elasticgit.models.Model model_class:
+    :returns: str
+    """
+    return '-'.join(map(quote, [prefix, name, fqcn(model_class).lower()]))
+
+
 class ModelMappingTypeBase(MappingType):
     short_name = 'MappingType'
 
+    #: The fields requested with :py:func:`S.only`, ``None`` if
+    #: the full ``_source`` document was loaded.
+    projection = None
+
     @classmethod
     def get_mapping_type_name(cls):
         model_class = cls.model_class
@@ -43,8 +98,30 @@ class ModelMappingTypeBase(MappingType):
     def get_object(self):
         raise NotImplementedError
 
+    def get_git_metadata(self):
+        """
+        Return the Git metadata of the document, see
+        :py:class:`ESManager`, or ``None`` if it was indexed without.
+
+        :returns: dict
+        """
+        return self._results_dict.get(GIT_METADATA_FIELD)
+
+    @classmethod
+    def get_objects(cls, ids):
+        """
+        Return the objects for several hits at once, in order.
+
+        :param list ids:
+            The ids of the hits.
+        :returns: list
+        """
+        raise NotImplementedError
+
     def to_object(self):
-        obj = self.model_class(self._results_dict, es_meta=self.es_meta)
+        obj = self.model_class(
+            self._results_dict, es_meta=self.es_meta,
+            partial=self.projection)
         obj.set_read_only()  # might not be in sync with Git
         return obj
 
@@ -52,6 +129,26 @@ class ModelMappingTypeBase(MappingType):
     def get_es(cls):
         raise NotImplementedError
 
+    @classmethod
+    def get_index_versions(cls):
+        """
+        Return a mapping of index names to the SHA of the commit
+        the index reflects, ``None`` if unknown.
+
+        :returns: dict
+        """
+        return None
+
+    @classmethod
+    def get_index_per_model(cls):
+        """
+        Return whether every model class has an index of its own,
+        see :py:class:`ESManager`.
+
+        :returns: bool
+        """
+        return False
+
     @classmethod
     def get_mapping(cls):
         return {
@@ -78,6 +175,14 @@ class ReadOnlyModelMappingType(ModelMappingTypeBase):
     def get_es(cls):
         return cls.s.get_es()
 
+    @classmethod
+    def get_index_versions(cls):
+        return cls.s.get_repo_versions()
+
+    @classmethod
+    def get_index_per_model(cls):
+        return cls.s.index_per_model
+
     @classmethod
     def subclass(cls, model_class, s):
         return super(ReadOnlyModelMappingType, cls).subclass(
@@ -89,15 +194,31 @@ class ReadWriteModelMappingType(ModelMappingTypeBase, Indexable):
 
     @classmethod
     def get_index(cls):
-        return cls.im.index_name(cls.sm.active_branch())
+        return cls.im.index_name(cls.sm.active_branch(), cls.model_class)
 
     def get_object(self):
         return self.sm.get(self.model_class, self._id)
 
+    @classmethod
+    def get_objects(cls, ids):
+        return cls.sm.get_many(cls.model_class, ids)
+
     @classmethod
     def get_es(cls):
         return cls.im.es
 
+    @classmethod
+    def get_index_per_model(cls):
+        return getattr(cls.im, 'index_per_model', False)
+
+    @classmethod
+    def get_index_versions(cls):
+        index = cls.get_index()
+        version = cls.im.index_version(index)
+        if version is None:
+            return None
+        return {index: version}
+
     @classmethod
     def extract_document(cls, obj_id, obj=None):
         if obj is None:
@@ -136,11 +257,190 @@ class CustomListSearchResults(SearchResultsMixin, ListSearchResults):
 
 
 class CustomObjectSearchResults(SearchResultsMixin, ObjectSearchResults):
-    pass
+
+    def get_objects(self):
+        """
+        Load the version stored in Git of every hit with one batched
+        read per mapping type, rather than one read per hit with
+        ``get_object``. The models are attached to the hits and
+        are returned by their ``object`` attribute from then on.
+
+        :returns:
+            list of :py:class:`elasticgit.models.Model`, in the order
+            of the hits.
+        """
+        pending = {}
+        for obj in self.objects:
+            if obj._object is None:
+                pending.setdefault(obj.__class__, []).append(obj)
+
+        for mapping_type, objs in pending.items():
+            models = mapping_type.get_objects([obj._id for obj in objs])
+            for obj, model in zip(objs, models):
+                obj._object = model
+        return [obj.object for obj in self.objects]
 
 
 class S(SBase):
 
+    #: The :py:class:`elasticgit.cache.QueryCache` to use, if any.
+    query_cache = None
+    #: The :py:class:`elasticgit.instrumentation.Instrumentation` to use.
+    instrumentation = NULL_INSTRUMENTATION
+    #: Attributes that are carried over when cloning.
+    clone_attributes = ('query_cache', 'instrumentation')
+    #: The response for this search if it was already run by
+    #: :py:func:`msearch`.
+    response = None
+    #: How long Elasticsearch keeps the scroll of :py:func:`S.iter_all`
+    #: alive between two batches.
+    scroll_timeout = '1m'
+
+    def _clone(self, next_step=None):
+        new = super(S, self)._clone(next_step=next_step)
+        self._copy_clone_attributes(new)
+        return new
+
+    def _copy_clone_attributes(self, new):
+        for attr in self.clone_attributes:
+            if attr in self.__dict__:
+                setattr(new, attr, self.__dict__[attr])
+
+    def cache(self, query_cache):
+        """
+        Cache the results of this search in the given query cache.
+        Entries are keyed on the query and the commit SHA of each
+        index queried and so never outlive the data they reflect.
+        Searches of indexes that may not show recent writes yet are
+        not cached.
+
+        :param elasticgit.cache.QueryCache query_cache:
+        :returns: :py:class:`S`
+        """
+        new = self._clone()
+        new.query_cache = query_cache
+        return new
+
+    def instrument(self, instrumentation):
+        """
+        Time the execution of this search with the given instrumentation.
+
+        :param elasticgit.instrumentation.Instrumentation instrumentation:
+        :returns: :py:class:`S`
+        """
+        new = self._clone()
+        new.instrumentation = instrumentation
+        return new
+
+    def get_index_versions(self):
+        """
+        Return a mapping of the indexes queried to the SHA of the
+        commit they reflect, ``None`` if unknown.
+
+        :returns: dict
+        """
+        get_versions = getattr(self.type, 'get_index_versions', None)
+        if get_versions is None:
+            return None
+        return get_versions()
+
+    def raw(self):
+        if self.response is not None:
+            return self.response
+        with self.instrumentation.timer(
+                'search', model=getattr(self.type, 'model_class', None),
+                index=self.get_indexes):
+            return self._raw()
+
+    def _raw(self):
+        if self.query_cache is None:
+            return self._search()
+
+        versions = self.get_index_versions()
+        if versions is None:
+            return self._search()
+
+        key = self.query_cache.make_key(
+            self.build_search(), self.get_indexes(), self.get_doctypes(),
+            versions)
+        return self.query_cache.get_or_search(key, self._search)
+
+    def ignore_unavailable(self):
+        """
+        Whether to skip the indexes that do not exist rather than fail.
+        With an index per model class a model class has no index until
+        it is first written to, searching it finds nothing.
+
+        :returns: bool
+        """
+        return self.type is not None and self.type.get_index_per_model()
+
+    def _search(self):
+        if not self.ignore_unavailable():
+            return super(S, self).raw()
+
+        search = self.build_search()
+        kwargs = {'ignore_unavailable': True}
+        if self.search_type:
+            kwargs['search_type'] = self.search_type
+        return self.get_es().search(
+            body=search, index=self.get_indexes(),
+            doc_type=self.get_doctypes(), **kwargs)
+
+    def iter_all(self, batch_size=500):
+        """
+        Iterate over all the results of this search, fetching them from
+        Elasticsearch in batches with a scroll instead of all at once.
+        Unlike :py:func:`elasticutils.S.everything` this is not limited
+        by the result window of the index and only keeps one batch in
+        memory. The scroll is cleared when the iteration finishes or
+        is abandoned. Slicing of the search is ignored.
+
+        :param int batch_size:
+            The number of results to fetch per request.
+        :returns: generator
+        """
+        s = self._clone()
+        search = s.build_search()
+        search.pop('from', None)
+        search['size'] = batch_size
+        es = s.get_es()
+        model_class = getattr(s.type, 'model_class', None)
+        kwargs = {'ignore_unavailable': True} if s.ignore_unavailable() else {}
+
+        scroll_id = None
+        try:
+            while True:
+                with self.instrumentation.timer(
+                        'scroll', model=model_class, index=s.get_indexes):
+                    if scroll_id is None:
+                        response = es.search(
+                            index=s.get_indexes(), doc_type=s.get_doctypes(),
+                            body=search, scroll=self.scroll_timeout,
+                            **kwargs)
+                    else:
+                        response = es.scroll(
+                            scroll_id=scroll_id, scroll=self.scroll_timeout)
+                scroll_id = response.get('_scroll_id', scroll_id)
+                if not response['hits']['hits']:
+                    break
+                s.response = response
+                s._results_cache = None
+                for result in s.execute():
+                    yield result
+        finally:
+            if scroll_id is not None:
+                es.clear_scroll(scroll_id=scroll_id, ignore=404)
+
+    def get_objects(self):
+        """
+        Load the version stored in Git of every hit of this search,
+        see :py:func:`CustomObjectSearchResults.get_objects`.
+
+        :returns: list of :py:class:`elasticgit.models.Model`
+        """
+        return self.execute().get_objects()
+
     def to_python(self, obj):
         """
         Override `PythonMixin.to_python` to skip in-place datetime conversion.
@@ -150,6 +450,59 @@ class S(SBase):
         """
         return obj
 
+    def only(self, *fields):
+        """
+        Only load the given fields from the ``_source`` of the documents
+        in Elasticsearch. Models returned by
+        :py:func:`ModelMappingTypeBase.to_object` are then partial
+        and read only, see :py:func:`elasticgit.models.Model.set_partial`.
+
+        :param str fields:
+            The names of the fields to load. ``uuid`` is always loaded.
+        :returns: :py:class:`S`
+        """
+        return self._clone(next_step=('only', fields))
+
+    def get_projection(self):
+        """
+        Returns the list of fields requested with :py:func:`only`
+        or ``None`` if the full documents are to be loaded.
+
+        :returns: list
+        """
+        fields = None
+        for action, value in self.steps:
+            if action == 'only':
+                fields = value
+        if fields is None:
+            return None
+        return projected_fields(self.type.model_class, fields)
+
+    def build_search(self):
+        projection = self.get_projection()
+        if projection is None:
+            return super(S, self).build_search()
+
+        # NOTE: elasticutils does not know about the ``only`` step,
+        #       hide it while the rest of the query is being built.
+        steps = self.steps
+        self.steps = [step for step in steps if step[0] != 'only']
+        try:
+            search = super(S, self).build_search()
+        finally:
+            self.steps = steps
+        search['_source'] = {'include': projection}
+        return search
+
+    def _do_search(self):
+        results = super(S, self)._do_search()
+        projection = self.get_projection()
+        if projection is not None:
+            for obj in results.objects:
+                if isinstance(obj, ModelMappingTypeBase):
+                    obj.projection = projection
+        return results
+
     def get_results_class(self):
         """
         Returns the custom results class to use
@@ -162,8 +515,79 @@ class S(SBase):
         }.get(results_class)
 
 
+def msearch(searches, es=None, instrumentation=NULL_INSTRUMENTATION):
+    """
+    Run several independent searches in a single Elasticsearch
+    ``_msearch`` request, rather than one request per search.
+
+    :param list searches:
+        The :py:class:`S` instances to run, possibly for different
+        model classes and indexes.
+    :param elasticsearch.Elasticsearch es:
+        The client to send the request with, defaults to the one of
+        the first search.
+    :param elasticgit.instrumentation.Instrumentation instrumentation:
+        An optional instrumentation to time the request with.
+    :returns:
+        A list with the results of each search, in the same order
+        and mapped to the search's own mapping type.
+    """
+    searches = [s._clone() for s in searches]
+    if not searches:
+        return []
+
+    body = []
+    for s in searches:
+        header = {
+            'index': ','.join(s.get_indexes()),
+            'type': ','.join(s.get_doctypes()),
+        }
+        if s.ignore_unavailable():
+            header['ignore_unavailable'] = True
+        body.append(header)
+        body.append(s.build_search())
+
+    es = es if es is not None else searches[0].get_es()
+    with instrumentation.timer('msearch', searches=len(searches)):
+        responses = es.msearch(body=body)['responses']
+
+    for s, response in zip(searches, responses):
+        if 'error' in response:
+            raise SearchException(response['error'])
+        s.response = response
+    return [s.execute() for s in searches]
+
+
+#: The commit SHAs of remote repos recently requested by
+#: :py:func:`remote_head_sha`, with the time they were requested at.
+REMOTE_HEAD_SHAS = LRUCacheBackend(max_size=256)
+
+
+def remote_head_sha(rsm, ttl):
+    """
+    Return the SHA of the commit a remote repo is at, reusing the one
+    requested for it less than ``ttl`` seconds ago rather than making
+    a request for every cached search.
+
+    :param elasticgit.storage.RemoteStorageManager rsm:
+    :param float ttl:
+    :returns: str
+    """
+    url = rsm.url()
+    cached = REMOTE_HEAD_SHAS.get(url)
+    if cached is not None and time.time() - cached[1] < ttl:
+        return cached[0]
+    head_sha = rsm.head_sha()
+    REMOTE_HEAD_SHAS.set(url, (head_sha, time.time()))
+    return head_sha
+
+
 class RepoHelper(object):
 
+    #: How long the commit SHA of a remote repo is reused for, in
+    #: seconds, rather than requested for every cached search.
+    head_sha_ttl = 1.0
+
     def __init__(self, repo_url):
         self.repo_url = repo_url
         if any([
@@ -185,6 +609,13 @@ class RepoHelper(object):
             return os.path.basename(self.repo_url)
         return self.rsm.repo_name
 
+    def head_sha(self):
+        if self.repo:
+            if not self.repo.heads:
+                return None
+            return self.repo.head.commit.hexsha
+        return remote_head_sha(self.rsm, self.head_sha_ttl)
+
 
 class SM(S):
     """
@@ -203,8 +634,12 @@ class SM(S):
     :param list index_prefixes:
         An optional list of index prefixes corresponding to the repos
         in `in_`.
+    :param bool index_per_model:
+        Whether the repos were indexed with an index per model class,
+        see :py:class:`ESManager`.
     """
-    def __init__(self, model_class, in_, index_prefixes=None):
+    def __init__(self, model_class, in_, index_prefixes=None,
+                 index_per_model=False):
         type_ = ReadOnlyModelMappingType.subclass(
             s=self,
             model_class=model_class)
@@ -212,6 +647,7 @@ class SM(S):
 
         self.repos = in_
         self.index_prefixes = index_prefixes
+        self.index_per_model = index_per_model
 
         self.repos = map(
             lambda repo:
@@ -225,6 +661,24 @@ class SM(S):
                 lambda repo: repo.default_index_prefix(),
                 self.repos)
 
+    def map_repos(self, func):
+        """
+        Call ``func`` with each of the ``repos``. Remote repos need an
+        HTTP request each, those are made concurrently.
+
+        :param func:
+            The function to call with a :py:class:`RepoHelper`.
+        :returns: list
+        """
+        if len([repo for repo in self.repos if repo.rsm]) < 2:
+            return map(func, self.repos)
+
+        pool = ThreadPool(len(self.repos))
+        try:
+            return pool.map(func, self.repos)
+        finally:
+            pool.close()
+
     def get_repo_indexes(self):
         """
         Generate the indexes corresponding to the ``repos``.
@@ -234,9 +688,46 @@ class SM(S):
         if not self.repos:
             return []
 
+        branch_names = self.map_repos(
+            lambda repo: repo.active_branch_name())
+        if self.index_per_model:
+            return map(
+                lambda (ip, b): model_index_name(
+                    ip, b, self.type.model_class),
+                zip(self.index_prefixes, branch_names))
+
         return map(
-            lambda (ip, r): index_name(ip, r.active_branch_name()),
-            zip(self.index_prefixes, self.repos))
+            lambda (ip, b): index_name(ip, b),
+            zip(self.index_prefixes, branch_names))
+
+    def get_repo_versions(self):
+        """
+        Generate a mapping of the indexes corresponding to the ``repos``
+        to the SHA of the commit each repo is at. Returns ``None`` if
+        any of them are unknown.
+
+        :returns: dict
+        """
+        versions = self.map_repos(lambda repo: repo.head_sha())
+        if None in versions:
+            return None
+        return dict(zip(self.get_repo_indexes(), versions))
+
+    def multi(self):
+        """
+        Split this search into one search per repo, with the same
+        query, to run together with :py:func:`msearch`. Useful to
+        get the top hits of each repo rather than of all of them.
+
+        :returns: list of :py:class:`SM`
+        """
+        searches = []
+        for repo, index_prefix in zip(self.repos, self.index_prefixes):
+            new = self._clone()
+            new.repos = [repo]
+            new.index_prefixes = [index_prefix]
+            searches.append(new)
+        return searches
 
     def _clone(self, next_step=None):
         # S._clone is re-implemented, because SM.__init__'s
@@ -246,13 +737,15 @@ class SM(S):
         new = self.__class__(
             self.type.model_class,
             in_=self.repos,
-            index_prefixes=self.index_prefixes)
+            index_prefixes=self.index_prefixes,
+            index_per_model=self.index_per_model)
         new.steps = list(self.steps)
         if next_step:
             new.steps.append(next_step)
         new.start = self.start
         new.stop = self.stop
         new.field_boosts = self.field_boosts.copy()
+        self._copy_clone_attributes(new)
         return new
 
 
@@ -265,11 +758,50 @@ class ESManager(object):
         The workspace to operate on.
     :param elasticsearch.Elasticsearch es:
         An Elasticsearch client instance.
+    :param str index_prefix:
+        The prefix to use when generating index names.
+    :param bool index_per_model:
+        Whether to put every model class in an index of its own, named
+        with :py:func:`model_index_name`, instead of all of them in one
+        index per branch. The methods taking an index name then take
+        an optional model class too, without one they apply to the
+        indexes of all model classes.
+    :param dict index_settings:
+        The settings to create the index of a model class with when
+        ``index_per_model`` is set, like ``number_of_shards``,
+        ``number_of_replicas`` or ``refresh_interval``, keyed by model
+        class or fully qualified class name.
+    :param bool git_metadata:
+        Whether to add the blob SHA and the SHA, time and author of the
+        last commit that changed an object to its documents, under
+        :py:data:`GIT_METADATA_FIELD`. Recently changed objects can then
+        be found with a single search, for example with
+        ``S(Page).order_by('-_git.timestamp')``.
     """
-    def __init__(self, storage_manager, es, index_prefix):
+    #: The :py:class:`elasticgit.instrumentation.Instrumentation` to use.
+    instrumentation = NULL_INSTRUMENTATION
+    #: How long after a write Elasticsearch makes it visible to searches
+    #: without a manual refresh, in seconds. Should match the
+    #: ``refresh_interval`` of the indexes.
+    refresh_interval = 1.0
+
+    def __init__(self, storage_manager, es, index_prefix,
+                 index_per_model=False, index_settings=None,
+                 git_metadata=False):
         self.sm = storage_manager
         self.es = es
         self.index_prefix = index_prefix
+        self.index_per_model = index_per_model
+        self.index_settings = index_settings or {}
+        self.git_metadata = git_metadata
+        self.known_indexes = set([])
+        self.known_model_classes = set([])
+        # NOTE: the commit SHA the indexes written to since they were
+        #       last refreshed were written at, and when.
+        self.pending_writes = {}
+        # NOTE: the commit SHA each index reflects, recorded when its
+        #       writes became visible to searches.
+        self.index_shas = {}
 
     def get_mapping_type(self, model_class):
         return ReadWriteModelMappingType.subclass(
@@ -277,50 +809,146 @@ class ESManager(object):
             sm=self.sm,
             model_class=model_class)
 
-    def index_exists(self, name):
+    def indexes(self, name, model_class=None):
+        """
+        Return the index, or the comma separated indexes of all model
+        classes, to operate on.
+
+        :param str name:
+        :param elasticgit.models.Model model_class:
+        :returns: str
+        """
+        if self.index_per_model and model_class is None:
+            return ','.join(self.model_indexes(name))
+        return self.index_name(name, model_class)
+
+    def model_indexes(self, name):
+        """
+        Return the indexes of the model classes with instances in the
+        repository or with indexes created by this manager, with an
+        index per model class. Not all of them need to exist.
+
+        A wildcard pattern is not used since it would match the
+        indexes of other branches whose names start with the same
+        name and a dash too.
+
+        :param str name:
+        :returns: list
+        """
+        model_classes = self.known_model_classes.union(
+            self.sm.model_classes())
+        return sorted(set(
+            self.index_name(name, model_class)
+            for model_class in model_classes))
+
+    def get_index_settings(self, model_class):
+        return self.index_settings.get(
+            model_class, self.index_settings.get(fqcn(model_class)))
+
+    def index_exists(self, name, model_class=None):
         """
         Check if the index already exists in Elasticsearch
 
         :param str name:
+        :param elasticgit.models.Model model_class:
         :returns: bool
         """
-        return self.es.indices.exists(index=self.index_name(name))
+        indexes = self.indexes(name, model_class)
+        return bool(indexes) and self.es.indices.exists(index=indexes)
 
-    def create_index(self, name):
+    def create_index(self, name, model_class=None):
         """
-        Creates the index in Elasticsearch
+        Creates the index in Elasticsearch. With an index per model class
+        and no model class given, the indexes of the model classes that
+        have instances in the repository are created.
 
         :param str name:
+        :param elasticgit.models.Model model_class:
+        """
+        if not self.index_per_model:
+            return self.es.indices.create(index=self.index_name(name))
+        if model_class is None:
+            return [self.create_index(name, model_class)
+                    for model_class in self.sm.model_classes()]
+
+        index = self.index_name(name, model_class)
+        settings = self.get_index_settings(model_class)
+        # NOTE: ignore the error for an index that already exists.
+        response = self.es.indices.create(
+            index=index,
+            body={'settings': settings} if settings else None,
+            ignore=400)
+        self.known_indexes.add(index)
+        self.known_model_classes.add(model_class)
+        return response
+
+    def ensure_index(self, name, model_class):
         """
-        return self.es.indices.create(index=self.index_name(name))
+        Create the index of a model class with its settings before it is
+        first written to, if every model class has an index of its own.
 
-    def destroy_index(self, name):
+        :param str name:
+        :param elasticgit.models.Model model_class:
+        """
+        if not self.index_per_model:
+            return
+        index = self.index_name(name, model_class)
+        if index in self.known_indexes:
+            return
+        if self.es.indices.exists(index=index):
+            self.known_indexes.add(index)
+            self.known_model_classes.add(model_class)
+        else:
+            self.create_index(name, model_class)
+
+    def destroy_index(self, name, model_class=None):
         """
         Destroys the index in Elasticsearch
 
         :param str name:
+        :param elasticgit.models.Model model_class:
         """
-        return self.es.indices.delete(index=self.index_name(name))
-
-    def index_status(self, name):
+        self.known_indexes.clear()
+        self.pending_writes.clear()
+        self.index_shas.clear()
+        if self.index_per_model and model_class is None:
+            # NOTE: not all model classes need to have an index.
+            return [self.es.indices.delete(index=index, ignore=404)
+                    for index in self.model_indexes(name)]
+        return self.es.indices.delete(index=self.indexes(name, model_class))
+
+    def index_status(self, name, model_class=None):
         """
         Get an index status
 
         :param str name:
+        :param elasticgit.models.Model model_class:
         """
-        index_name = self.index_name(name)
+        index_name = self.index_name(name, model_class)
         status = self.es.indices.status(index=index_name)
         index_status = status['indices'][index_name]
         return index_status
 
-    def index_ready(self, name):
+    def index_ready(self, name, model_class=None):
         """
         Check if an index is ready for use.
 
         :param str name:
+        :param elasticgit.models.Model model_class:
         :returns: bool
         """
-        status = self.index_status(name)
+        if self.index_per_model and model_class is None:
+            indexes = self.indexes(name)
+            if not indexes:
+                return True
+            status = self.es.indices.status(
+                index=indexes, ignore_unavailable=True)
+            return all(
+                self.shards_started(index_status)
+                for index_status in status['indices'].values())
+        return self.shards_started(self.index_status(name, model_class))
+
+    def shards_started(self, status):
         # NOTE: ES returns a lot of nested info here, hence the complicated
         #       generator in generator
         return any([
@@ -328,6 +956,67 @@ class ESManager(object):
             for shard_slice in status['shards'].values()
         ])
 
+    def extract_documents(self, model_class, models):
+        """
+        Return the Elasticsearch documents for model instances of the
+        same class, with their Git metadata if ``git_metadata`` is set.
+
+        :param elasticgit.models.Model model_class:
+        :param list models:
+        :returns: list
+        """
+        MappingType = self.get_mapping_type(model_class)
+        documents = [MappingType.extract_document(model.uuid, model)
+                     for model in models]
+        if self.git_metadata:
+            metadata = self.sm.git_metadata(
+                model_class, [model.uuid for model in models])
+            for document, git_metadata in zip(documents, metadata):
+                document[GIT_METADATA_FIELD] = git_metadata
+        return documents
+
+    def index_version(self, index):
+        """
+        Return the SHA of the commit an index reflects, ``None`` if it
+        was written to and searches may not see the writes yet, so
+        their results should not be cached.
+
+        The SHA is the commit the repository was at when the index was
+        last written to, recorded once the writes are visible. It does
+        not move on with a pull until the changes pulled are indexed.
+        For indexes not written to by this manager it is the commit the
+        repository is at.
+
+        :param str index:
+        :returns: str
+        """
+        pending = self.pending_writes.get(index)
+        if pending is not None:
+            sha, written_at = pending
+            if time.time() - written_at < self.refresh_interval:
+                return None
+            self.pending_writes.pop(index, None)
+            self.index_shas[index] = sha
+        if index in self.index_shas:
+            return self.index_shas[index]
+        if isinstance(self.sm, RemoteStorageManager):
+            return remote_head_sha(self.sm, self.refresh_interval)
+        return self.sm.head_sha()
+
+    def finish_write(self, MappingType, refresh_index):
+        """
+        Refresh the index written to or remember that searches may not
+        see the writes yet, along with the commit they were made at.
+        """
+        index = MappingType.get_index()
+        head_sha = self.sm.head_sha()
+        if refresh_index:
+            MappingType.refresh_index()
+            self.pending_writes.pop(index, None)
+            self.index_shas[index] = head_sha
+        else:
+            self.pending_writes[index] = (head_sha, time.time())
+
     def index(self, model, refresh_index=False):
         """
         Index a :py:class:`elasticgit.models.Model` instance in Elasticsearch
@@ -342,12 +1031,41 @@ class ESManager(object):
         """
         model_class = model.__class__
         MappingType = self.get_mapping_type(model_class)
-        MappingType.index(
-            MappingType.extract_document(model.uuid, model), id_=model.uuid)
-        if refresh_index:
-            MappingType.refresh_index()
+        if self.index_per_model:
+            self.ensure_index(self.sm.active_branch(), model_class)
+        with self.instrumentation.timer(
+                'index', model=model_class, index=MappingType.get_index):
+            [document] = self.extract_documents(model_class, [model])
+            MappingType.index(document, id_=model.uuid)
+            self.finish_write(MappingType, refresh_index)
         return model
 
+    def bulk_index(self, model_class, models, refresh_index=False):
+        """
+        Index several :py:class:`elasticgit.models.Model` instances of the
+        same class in Elasticsearch with a single bulk request.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param list models:
+            The model instances
+        :param bool refresh_index:
+            Whether or not to manually refresh the Elasticsearch index.
+            Useful in testing.
+        :returns:
+            list of :py:class:`elasticgit.models.Model`
+        """
+        MappingType = self.get_mapping_type(model_class)
+        if self.index_per_model:
+            self.ensure_index(self.sm.active_branch(), model_class)
+        with self.instrumentation.timer(
+                'bulk_index', model=model_class, index=MappingType.get_index):
+            MappingType.bulk_index(
+                self.extract_documents(model_class, models),
+                id_field='uuid')
+            self.finish_write(MappingType, refresh_index)
+        return models
+
     def raw_unindex(self, model_class, uuid, refresh_index=False):
         """
         Remove an entry from the Elasticsearch index.
@@ -365,9 +1083,53 @@ class ESManager(object):
             Useful in testing.
         """
         MappingType = self.get_mapping_type(model_class)
-        MappingType.unindex(uuid)
-        if refresh_index:
-            MappingType.refresh_index()
+        self.ensure_index(self.sm.active_branch(), model_class)
+        with self.instrumentation.timer(
+                'raw_unindex', model=model_class,
+                index=MappingType.get_index):
+            MappingType.unindex(uuid)
+            self.finish_write(MappingType, refresh_index)
+
+    def bulk_unindex(self, model_class, uuids, refresh_index=False):
+        """
+        Remove several entries of the same model class from the
+        Elasticsearch index with a single bulk request.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param list uuids:
+            The models' UUIDs
+        :param bool refresh_index:
+            Whether or not to manually refresh the Elasticsearch index.
+            Useful in testing.
+        :returns:
+            A dictionary of UUIDs to ``deleted``, ``not_found`` or the
+            error Elasticsearch gave for the entry.
+        """
+        if not uuids:
+            return {}
+        MappingType = self.get_mapping_type(model_class)
+        self.ensure_index(self.sm.active_branch(), model_class)
+        index = MappingType.get_index()
+        doc_type = MappingType.get_mapping_type_name()
+        with self.instrumentation.timer(
+                'bulk_unindex', model=model_class, index=index):
+            response = MappingType.get_es().bulk(body=[
+                {'delete': {'_id': uuid}} for uuid in uuids],
+                index=index, doc_type=doc_type)
+            self.finish_write(MappingType, refresh_index)
+
+        statuses = {}
+        for item in response['items']:
+            result = item['delete']
+            if 'error' in result:
+                status = result['error']
+            elif result.get('found', result.get('status') != 404):
+                status = 'deleted'
+            else:
+                status = 'not_found'
+            statuses[result['_id']] = status
+        return statuses
 
     def unindex(self, model, refresh_index=False):
         """
@@ -386,7 +1148,7 @@ class ESManager(object):
         self.raw_unindex(model_class, model.uuid, refresh_index=refresh_index)
         return model
 
-    def index_name(self, name):
+    def index_name(self, name, model_class=None):
         """
         Generate an Elasticsearch index name using given name and prefixing
         it with the ``index_prefix``. The resulting generated index name
@@ -394,17 +1156,32 @@ class ESManager(object):
 
         :param str name:
             The name to use for the index.
+        :param elasticgit.models.Model model_class:
+            The model class to generate the name of its own index for,
+            if every model class has an index of its own.
         """
+        if self.index_per_model and model_class is not None:
+            return model_index_name(self.index_prefix, name, model_class)
         return index_name(self.index_prefix, name)
 
-    def refresh_indices(self, name):
+    def refresh_indices(self, name, model_class=None):
         """
         Manually refresh the Elasticsearch index. In production this is
         not necessary but it is useful when running tests.
 
         :param str name:
+        :param elasticgit.models.Model model_class:
         """
-        return self.es.indices.refresh(index=self.index_name(name))
+        indexes = self.indexes(name, model_class)
+        if not indexes:
+            return None
+        response = self.es.indices.refresh(
+            index=indexes, ignore_unavailable=True)
+        for index in indexes.split(','):
+            pending = self.pending_writes.pop(index, None)
+            if pending is not None:
+                self.index_shas[index] = pending[0]
+        return response
 
     def setup_mapping(self, name, model_class):
         """
@@ -428,8 +1205,13 @@ class ESManager(object):
         :returns: dict
         """
         MappingType = self.get_mapping_type(model_class)
+        self.ensure_index(name, model_class)
+        if self.git_metadata and 'properties' in mapping:
+            properties = mapping['properties'].copy()
+            properties.setdefault(GIT_METADATA_FIELD, GIT_METADATA_MAPPING)
+            mapping = dict(mapping, properties=properties)
         return self.es.indices.put_mapping(
-            index=self.index_name(name),
+            index=self.index_name(name, model_class),
             doc_type=MappingType.get_mapping_type_name(),
             body=mapping)
 
@@ -441,7 +1223,7 @@ class ESManager(object):
         :param elasticgit.models.Model model_class:
         :returns: dict
         """
-        index_name = self.index_name(name)
+        index_name = self.index_name(name, model_class)
         MappingType = self.get_mapping_type(model_class)
         data = self.es.indices.get_mapping(
             index=index_name,
@@ -8,8 +8,13 @@ class Serializer(object):
     def serialize(self, model):
         return self.dumps(dict(model))
 
-    def deserialize(self, model_class, data):
-        return model_class(self.loads(data))
+    def deserialize(self, model_class, data, only=None):
+        loaded = self.loads(data)
+        if only is None:
+            return model_class(loaded)
+        return model_class(dict(
+            (key, loaded[key]) for key in only if key in loaded
+        ), partial=only)
 
 
 class JSONSerializer(Serializer):
@@ -17,7 +22,8 @@ class JSONSerializer(Serializer):
     suffix = 'json'
 
     def dumps(self, data):
-        return json.dumps(data, indent=2, encoding=self.encoding)
+        return json.dumps(data, indent=2, sort_keys=True,
+                          encoding=self.encoding)
 
     def loads(self, data):
         return json.loads(data, encoding=self.encoding)
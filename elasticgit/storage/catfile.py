@@ -0,0 +1,239 @@
+import os
+import atexit
+import logging
+import threading
+import subprocess
+
+from contextlib import contextmanager
+
+from git import GitCommandError
+
+
+log = logging.getLogger(__name__)
+
+
+class CatFileException(Exception):
+    pass
+
+
+class CatFileProcess(object):
+    """
+    A long running ``git cat-file --batch`` (or ``--batch-check``)
+    process. Every read costs a single write to and read from its pipes.
+
+    :param str git_dir:
+        The repository's ``.git`` directory.
+    :param bool batch_check:
+        Only return object information, not the contents.
+    """
+
+    def __init__(self, git_dir, batch_check=False):
+        self.batch_check = batch_check
+        self.args = [
+            'git', '--git-dir', git_dir, 'cat-file',
+            '--batch-check' if batch_check else '--batch']
+        self.devnull = open(os.devnull, 'w')
+        self.process = subprocess.Popen(
+            self.args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=self.devnull)
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def request(self, object_name):
+        """
+        Request an object from git.
+
+        :param str object_name:
+            Anything ``git rev-parse`` understands, like a SHA or
+            ``branch:path/to/file.json``.
+        :returns:
+            ``(sha, type, size, data)`` tuple, data is ``None`` for
+            ``--batch-check`` processes.
+        """
+        if '\n' in object_name:
+            raise ValueError('Invalid object name %r.' % (object_name,))
+
+        self.process.stdin.write('%s\n' % (object_name,))
+        self.process.stdin.flush()
+        header = self.process.stdout.readline()
+        if not header:
+            raise CatFileException('git cat-file exited unexpectedly.')
+
+        # NOTE: the object name may contain spaces, the header for a
+        #       missing object is ``<object name> missing``.
+        header = header.rstrip('\n')
+        if header.rsplit(' ', 1)[-1] in ('missing', 'ambiguous'):
+            raise GitCommandError(
+                self.args, 128,
+                'fatal: Not a valid object name %s' % (object_name,))
+
+        sha, object_type, size = header.rsplit(' ', 2)
+        size = int(size)
+        if self.batch_check:
+            return sha, object_type, size, None
+
+        data = self.process.stdout.read(size)
+        if len(data) != size or self.process.stdout.read(1) != '\n':
+            raise CatFileException('Truncated output from git cat-file.')
+        return sha, object_type, size, data
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        if self.is_alive():
+            self.process.terminate()
+        self.process.wait()
+        self.devnull.close()
+
+
+class CatFilePool(object):
+    """
+    A thread safe pool of :py:class:`CatFileProcess` instances for a
+    single repository.
+
+    Processes are started on demand, up to ``max_processes`` requests are
+    served concurrently and dead or misbehaving processes are replaced.
+
+    :param str git_dir:
+        The repository's ``.git`` directory.
+    :param bool batch_check:
+        Whether the processes are ``--batch-check`` processes.
+    :param int max_processes:
+        The maximum number of concurrent processes.
+    """
+
+    process_class = CatFileProcess
+
+    def __init__(self, git_dir, batch_check=False, max_processes=4):
+        self.git_dir = git_dir
+        self.batch_check = batch_check
+        self.max_processes = max_processes
+        self.semaphore = threading.BoundedSemaphore(max_processes)
+        self.lock = threading.Lock()
+        self.idle = []
+
+    def spawn(self):
+        return self.process_class(self.git_dir, batch_check=self.batch_check)
+
+    @contextmanager
+    def process(self):
+        """
+        Check out a healthy process for exclusive use.
+        """
+        with self.semaphore:
+            with self.lock:
+                process = self.idle.pop() if self.idle else None
+            if process is None or not process.is_alive():
+                if process is not None:
+                    log.warn('Restarting dead %s.' % (process.args,))
+                    process.close()
+                process = self.spawn()
+            try:
+                yield process
+            except GitCommandError:
+                self.release(process)
+                raise
+            except:
+                process.close()
+                raise
+            else:
+                self.release(process)
+
+    def release(self, process):
+        with self.lock:
+            self.idle.append(process)
+
+    def request(self, object_name):
+        """
+        Request an object, retrying once with a fresh process if the
+        one used failed.
+
+        :param str object_name:
+        :returns: ``(sha, type, size, data)`` tuple.
+        """
+        try:
+            with self.process() as process:
+                return process.request(object_name)
+        except (CatFileException, IOError, OSError):
+            log.warn('git cat-file failed, retrying.', exc_info=True)
+            with self.process() as process:
+                return process.request(object_name)
+
+    def get(self, object_name):
+        """
+        Return the contents of an object.
+
+        :param str object_name:
+        :returns: str
+        """
+        return self.request(object_name)[3]
+
+    def request_many(self, object_names):
+        """
+        Request several objects, in order, using one process.
+
+        :param list object_names:
+        :returns: list of ``(sha, type, size, data)`` tuples.
+        """
+        with self.process() as process:
+            return [process.request(object_name)
+                    for object_name in object_names]
+
+    def get_many(self, object_names):
+        """
+        Return the contents of several objects, in order, using
+        one process.
+
+        :param list object_names:
+        :returns: list
+        """
+        return [response[3] for response in self.request_many(object_names)]
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for process in idle:
+            process.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(git_dir, batch_check=False):
+    """
+    Return the :py:class:`CatFilePool` for a repository, shared by all
+    storage managers for that repository in this process. A forked
+    process gets pools of its own, the pipes of its parent's processes
+    are not shared.
+
+    :param str git_dir:
+        The repository's ``.git`` directory.
+    :param bool batch_check:
+        Whether to return the ``--batch-check`` pool.
+    :returns: :py:class:`CatFilePool`
+    """
+    key = (os.getpid(), os.path.realpath(git_dir), batch_check)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = CatFilePool(key[1], batch_check=batch_check)
+        return _pools[key]
+
+
+def close_pools():
+    """
+    Stop all processes of all pools of this process. The pools
+    inherited from a parent process are left to the parent.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        keys = [key for key in _pools if key[0] == pid]
+        pools = [_pools.pop(key) for key in keys]
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_pools)
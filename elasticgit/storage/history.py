@@ -0,0 +1,238 @@
+import os
+import json
+import fcntl
+import threading
+
+from contextlib import contextmanager
+
+from git import GitCommandError
+
+from elasticgit.layout import parse_path
+
+
+class HistoryIndex(object):
+    """
+    An index of the commits that changed each object, so an object's
+    history does not need a ``git log`` walking the whole history of the
+    repository. Objects are identified by their UUIDs, so their history
+    carries on when they move to another layout.
+
+    It is kept up to date incrementally by logging the commits made since
+    the last indexed one and stored as a journal in the repository's
+    ``.git`` directory, with a line appended for every commit indexed.
+    Storage managers in other threads or processes share the journal,
+    it is only read and appended to while holding a file lock and each
+    reader picks up the lines appended by the others before adding
+    commits of its own.
+
+    :param elasticgit.storage.StorageManager storage_manager:
+    :param str branch_name:
+        The branch whose history to index.
+    """
+
+    #: The ``git log`` format for a commit, its SHA, commit time and
+    #: author name and email.
+    log_format = '%x00%H%x01%ct%x01%an%x01%ae'
+
+    def __init__(self, storage_manager, branch_name):
+        self.sm = storage_manager
+        self.branch_name = branch_name
+        self.path = storage_manager.private_path(
+            'history', '%s.jsonl' % (branch_name,))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.commit = None
+        self.objects = {}
+        self.commits = set([])
+        self.commit_authors = {}
+        # NOTE: how far into which journal file has been read.
+        self.offset = 0
+        self.inode = None
+
+    def add(self, commit, timestamp, changes, author=None):
+        self.commit = commit
+        if commit in self.commits:
+            return
+        self.commits.add(commit)
+        if author is not None:
+            self.commit_authors[commit] = author
+        statuses = {}
+        for status, repo_path in changes:
+            info = parse_path(repo_path)
+            if info is None:
+                continue
+            _, uuid = info
+            statuses.setdefault(uuid, set()).add(status)
+        for uuid, status in statuses.items():
+            # NOTE: an object moved to another layout is deleted from one
+            #       path and added at another in the same commit.
+            status = 'R' if len(status) > 1 else status.pop()
+            self.objects.setdefault(uuid, []).append(
+                (commit, timestamp, status))
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the lock on the journal shared with other processes.
+        """
+        dir_name = os.path.dirname(self.path)
+        if not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+        with open('%s.lock' % (self.path,), 'a') as fp:
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+    def load(self):
+        """
+        Read the lines appended to the journal since it was last read,
+        starting over if it was replaced.
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            if self.inode is not None:
+                self.reset()
+            return
+        if stat.st_ino != self.inode or stat.st_size < self.offset:
+            self.reset()
+            self.inode = stat.st_ino
+
+        with open(self.path, 'r') as fp:
+            fp.seek(self.offset)
+            while True:
+                line = fp.readline()
+                try:
+                    # NOTE: lines journaled by older versions have no
+                    #       author.
+                    entry = json.loads(line)
+                except ValueError:
+                    # NOTE: the end of the journal or a partially written
+                    #       last line, which is overwritten by the next
+                    #       append.
+                    break
+                self.add(*entry)
+                self.offset = fp.tell()
+
+    def append(self, entries):
+        with open(self.path, 'a') as fp:
+            os.ftruncate(fp.fileno(), self.offset)
+            for entry in entries:
+                fp.write('%s\n' % (json.dumps(entry),))
+            fp.flush()
+            self.offset = fp.tell()
+            self.inode = os.fstat(fp.fileno()).st_ino
+
+    def truncate(self):
+        self.reset()
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+    def log(self, revision_range):
+        """
+        Return ``[commit, timestamp, changes, [name, email]]`` entries
+        for the commits in a revision range, oldest first.
+        """
+        output = self.sm.repo.git.log(
+            '--reverse', '--no-renames', '--name-status',
+            '--format=%s' % (self.log_format,), revision_range)
+        entries = []
+        for chunk in filter(None, output.split('\x00')):
+            lines = filter(None, chunk.split('\n'))
+            commit, timestamp, name, email = lines[0].split('\x01')
+            entries.append([commit, int(timestamp), [
+                line.split('\t', 1) for line in lines[1:]], [name, email]])
+        return entries
+
+    def authors(self, commits):
+        """
+        Return the authors of commits as ``{'name': ..., 'email': ...}``
+        dictionaries keyed by commit SHA. Commits indexed by older
+        versions, without their author, are looked up with a single
+        ``git show``.
+
+        :param iterable commits:
+            The commit SHAs.
+        :returns: dict
+        """
+        commits = set(commits)
+        missing = commits - set(self.commit_authors)
+        if missing:
+            output = self.sm.repo.git.show(
+                '--no-patch', '--format=%H%x01%an%x01%ae', *sorted(missing))
+            for line in filter(None, output.split('\n')):
+                commit, name, email = line.split('\x01')
+                self.commit_authors[commit] = [name, email]
+        return dict(
+            (commit, {'name': name, 'email': email})
+            for commit, (name, email) in self.commit_authors.items()
+            if commit in commits)
+
+    def is_ancestor(self, commit, head_sha):
+        try:
+            self.sm.repo.git.merge_base('--is-ancestor', commit, head_sha)
+            return True
+        except GitCommandError:
+            return False
+
+    def update(self):
+        """
+        Bring the index up to date with the commit the branch is at.
+        """
+        with self.lock, self.locked():
+            self.load()
+            try:
+                head_sha = self.sm.repo.git.rev_parse(
+                    'refs/heads/%s' % (self.branch_name,))
+            except GitCommandError:
+                head_sha = None
+            if head_sha == self.commit:
+                return
+            if head_sha is None:
+                self.truncate()
+                return
+
+            if (self.commit is not None and
+                    self.is_ancestor(self.commit, head_sha)):
+                revision_range = '%s..%s' % (self.commit, head_sha)
+            else:
+                # NOTE: the branch was reset or rewritten, start over.
+                self.truncate()
+                revision_range = head_sha
+
+            entries = [entry for entry in self.log(revision_range)
+                       if entry[0] not in self.commits]
+            for entry in entries:
+                self.add(*entry)
+            # NOTE: merges without changes of their own are not logged.
+            if self.commit != head_sha:
+                entries.append([head_sha, None, []])
+                self.add(head_sha, None, [])
+            self.append(entries)
+
+    def history(self, uuid, limit=None):
+        """
+        Return the commits that changed an object, newest first.
+
+        :param str uuid:
+            The object's UUID.
+        :param int limit:
+            The maximum number of commits to return.
+        :returns:
+            A list of dictionaries with the ``commit`` SHA, the commit
+            ``timestamp`` in seconds since the epoch and the ``status``
+            of the change, ``A`` for added, ``M`` for modified, ``D``
+            for deleted and ``R`` for moved to another layout.
+        """
+        self.update()
+        entries = self.objects.get(uuid, [])
+        start = 0 if limit is None else max(len(entries) - limit, 0)
+        return [{
+            'commit': commit,
+            'timestamp': timestamp,
+            'status': status,
+        } for commit, timestamp, status in reversed(entries[start:])]
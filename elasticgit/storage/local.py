@@ -1,25 +1,58 @@
 import os
+import re
+import time
 import shutil
+import hashlib
 import logging
+import tempfile
+import threading
+import subprocess
+
+from datetime import datetime
+from contextlib import contextmanager
 
 from zope.interface import implements
 
-from git import Repo, Actor
+from git import Repo, Actor, GitCommandError
 from git.diff import DiffIndex
 
-from elasticgit.models import Model
+from elasticgit import layout
 from elasticgit.serializers import JSONSerializer
-from elasticgit.utils import load_class
+from elasticgit.utils import load_model_class, projected_fields
 from elasticgit.istorage import IStorageManager
+from elasticgit.storage.lookup import LookupIndex
+from elasticgit.storage.history import HistoryIndex
+from elasticgit.storage.catfile import get_pool
+from elasticgit.instrumentation import NULL_INSTRUMENTATION
+from elasticgit.changes import NULL_CHANGE_FEED, make_change
 
 
 log = logging.getLogger(__name__)
 
+NULL_SHA = '0' * 40
+SHA_RE = re.compile('^[0-9a-f]{40}$')
+
 
 class StorageException(Exception):
     pass
 
 
+def blob_sha(data):
+    """
+    Return the SHA of the blob Git stores some data as, the same as
+    ``git hash-object`` does.
+
+    >>> from elasticgit.storage.local import blob_sha
+    >>> blob_sha('')
+    'e69de29bb2d1d6434b8b29ae775ad8c2e48c5391'
+    >>>
+
+    :param str data:
+    :returns: str
+    """
+    return hashlib.sha1('blob %d\0%s' % (len(data), data)).hexdigest()
+
+
 class StorageManager(object):
     """
     An interface to :py:class:`elasticgit.models.Model` instances stored
@@ -31,15 +64,62 @@ class StorageManager(object):
     implements(IStorageManager)
 
     serializer_class = JSONSerializer
+    #: The :py:class:`elasticgit.instrumentation.Instrumentation` to use.
+    instrumentation = NULL_INSTRUMENTATION
+    #: The :py:class:`elasticgit.changes.ChangeFeed` to publish to.
+    change_feed = NULL_CHANGE_FEED
+    #: How many commits to remember the resolved trees of.
+    tree_cache_size = 256
 
     def __init__(self, repo):
         self.repo = repo
         self.workdir = self.repo.working_dir
         self.serializer = self.serializer_class()
+        self.lookup_indexes = {}
+        self.history_indexes = {}
+        self._layout = None
+        self._trees = {}
+        self._snapshot = threading.local()
+
+    @property
+    def catfile(self):
+        # NOTE: looked up on every use, so a forked process gets pools
+        #       of its own rather than sharing its parent's pipes.
+        return get_pool(self.repo.git_dir)
+
+    @property
+    def catfile_check(self):
+        return get_pool(self.repo.git_dir, batch_check=True)
 
     def active_branch(self):
         return self.repo.active_branch.name
 
+    def head_sha(self):
+        """
+        Return the SHA of the commit the repository is at or ``None``
+        if there are no commits yet.
+
+        :returns: str
+        """
+        try:
+            return self.repo.head.commit.hexsha
+        except ValueError:
+            # NOTE: GitPython raises a ValueError for a branch
+            #       without any commits.
+            return None
+
+    def private_path(self, *parts):
+        """
+        Return a path inside the repository's ``.git`` directory where
+        data that should not be committed, like caches and indexes,
+        can be kept.
+
+        :param tuple parts:
+            The bits to join together after the path.
+        :returns: str
+        """
+        return os.path.join(self.repo.git_dir, 'elasticgit', *parts)
+
     def git_path(self, model_class, *args):
         """
         Return the path of a model_class when layed out in the git
@@ -67,6 +147,103 @@ class StorageManager(object):
             model_class.__name__,
             *args)
 
+    @property
+    def layout(self):
+        """
+        The layout of the model files in the repository, one of
+        :py:data:`elasticgit.layout.LAYOUTS`. This is read from the
+        :py:data:`elasticgit.layout.LAYOUT_FILE` in the working directory
+        once and again after a :py:func:`pull` or :py:func:`relayout`.
+        """
+        if self._layout is None:
+            layout_file = os.path.join(self.workdir, layout.LAYOUT_FILE)
+            if os.path.isfile(layout_file):
+                with open(layout_file, 'r') as fp:
+                    repo_layout = fp.read().strip()
+            else:
+                repo_layout = layout.FLAT
+            if repo_layout not in layout.LAYOUTS:
+                raise StorageException(
+                    'Unknown layout %r.' % (repo_layout,))
+            self._layout = repo_layout
+        return self._layout
+
+    def object_path(self, model_class, uuid, repo_layout=None):
+        """
+        Return the file path to where the data for an instance of a
+        model class lives, for the repository's layout.
+
+        :param elasticgit.models.Model model_class:
+        :param str uuid:
+        :param str repo_layout:
+            The layout to use instead of the repository's current one.
+        :returns: str
+        """
+        return layout.object_path(
+            self.git_path(model_class), uuid, self.serializer.suffix,
+            layout=repo_layout or self.layout)
+
+    @contextmanager
+    def snapshot(self, at=None):
+        """
+        Pin the reads in the current thread to a single commit, reads
+        that do not specify a commit with ``at`` read from that commit
+        instead of from the active branch.
+
+        :param str at:
+            The commit to read from, defaults to the current one. Refs
+            are resolved to the commit they point to when the snapshot
+            is taken.
+        """
+        at = (self.repo.git.rev_parse('%s^{commit}' % (at,))
+              if at else self.head_sha())
+        previous = getattr(self._snapshot, 'at', None)
+        self._snapshot.at = at
+        try:
+            yield at
+        finally:
+            self._snapshot.at = previous
+
+    def resolve(self, at):
+        """
+        Resolve a commit to its tree and the layout of the repository at
+        that commit. These are cached for commit SHAs, so reading
+        from the same commit again skips resolving refs and trees.
+
+        :param str at:
+            A commit SHA or anything else ``git rev-parse`` understands.
+        :returns:
+            A ``(tree_sha, layout)`` tuple.
+        """
+        resolved = self._trees.get(at)
+        if resolved is not None:
+            return resolved
+
+        with self.instrumentation.timer('resolve'):
+            tree_sha = self.repo.git.rev_parse('%s^{tree}' % (at,))
+            try:
+                repo_layout = self.catfile.get('%s:%s' % (
+                    tree_sha, layout.LAYOUT_FILE)).strip()
+            except GitCommandError:
+                repo_layout = layout.FLAT
+
+        resolved = (tree_sha, repo_layout)
+        if SHA_RE.match(at):
+            if len(self._trees) >= self.tree_cache_size:
+                self._trees.clear()
+            self._trees[at] = resolved
+        return resolved
+
+    def read_from(self, at=None):
+        """
+        Return the tree-ish to read objects from and the layout the
+        objects are stored with there, for :py:func:`get` and friends.
+        """
+        at = at or getattr(self._snapshot, 'at', None)
+        if at is None:
+            return self.active_branch(), self.layout
+        return self.resolve(at)
+
     def git_name(self, model):
         """
         Return the file path to where the data for a
@@ -86,26 +263,105 @@ class StorageManager(object):
         >>>
 
         """
-        return self.git_path(
-            model.__class__,
-            '%s.%s' % (model.uuid, self.serializer.suffix))
+        return self.object_path(model.__class__, model.uuid)
 
-    def iterate(self, model_class):
+    def iterate(self, model_class, only=None, at=None):
         """
         This loads all known instances of this model from Git
         because we need to know how to re-populate Elasticsearch.
 
         :param elasticgit.models.Model model_class:
             The class to look for instances of.
+        :param list only:
+            Optionally only load these fields, returning partial
+            read only model instances.
+        :param str at:
+            Optionally the commit to load the instances at.
+
+        :returns: generator
+        """
+        fields = (projected_fields(model_class, only)
+                  if only is not None
+                  else None)
+        at = at or getattr(self._snapshot, 'at', None)
+        # NOTE: wildcards in Git pathspecs match slashes too, this finds
+        #       the files in shard directories as well.
+        path = self.git_path(model_class, '*.%s' % (self.serializer.suffix,))
+        with self.instrumentation.timer('iterate', model=model_class):
+            if at is None:
+                list_of_files = self.repo.git.ls_files(path).split('\n')
+            else:
+                # NOTE: ls-tree does not do wildcards.
+                tree_sha, _ = self.resolve(at)
+                suffix = '.%s' % (self.serializer.suffix,)
+                list_of_files = [
+                    file_path for file_path in self.repo.git.ls_tree(
+                        '-r', '--name-only', tree_sha, '--',
+                        self.git_path(model_class)).split('\n')
+                    if file_path.endswith(suffix)]
+            for file_path in filter(None, list_of_files):
+                if fields is None:
+                    uuid = os.path.basename(file_path).split('.', 1)[0]
+                    yield self.get(model_class, uuid, at=at)
+                else:
+                    yield self.serializer.deserialize(
+                        model_class, self.get_data(file_path, at=at),
+                        only=fields)
+
+    def uuids(self, model_class):
+        """
+        List the UUIDs of all known instances of a model class, without
+        loading them.
+
+        :param elasticgit.models.Model model_class:
+        :returns: list
+        """
+        return list(self.iter_uuids(model_class))
+
+    def iter_uuids(self, model_class):
+        """
+        Generate the UUIDs of all known instances of a model class, in
+        the order of their paths, as ``git ls-files`` lists them
+        rather than after reading its whole output.
 
+        :param elasticgit.models.Model model_class:
         :returns: generator
         """
         path = self.git_path(model_class, '*.%s' % (self.serializer.suffix,))
-        list_of_files = self.repo.git.ls_files(path)
-        for file_path in filter(None, list_of_files.split('\n')):
-            module_name, class_name, file_name = file_path.split('/', 3)
-            uuid, suffix = file_name.split('.', 2)
-            yield self.get(model_class, uuid)
+        process = subprocess.Popen(
+            ['git', 'ls-files', '--', path],
+            cwd=self.repo.working_dir, stdout=subprocess.PIPE)
+        try:
+            for line in iter(process.stdout.readline, ''):
+                file_path = line.rstrip('\n')
+                if file_path:
+                    yield os.path.basename(file_path).split('.', 1)[0]
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+
+    def model_classes(self):
+        """
+        Find the model classes that have instances stored in the
+        repository and can be imported.
+
+        :returns: list
+        """
+        if self.head_sha() is None:
+            return []
+
+        model_classes = []
+        output = self.repo.git.ls_tree('-r', '-d', '--name-only', 'HEAD')
+        for path in filter(None, output.split('\n')):
+            parts = path.split('/')
+            if len(parts) != 2:
+                continue
+            model_class = load_model_class('.'.join(parts))
+            if model_class is not None:
+                model_classes.append(model_class)
+        return model_classes
 
     def path_info(self, file_path):
         """
@@ -116,21 +372,129 @@ class StorageManager(object):
         :returns:
             (model_class, uuid) tuple or ``None`` if not a model file path.
         """
-        try:
-            module_name, class_name, file_name = file_path.split('/', 3)
-            uuid, suffix = file_name.split('.', 2)
-            model_class = load_class('%s.%s' % (module_name, class_name))
-            if not issubclass(model_class, Model):
-                raise StorageException('%r does not subclass %r' % (
-                    model_class, Model))
+        info = layout.parse_path(file_path)
+        if info is None:
+            log.debug('%s does not look like a model file path.' % (
+                file_path,))
+            return None
+        class_path, uuid = info
+        model_class = load_model_class(class_path)
+        if model_class is not None:
             return model_class, uuid
-        except ValueError, e:
-            log.warn('%s does not look like a model file path.' % (
-                file_path,), exc_info=True)
-        except ImportError, e:
-            log.warn(e, exc_info=True)
-        except StorageException, e:
-            log.warn(e, exc_info=True)
+
+    def register_lookup(self, model_class, *fields):
+        """
+        Maintain a secondary index of the given fields' values to the
+        UUIDs of the model class' instances, see :py:func:`lookup`.
+
+        :param elasticgit.models.Model model_class:
+        :param str fields:
+            The names of the fields to index.
+        :returns:
+            :py:class:`elasticgit.storage.lookup.LookupIndex`
+        """
+        lookup_index = LookupIndex(self, model_class, fields)
+        self.lookup_indexes[model_class] = lookup_index
+        return lookup_index
+
+    def lookup(self, model_class, field, value):
+        """
+        Find the UUIDs of a model class' instances with a field
+        matching the given value, without needing Elasticsearch.
+        The field needs to have been registered with
+        :py:func:`register_lookup`.
+
+        :param elasticgit.models.Model model_class:
+        :param str field:
+        :param object value:
+        :returns: list
+        """
+        if model_class not in self.lookup_indexes:
+            raise StorageException(
+                'No lookups registered for %r.' % (model_class,))
+        return self.lookup_indexes[model_class].lookup(field, value)
+
+    def history_index(self, branch_name=None):
+        """
+        Return the index of the commits that changed each object on a
+        branch. It is brought up to date when it is read, by
+        :py:func:`history` and :py:func:`git_metadata`, so commits and
+        pulls do not pay for it.
+
+        :param str branch_name:
+            The branch, defaults to the active branch.
+        :returns:
+            :py:class:`elasticgit.storage.history.HistoryIndex`
+        """
+        branch_name = branch_name or self.active_branch()
+        if branch_name not in self.history_indexes:
+            self.history_indexes[branch_name] = HistoryIndex(
+                self, branch_name)
+        return self.history_indexes[branch_name]
+
+    def history(self, uuid, limit=None, branch_name=None):
+        """
+        Return the commits that changed a model instance, newest first,
+        without walking the repository's history.
+
+        :param str uuid:
+            The model instance's UUID.
+        :param int limit:
+            The maximum number of commits to return.
+        :param str branch_name:
+            The branch, defaults to the active branch.
+        :returns:
+            A list of dictionaries with the ``commit`` SHA, the commit
+            ``timestamp`` and the ``status`` of the change, see
+            :py:func:`elasticgit.storage.history.HistoryIndex.history`.
+        """
+        with self.instrumentation.timer('history'):
+            return self.history_index(branch_name).history(uuid, limit=limit)
+
+    def git_metadata(self, model_class, uuids):
+        """
+        Return how several model instances are stored on the active
+        branch: the SHA of their blob and the SHA, time and author
+        of the last commit that changed them. The commits are
+        looked up in the history index, see :py:func:`history`.
+
+        :param elasticgit.models.Model model_class:
+        :param list uuids:
+        :returns:
+            A list of dictionaries with the ``blob`` and ``commit`` SHAs,
+            the commit ``timestamp`` as an ISO 8601 UTC string and
+            the ``author``'s ``name`` and ``email``, in the order of
+            the uuids.
+        """
+        branch_name = self.active_branch()
+        object_names = ['%s:%s' % (
+            branch_name, self.object_path(model_class, uuid))
+            for uuid in uuids]
+        with self.instrumentation.timer('git_metadata', model=model_class):
+            blobs = self.catfile_check.request_many(object_names)
+            # NOTE: bring the history index up to date once rather than
+            #       for every object.
+            history_index = self.history_index(branch_name)
+            history_index.update()
+            changes = []
+            for uuid in uuids:
+                entries = history_index.objects.get(uuid)
+                changes.append(entries[-1] if entries else (None, None, None))
+            # NOTE: look up the authors of the distinct commits at once.
+            authors = history_index.authors(
+                commit_sha for commit_sha, _, _ in changes if commit_sha)
+            metadata = []
+            for blob, (commit_sha, timestamp, _) in zip(blobs, changes):
+                metadata.append({
+                    'blob': blob[0],
+                    'commit': commit_sha,
+                    'timestamp': (
+                        datetime.utcfromtimestamp(timestamp).strftime(
+                            '%Y-%m-%dT%H:%M:%SZ')
+                        if timestamp is not None else None),
+                    'author': authors.get(commit_sha),
+                })
+        return metadata
 
     def load(self, file_path):
         """
@@ -148,18 +512,22 @@ class StorageManager(object):
 
         return self.get(*path_info)
 
-    def get_data(self, repo_path):
+    def get_data(self, repo_path, at=None):
         """
         Get the data for a file stored in git
 
         :param str repo_path:
             The path to the file in the Git repository
+        :param str at:
+            Optionally the commit to get the data at.
         :returns:
             str
         """
-        return self.repo.git.show('%s:%s' % (self.active_branch(), repo_path))
+        with self.instrumentation.timer('get_data', path=repo_path):
+            tree_ish, _ = self.read_from(at)
+            return self.catfile.get('%s:%s' % (tree_ish, repo_path))
 
-    def get(self, model_class, uuid):
+    def get(self, model_class, uuid, at=None):
         """
         Get a model instance by loading the data from git and constructing
         the model_class
@@ -168,14 +536,17 @@ class StorageManager(object):
             The model class of which an instance to return
         :param str uuid:
             The uuid for the object to retrieve
+        :param str at:
+            Optionally the commit to get the instance at, defaults to
+            the commit pinned with :py:func:`snapshot` or the active
+            branch.
         :returns:
             :py:class:elasticgit.models.Model
         """
-
-        object_data = self.get_data(
-            self.git_path(
-                model_class,
-                '%s.%s' % (uuid, self.serializer.suffix,)))
+        tree_ish, repo_layout = self.read_from(at)
+        repo_path = self.object_path(model_class, uuid, repo_layout)
+        with self.instrumentation.timer('get_data', path=repo_path):
+            object_data = self.catfile.get('%s:%s' % (tree_ish, repo_path))
 
         model = self.serializer.deserialize(model_class, object_data)
 
@@ -185,6 +556,39 @@ class StorageManager(object):
                     model.uuid, uuid))
         return model
 
+    def get_many(self, model_class, uuids, at=None):
+        """
+        Get several model instances of the same class at once, reading
+        them through a single ``git cat-file`` process.
+
+        :param elasticgit.models.Model model_class:
+            The model class of which instances to return
+        :param list uuids:
+            The uuids of the objects to retrieve
+        :param str at:
+            Optionally the commit to get the instances at.
+        :returns:
+            list of :py:class:elasticgit.models.Model, in the order of
+            the uuids.
+        """
+        tree_ish, repo_layout = self.read_from(at)
+        object_names = [
+            '%s:%s' % (tree_ish, self.object_path(
+                model_class, uuid, repo_layout))
+            for uuid in uuids]
+        with self.instrumentation.timer('get_data', model=model_class):
+            object_datas = self.catfile.get_many(object_names)
+
+        models = []
+        for uuid, object_data in zip(uuids, object_datas):
+            model = self.serializer.deserialize(model_class, object_data)
+            if model.uuid != uuid:
+                raise StorageException(
+                    'Data uuid (%s) does not match requested uuid (%s).' % (
+                        model.uuid, uuid))
+            models.append(model)
+        return models
+
     def store(self, model, message, author=None, committer=None):
         """
         Store an instance's data in Git.
@@ -200,22 +604,325 @@ class StorageManager(object):
             The committer information (name, email address).
             Defaults to the author if unspecified.
         :returns:
-            The commit.
+            The commit or ``None`` if the instance is already stored
+            with the same data.
         """
         if not isinstance(message, str):
             raise StorageException('Messages need to be bytestrings.')
 
+        changed = list(self.changed_data([model]))
+        if not changed:
+            return None
+
+        [(_, repo_path, data)] = changed
+        return self.store_data(
+            repo_path,
+            data,
+            message,
+            author=author, committer=committer)
+
+    def serialize(self, model):
         if model.uuid is None:
             raise StorageException('Cannot save a model without a UUID set.')
 
         if model.is_read_only():
             raise StorageException('Trying to save a read only model.')
 
-        return self.store_data(
-            self.git_name(model),
-            self.serializer.serialize(model),
-            message,
-            author=author, committer=committer)
+        with self.instrumentation.timer('serialize', model=model.__class__):
+            return self.serializer.serialize(model)
+
+    @contextmanager
+    def stored_shas(self):
+        """
+        Return a function looking up the SHA of the blob a file is
+        stored as on the active branch, ``None`` for files that are not
+        stored. All lookups share one ``git cat-file --batch-check``
+        process.
+        """
+        branch_name = self.active_branch()
+        with self.catfile_check.process() as process:
+            def stored_sha(repo_path):
+                try:
+                    return process.request(
+                        '%s:%s' % (branch_name, repo_path))[0]
+                except GitCommandError:
+                    return None
+            yield stored_sha
+
+    def changed_data(self, models):
+        """
+        Serialize instances and yield a ``(model, repo_path, data)``
+        tuple for each one whose data differs from the blob stored on
+        the active branch.
+
+        A blob with a different SHA is loaded and compared with the
+        data before it counts as changed. Blobs written by older
+        versions, before the JSON serializer sorted its keys, are then
+        not rewritten just because their keys are in another order.
+
+        :param iterable models:
+            The model instances, consumed one at a time.
+        """
+        with self.stored_shas() as stored_sha:
+            for model in models:
+                data = self.serialize(model)
+                repo_path = self.git_name(model)
+                sha = stored_sha(repo_path)
+                if sha == blob_sha(data):
+                    continue
+                if sha is not None and (
+                        self.serializer.loads(self.catfile.get(sha)) ==
+                        self.serializer.loads(data)):
+                    continue
+                yield model, repo_path, data
+
+    def changed_models(self, models):
+        """
+        Return the instances whose data differs from what is stored on
+        the active branch, these are the ones :py:func:`store` and
+        :py:func:`store_many` would write.
+
+        :param iterable models:
+            The model instances.
+        :returns: list
+        """
+        return [model for model, _, _ in self.changed_data(models)]
+
+    def store_many(self, models, message, author=None, committer=None):
+        """
+        Store several instances' data in Git in a single commit.
+
+        The models are streamed into ``git fast-import`` one at a time
+        so memory use does not grow with the number of models, the
+        index and working directory are updated once at the end.
+
+        :param iterable models:
+            The model instances, consumed one at a time.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if there were no models or all of them
+            are already stored with the same data.
+        """
+        def write_changes(stream):
+            count = 0
+            for _, repo_path, data in self.changed_data(models):
+                stream.write('M 100644 inline %s\ndata %d\n%s\n' % (
+                    repo_path, len(data), data))
+                count += 1
+            return count
+
+        with self.instrumentation.timer('store_many'):
+            return self.fast_import(
+                write_changes, message, author=author, committer=committer)
+
+    def delete_many(self, model_class, uuids, message, author=None,
+                    committer=None):
+        """
+        Delete several instances of a model class from Git in a single
+        commit, made with ``git fast-import``.
+
+        :param elasticgit.models.Model model_class:
+        :param list uuids:
+            The UUIDs of the instances to delete, UUIDs without an
+            instance in the repository are skipped.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if there was nothing to delete.
+        """
+        def write_changes(stream):
+            existing = set(self.uuids(model_class))
+            count = 0
+            for uuid in uuids:
+                if uuid not in existing:
+                    continue
+                existing.discard(uuid)
+                stream.write('D %s\n' % (
+                    self.object_path(model_class, uuid),))
+                count += 1
+            return count
+
+        with self.instrumentation.timer('delete_many', model=model_class):
+            return self.fast_import(
+                write_changes, message, author=author, committer=committer)
+
+    def ident(self, actor, default_variable):
+        if actor is None:
+            return self.repo.git.var(default_variable)
+        name, email = actor
+        return '%s <%s> %d +0000' % (name, email, time.time())
+
+    def fast_import(self, write_changes, message, author=None,
+                    committer=None):
+        """
+        Make a single commit on the active branch with
+        ``git fast-import`` and update the index and working directory
+        to match it.
+
+        :param callable write_changes:
+            Called with the stream to write the fast-import file change
+            commands to, returns the number of changes written.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if there were no changes.
+        """
+        if not isinstance(message, str):
+            raise StorageException('Messages need to be bytestrings.')
+
+        author_ident = self.ident(author, 'GIT_AUTHOR_IDENT')
+        committer_ident = (self.ident(committer, 'GIT_COMMITTER_IDENT')
+                           if committer or not author
+                           else author_ident)
+        head_sha = self.head_sha()
+
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                ['git', '--git-dir', self.repo.git_dir,
+                 'fast-import', '--quiet', '--done'],
+                stdin=subprocess.PIPE, stdout=stderr, stderr=stderr)
+            try:
+                stream = process.stdin
+                stream.write('commit refs/heads/%s\n' % (
+                    self.active_branch(),))
+                stream.write('author %s\n' % (author_ident,))
+                stream.write('committer %s\n' % (committer_ident,))
+                stream.write('data %d\n%s\n' % (len(message), message))
+                if head_sha is not None:
+                    stream.write('from %s\n' % (head_sha,))
+                count = write_changes(stream)
+            except:
+                process.kill()
+                process.wait()
+                raise
+
+            # NOTE: killing fast-import before ``done`` leaves the branch
+            #       untouched.
+            if not count:
+                process.kill()
+                process.wait()
+                return None
+
+            process.stdin.write('done\n')
+            process.stdin.close()
+            if process.wait() != 0:
+                stderr.seek(0)
+                raise StorageException(
+                    'git fast-import failed: %s' % (stderr.read(),))
+
+        # NOTE: fast-import only updates the branch, bring the index
+        #       and the working directory up to date with it. Refresh
+        #       the index's stat information first, files written
+        #       through GitPython's index otherwise look modified.
+        self.repo.git.update_index('-q', '--refresh')
+        if head_sha is None:
+            self.repo.git.read_tree('-m', '-u', 'HEAD')
+        else:
+            self.repo.git.read_tree('-m', '-u', head_sha, 'HEAD')
+        commit = self.repo.head.commit
+        if self.change_feed is not NULL_CHANGE_FEED:
+            self.change_feed.publish(
+                self.tree_changes(head_sha, commit.hexsha))
+        return commit
+
+    def tree_changes(self, old_sha, new_sha):
+        """
+        Return the change events for the model files that differ
+        between two commits, see :py:mod:`elasticgit.changes`.
+
+        :param str old_sha:
+            The SHA of the old commit, ``None`` for an empty tree.
+        :param str new_sha:
+            The SHA of the new commit.
+        :returns: list
+        """
+        args = [old_sha, new_sha] if old_sha else ['--root', new_sha]
+        output = self.repo.git.diff_tree('-r', '--no-renames', *args)
+        changes = []
+        for line in output.split('\n'):
+            if not line.startswith(':'):
+                continue
+            info, repo_path = line.split('\t', 1)
+            _, _, old_blob, new_blob, _ = info.split(' ')
+            changes.append(make_change(
+                repo_path,
+                None if old_blob == NULL_SHA else old_blob,
+                None if new_blob == NULL_SHA else new_blob,
+                new_sha))
+        return filter(None, changes)
+
+    def relayout(self, new_layout, message, author=None, committer=None):
+        """
+        Move the files of all model instances in the repository to where
+        they belong in another layout and commit the new
+        :py:data:`elasticgit.layout.LAYOUT_FILE` with them, in a single
+        commit. Other storage managers for the repository keep using the
+        layout they read until they :py:func:`pull`.
+
+        :param str new_layout:
+            One of :py:data:`elasticgit.layout.LAYOUTS`.
+        :param str message:
+            The commit message.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if the repository already uses the
+            layout.
+        """
+        if new_layout not in layout.LAYOUTS:
+            raise StorageException('Unknown layout %r.' % (new_layout,))
+
+        def write_changes(stream):
+            count = 0
+            if new_layout != self.layout:
+                data = '%s\n' % (new_layout,)
+                stream.write('M 100644 inline %s\ndata %d\n%s\n' % (
+                    layout.LAYOUT_FILE, len(data), data))
+                count += 1
+            if self.head_sha() is None:
+                return count
+            output = self.repo.git.ls_tree('-r', '--name-only', 'HEAD')
+            for file_path in filter(None, output.split('\n')):
+                info = layout.parse_path(file_path)
+                if info is None or load_model_class(info[0]) is None:
+                    continue
+                _, uuid = info
+                new_path = layout.object_path(
+                    '/'.join(file_path.split('/')[:2]), uuid,
+                    self.serializer.suffix, layout=new_layout)
+                if new_path != file_path:
+                    stream.write('R "%s" "%s"\n' % (file_path, new_path))
+                    count += 1
+            return count
+
+        with self.instrumentation.timer('relayout'):
+            commit = self.fast_import(
+                write_changes, message, author=author, committer=committer)
+        self._layout = None
+        return commit
 
     def store_data(self, repo_path, data, message,
                    author=None, committer=None):
@@ -237,7 +944,13 @@ class StorageManager(object):
         :returns:
             The commit
         """
+        with self.instrumentation.timer('store_data', path=repo_path):
+            commit = self._store_data(
+                repo_path, data, message, author=author, committer=committer)
+        return commit
 
+    def _store_data(self, repo_path, data, message,
+                    author=None, committer=None):
         # ensure the directory exists
         file_path = os.path.join(self.repo.working_dir, repo_path)
         dir_name = os.path.dirname(file_path)
@@ -253,10 +966,17 @@ class StorageManager(object):
 
         # add to the git index
         index = self.repo.index
-        index.add([file_path])
-        return index.commit(message,
-                            author=author_actor,
-                            committer=committer_actor)
+        old_entry = index.entries.get((repo_path, 0))
+        with self.instrumentation.timer('git_index', path=repo_path):
+            [new_entry] = index.add([file_path])
+        with self.instrumentation.timer('commit', path=repo_path):
+            commit = index.commit(message,
+                                  author=author_actor,
+                                  committer=committer_actor)
+        self.change_feed.publish(filter(None, [make_change(
+            repo_path, old_entry.hexsha if old_entry else None,
+            new_entry.hexsha, commit.hexsha)]))
+        return commit
 
     def delete(self, model, message, author=None, committer=None):
         """
@@ -306,12 +1026,18 @@ class StorageManager(object):
         author_actor = Actor(*author) if author else None
         committer_actor = Actor(*committer) if committer else author_actor
 
-        # Remove from the index
-        index = self.repo.index
-        index.remove([file_path], working_tree=True)
-        return index.commit(message,
-                            author=author_actor,
-                            committer=committer_actor)
+        with self.instrumentation.timer('delete_data', path=repo_path):
+            # Remove from the index
+            index = self.repo.index
+            old_entry = index.entries.get((repo_path, 0))
+            index.remove([file_path], working_tree=True)
+            commit = index.commit(message,
+                                  author=author_actor,
+                                  committer=committer_actor)
+        self.change_feed.publish(filter(None, [make_change(
+            repo_path, old_entry.hexsha if old_entry else None, None,
+            commit.hexsha)]))
+        return commit
 
     def storage_exists(self):
         """
@@ -380,6 +1106,11 @@ class StorageManager(object):
             The name of the remote to fetch from.
         """
         remote_name = remote_name or 'origin'
+        with self.instrumentation.timer(
+                'pull', remote=remote_name, branch=branch_name):
+            return self._pull(branch_name, remote_name)
+
+    def _pull(self, branch_name, remote_name):
         remote = self.repo.remote(name=remote_name)
         fetch_list = remote.fetch()
         fetch_info = fetch_list['%s/%s' % (remote_name, branch_name)]
@@ -393,5 +1124,7 @@ class StorageManager(object):
             diff = DiffIndex()
 
         self.repo.git.merge(fetch_info.commit)
+        # NOTE: the upstream may have moved to another layout.
+        self._layout = None
 
         return diff
@@ -0,0 +1,172 @@
+import os
+import json
+import threading
+
+from git import GitCommandError
+
+from elasticgit.utils import fqcn, projected_fields
+
+
+class LookupIndex(object):
+    """
+    A secondary index mapping field values to UUIDs for one model class.
+    It is built from the commits in the repository, kept up to date
+    incrementally by diffing the last indexed commit against ``HEAD``
+    and stored in the repository's ``.git`` directory keyed by the
+    commit it reflects.
+
+    :param elasticgit.storage.StorageManager storage_manager:
+    :param elasticgit.models.Model model_class:
+        The model class to index.
+    :param list fields:
+        The names of the fields to index.
+    """
+
+    def __init__(self, storage_manager, model_class, fields):
+        self.sm = storage_manager
+        self.model_class = model_class
+        self.fields = sorted(fields)
+        self.only = projected_fields(model_class, fields)
+        self.path = storage_manager.private_path(
+            'lookup', '%s.json' % (fqcn(model_class),))
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.commit = None
+        self.documents = {}
+        self.values = dict((field, {}) for field in self.fields)
+
+    def key(self, value):
+        return json.dumps(value, sort_keys=True)
+
+    def keys(self, value):
+        if isinstance(value, (list, tuple)):
+            return [self.key(item) for item in value]
+        return [self.key(value)]
+
+    def add(self, uuid, document):
+        self.remove(uuid)
+        self.documents[uuid] = document
+        for field in self.fields:
+            for key in self.keys(document.get(field)):
+                self.values[field].setdefault(key, set([])).add(uuid)
+
+    def remove(self, uuid):
+        document = self.documents.pop(uuid, None)
+        if document is None:
+            return
+        for field in self.fields:
+            for key in self.keys(document.get(field)):
+                uuids = self.values[field].get(key)
+                if uuids is not None:
+                    uuids.discard(uuid)
+                    if not uuids:
+                        del self.values[field][key]
+
+    def load(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'r') as fp:
+            data = json.load(fp)
+        if data['fields'] != self.fields:
+            return
+        for uuid, document in data['documents'].items():
+            self.add(uuid, document)
+        self.commit = data['commit']
+
+    def save(self):
+        dir_name = os.path.dirname(self.path)
+        if not os.path.isdir(dir_name):
+            os.makedirs(dir_name)
+        tmp_path = '%s.tmp' % (self.path,)
+        with open(tmp_path, 'w') as fp:
+            json.dump({
+                'commit': self.commit,
+                'fields': self.fields,
+                'documents': self.documents,
+            }, fp)
+        os.rename(tmp_path, self.path)
+
+    def read(self, commit, repo_path):
+        model = self.sm.serializer.deserialize(
+            self.model_class,
+            self.sm.catfile.get('%s:%s' % (commit, repo_path)),
+            only=self.only)
+        return model.uuid, dict(
+            (field, getattr(model, field)) for field in self.fields)
+
+    def changes(self, commit):
+        """
+        Return ``(status, path)`` tuples of the model files that changed
+        between the indexed commit and the given one, ``None`` if
+        the index needs to be rebuilt from scratch.
+        """
+        path = self.sm.git_path(self.model_class)
+        if self.commit is None:
+            return None
+        try:
+            output = self.sm.repo.git.diff(
+                '--name-status', '--no-renames', self.commit, commit,
+                '--', path)
+        except GitCommandError:
+            # The indexed commit is no longer in the repository.
+            return None
+        return [line.split('\t', 1)
+                for line in filter(None, output.split('\n'))]
+
+    def rebuild(self, commit):
+        self.reset()
+        output = self.sm.repo.git.ls_tree(
+            '-r', '--name-only', commit, '--',
+            self.sm.git_path(self.model_class))
+        for repo_path in filter(None, output.split('\n')):
+            self.add(*self.read(commit, repo_path))
+
+    def update(self):
+        """
+        Bring the index up to date with the commit the repository is at.
+        """
+        head_sha = self.sm.head_sha()
+        with self.lock:
+            if head_sha == self.commit:
+                return
+            if self.commit is None:
+                self.load()
+                if head_sha == self.commit:
+                    return
+            if head_sha is None:
+                self.reset()
+                return
+
+            changes = self.changes(head_sha)
+            if changes is None:
+                self.rebuild(head_sha)
+            else:
+                # NOTE: removals first, a file moved to another
+                #       directory shows up as a removal and an addition.
+                for status, repo_path in sorted(
+                        changes, key=lambda change: change[0] != 'D'):
+                    if status == 'D':
+                        uuid, _, _ = os.path.basename(
+                            repo_path).partition('.')
+                        self.remove(uuid)
+                    else:
+                        self.add(*self.read(head_sha, repo_path))
+            self.commit = head_sha
+            self.save()
+
+    def lookup(self, field, value):
+        """
+        Return the UUIDs of the objects whose field has the given value.
+        For list fields any of the items in the list can match.
+
+        :param str field:
+        :param object value:
+        :returns: list
+        """
+        if field not in self.values:
+            raise ValueError('%s is not indexed for %r.' % (
+                field, self.model_class))
+        self.update()
+        return sorted(self.values[field].get(self.key(value), ()))
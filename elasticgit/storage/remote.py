@@ -8,9 +8,10 @@ import requests
 
 from zope.interface import implements
 
-from elasticgit.models import Model
 from elasticgit.istorage import IStorageManager
-from elasticgit.utils import fqcn, load_class
+from elasticgit.layout import parse_path
+from elasticgit.utils import fqcn, load_model_class, projected_fields
+from elasticgit.instrumentation import NULL_INSTRUMENTATION
 
 
 log = logging.getLogger(__name__)
@@ -23,6 +24,9 @@ class RemoteStorageException(Exception):
 class RemoteStorageManager(object):
     implements(IStorageManager)
 
+    #: The :py:class:`elasticgit.instrumentation.Instrumentation` to use.
+    instrumentation = NULL_INSTRUMENTATION
+
     def __init__(self, repo_url):
         self.repo_url = repo_url
         parse_result = urlparse(self.repo_url)
@@ -44,6 +48,11 @@ class RemoteStorageManager(object):
         response.raise_for_status()
         return response.json()['branch']
 
+    def head_sha(self):
+        response = self.mk_request('GET', self.url())
+        response.raise_for_status()
+        return response.json().get('commit')
+
     def url(self, *parts):
         path = [self.repo_name]
         path.extend(parts)
@@ -71,10 +80,28 @@ class RemoteStorageManager(object):
         raise RemoteStorageException(
             'Remote storage is read only.')
 
-    def iterate(self, model_class):
-        response = self.mk_request('GET', self.url(fqcn(model_class)))
+    def iterate(self, model_class, only=None, at=None):
+        self.check_at(at)
+        with self.instrumentation.timer('iterate', model=model_class):
+            return self._iterate(model_class, only=only)
+
+    def _iterate(self, model_class, only=None):
+        url = self.url(fqcn(model_class))
+        if only is None:
+            response = self.mk_request('GET', url)
+            response.raise_for_status()
+            return [model_class(obj).set_read_only()
+                    for obj in response.json()]
+
+        fields = projected_fields(model_class, only)
+        response = self.mk_request('GET', '%s?%s' % (
+            url, urllib.urlencode({'only': ','.join(fields)})))
         response.raise_for_status()
-        return [model_class(obj).set_read_only() for obj in response.json()]
+        # NOTE: trim the objects in case the server does not support
+        #       the ``only`` parameter and returns full objects.
+        return [model_class(dict(
+            (key, obj[key]) for key in fields if key in obj
+        ), partial=fields) for obj in response.json()]
 
     def path_info(self, file_path):
         """
@@ -85,31 +112,62 @@ class RemoteStorageManager(object):
         :returns:
             (model_class, uuid) tuple or ``None`` if not a model file path.
         """
-        try:
-            module_name, class_name, file_name = file_path.split('/', 3)
-            uuid, suffix = file_name.split('.', 2)
-            model_class = load_class('%s.%s' % (module_name, class_name))
-            if not issubclass(model_class, Model):
-                raise RemoteStorageException('%r does not subclass %r' % (
-                    model_class, Model))
+        info = parse_path(file_path)
+        if info is None:
+            log.debug('%s does not look like a model file path.' % (
+                file_path,))
+            return None
+        class_path, uuid = info
+        model_class = load_model_class(class_path)
+        if model_class is not None:
             return model_class, uuid
-        except ValueError, e:
-            log.warn('%s does not look like a model file path.' % (
-                file_path,), exc_info=True)
-        except ImportError, e:
-            log.warn(e, exc_info=True)
-        except RemoteStorageException, e:
-            log.warn(e, exc_info=True)
-
-    def get(self, model_class, uuid):
-        response = self.mk_request('GET', self.url(fqcn(model_class), uuid))
-        response.raise_for_status()
+
+    def check_at(self, at):
+        if at is not None:
+            raise RemoteStorageException(
+                'Remote storage can only read the latest commit.')
+
+    def snapshot(self, at=None):
+        raise RemoteStorageException(
+            'Remote storage can only read the latest commit.')
+
+    def history(self, uuid, limit=None, branch_name=None):
+        raise RemoteStorageException(
+            'Remote storage does not keep a history index.')
+
+    def git_metadata(self, model_class, uuids):
+        raise RemoteStorageException(
+            'Remote storage does not expose Git metadata.')
+
+    def get(self, model_class, uuid, at=None):
+        self.check_at(at)
+        with self.instrumentation.timer('get_data', model=model_class):
+            response = self.mk_request(
+                'GET', self.url(fqcn(model_class), uuid))
+            response.raise_for_status()
         return model_class(response.json()).set_read_only()
 
+    def get_many(self, model_class, uuids, at=None):
+        self.check_at(at)
+        return [self.get(model_class, uuid) for uuid in uuids]
+
     def store(self, model, message, author=None, committer=None):
         raise RemoteStorageException(
             'Remote storage is read only.')
 
+    def store_many(self, models, message, author=None, committer=None):
+        raise RemoteStorageException(
+            'Remote storage is read only.')
+
+    def changed_models(self, models):
+        raise RemoteStorageException(
+            'Remote storage is read only.')
+
+    def delete_many(self, model_class, uuids, message, author=None,
+                    committer=None):
+        raise RemoteStorageException(
+            'Remote storage is read only.')
+
     def store_data(self, repo_path, data, message,
                    author=None, committer=None):
         raise RemoteStorageException(
@@ -125,10 +183,12 @@ class RemoteStorageManager(object):
             'Remote storage is read only.')
 
     def pull(self, branch_name='master', remote_name='origin'):
-        response = self.mk_request('POST', '%s?%s' % (
-            self.url(), urllib.urlencode({
-                'branch': branch_name,
-                'remote': remote_name,
-            })))
-        response.raise_for_status()
-        return response.json()
+        with self.instrumentation.timer(
+                'pull', remote=remote_name, branch=branch_name):
+            response = self.mk_request('POST', '%s?%s' % (
+                self.url(), urllib.urlencode({
+                    'branch': branch_name,
+                    'remote': remote_name,
+                })))
+            response.raise_for_status()
+            return response.json()
@@ -59,14 +59,19 @@ class ModelBaseTest(TestCase):
                      auto_destroy=None,
                      initial_commit=True,
                      config_name='Test Kees',
-                     config_email='kees@example.org'):
+                     config_email='kees@example.org',
+                     local=False):
         working_dir = working_dir or self.WORKING_DIR
         name = name or self.id()
         index_prefix = index_prefix or self.mk_index_prefix()
         auto_destroy = auto_destroy or self.destroy
-        workspace = EG.workspace(os.path.join(working_dir, name), es={
-            'urls': [url],
-        }, index_prefix=index_prefix)
+        if local:
+            workspace = EG.local_workspace(
+                os.path.join(working_dir, name), index_prefix=index_prefix)
+        else:
+            workspace = EG.workspace(os.path.join(working_dir, name), es={
+                'urls': [url],
+            }, index_prefix=index_prefix)
         if auto_destroy:
             self.addCleanup(workspace.destroy)
 
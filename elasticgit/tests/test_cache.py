@@ -0,0 +1,101 @@
+from elasticgit.tests.base import ModelBaseTest, TestPerson
+from elasticgit.cache import QueryCache, LRUCacheBackend, ClientCacheBackend
+
+
+class DictClient(dict):
+
+    def set(self, key, value):
+        self[key] = value
+
+
+class TestQueryCache(ModelBaseTest):
+
+    def test_lru_eviction(self):
+        backend = LRUCacheBackend(max_size=2)
+        backend.set('a', '1')
+        backend.set('b', '2')
+        self.assertEqual(backend.get('a'), '1')
+        backend.set('c', '3')
+        self.assertEqual(backend.get('b'), None)
+        self.assertEqual(backend.get('a'), '1')
+        self.assertEqual(backend.get('c'), '3')
+
+    def test_client_backend(self):
+        client = DictClient()
+        backend = ClientCacheBackend(client, key_prefix='foo:')
+        backend.set('a', '1')
+        self.assertEqual(client, {'foo:0:a': '1'})
+        self.assertEqual(backend.get('a'), '1')
+
+        backend.clear()
+        self.assertEqual(backend.get('a'), None)
+        backend.set('a', '2')
+        self.assertEqual(client['foo:1:a'], '2')
+        self.assertEqual(
+            ClientCacheBackend(client, key_prefix='foo:').get('a'), '2')
+
+    def test_make_key(self):
+        cache = QueryCache()
+        key = cache.make_key({'query': {}}, ['i'], ['t'], {'i': 'sha1'})
+        self.assertEqual(
+            key, cache.make_key({'query': {}}, ['i'], ['t'], {'i': 'sha1'}))
+        self.assertNotEqual(
+            key, cache.make_key({'query': {}}, ['i'], ['t'], {'i': 'sha2'}))
+
+    def test_get_or_search(self):
+        cache = QueryCache()
+        responses = []
+
+        def search():
+            responses.append({'hits': {'total': 0, 'hits': []}})
+            return responses[-1]
+
+        self.assertEqual(
+            cache.get_or_search('key', search), responses[0])
+        self.assertEqual(
+            cache.get_or_search('key', search), responses[0])
+        self.assertEqual(len(responses), 1)
+        self.assertEqual(cache.stats(), {
+            'hits': 1,
+            'misses': 1,
+            'hit_rate': 0.5,
+        })
+
+    def test_workspace_query_cache(self):
+        query_cache = QueryCache()
+        workspace = self.mk_workspace()
+        workspace.query_cache = query_cache
+
+        workspace.save(TestPerson({'age': 1, 'name': 'Foo'}), 'Save 1')
+        workspace.refresh_index()
+        self.assertEqual(workspace.S(TestPerson).count(), 1)
+        self.assertEqual(workspace.S(TestPerson).count(), 1)
+        self.assertEqual(query_cache.stats()['hits'], 1)
+
+        # saving moves the commit SHA on and so invalidates the cache
+        workspace.save(TestPerson({'age': 2, 'name': 'Bar'}), 'Save 2')
+        workspace.refresh_index()
+        self.assertEqual(workspace.S(TestPerson).count(), 2)
+        self.assertEqual(query_cache.stats(), {
+            'hits': 1,
+            'misses': 2,
+            'hit_rate': 1 / 3.0,
+        })
+
+    def test_workspace_query_cache_pending_writes(self):
+        query_cache = QueryCache()
+        workspace = self.mk_workspace()
+        workspace.query_cache = query_cache
+
+        # NOTE: searches may not see the save before the index is
+        #       refreshed and so are not cached.
+        workspace.save(TestPerson({'age': 1, 'name': 'Foo'}), 'Save 1')
+        workspace.S(TestPerson).count()
+        workspace.S(TestPerson).count()
+        self.assertEqual(query_cache.stats()['hits'], 0)
+        self.assertEqual(query_cache.stats()['misses'], 0)
+
+        workspace.refresh_index()
+        self.assertEqual(workspace.S(TestPerson).count(), 1)
+        self.assertEqual(workspace.S(TestPerson).count(), 1)
+        self.assertEqual(query_cache.stats()['hits'], 1)
@@ -0,0 +1,109 @@
+import threading
+
+from mock import patch
+
+from git import Repo, GitCommandError
+
+from elasticgit.tests.base import ModelBaseTest, TestPerson
+from elasticgit.storage.local import StorageManager
+from elasticgit.storage.catfile import CatFilePool, get_pool, close_pools
+
+
+class TestCatFilePool(ModelBaseTest):
+
+    def setUp(self):
+        self.workspace = self.mk_workspace(local=True)
+        self.sm = self.workspace.sm
+        self.person = TestPerson({'age': 1, 'name': 'Foo'})
+        self.workspace.save(self.person, 'Saving Foo')
+        self.object_name = '%s:%s' % (
+            self.sm.active_branch(), self.sm.git_name(self.person))
+
+    def test_get(self):
+        pool = CatFilePool(self.sm.repo.git_dir)
+        self.addCleanup(pool.close)
+        self.assertEqual(
+            pool.get(self.object_name),
+            self.sm.repo.git.show(self.object_name))
+
+    def test_get_missing(self):
+        pool = CatFilePool(self.sm.repo.git_dir)
+        self.addCleanup(pool.close)
+        self.assertRaises(GitCommandError, pool.get, 'master:does/not/exist')
+        # the process survives a missing object
+        self.assertEqual(len(pool.idle), 1)
+        self.assertTrue(pool.get(self.object_name))
+
+    def test_get_missing_with_spaces(self):
+        pool = CatFilePool(self.sm.repo.git_dir)
+        self.addCleanup(pool.close)
+        self.assertRaises(
+            GitCommandError, pool.get, 'master:does not/exist 1')
+        self.assertEqual(len(pool.idle), 1)
+
+    def test_batch_check(self):
+        pool = CatFilePool(self.sm.repo.git_dir, batch_check=True)
+        self.addCleanup(pool.close)
+        sha, object_type, size, data = pool.request(self.object_name)
+        self.assertEqual(object_type, 'blob')
+        self.assertEqual(
+            size, len(self.sm.repo.git.show(self.object_name)))
+        self.assertEqual(data, None)
+
+    def test_get_many(self):
+        person = TestPerson({'age': 2, 'name': 'Bar'})
+        self.workspace.save(person, 'Saving Bar')
+        pool = CatFilePool(self.sm.repo.git_dir)
+        self.addCleanup(pool.close)
+        names = [self.object_name, '%s:%s' % (
+            self.sm.active_branch(), self.sm.git_name(person))]
+        self.assertEqual(
+            pool.get_many(names),
+            [self.sm.repo.git.show(name) for name in names])
+
+    def test_restart(self):
+        pool = CatFilePool(self.sm.repo.git_dir)
+        self.addCleanup(pool.close)
+        pool.get(self.object_name)
+        [process] = pool.idle
+        process.process.kill()
+        process.process.wait()
+        self.assertTrue(pool.get(self.object_name))
+        [new_process] = pool.idle
+        self.assertNotEqual(process, new_process)
+
+    def test_concurrency_limit(self):
+        pool = CatFilePool(self.sm.repo.git_dir, max_processes=2)
+        self.addCleanup(pool.close)
+        results = []
+
+        def read():
+            for _ in range(10):
+                results.append(pool.get(self.object_name))
+
+        threads = [threading.Thread(target=read) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 50)
+        self.assertEqual(len(set(results)), 1)
+        self.assertTrue(len(pool.idle) <= 2)
+
+    def test_shared_pool(self):
+        sm = StorageManager(Repo(self.sm.workdir))
+        self.assertTrue(sm.catfile is self.sm.catfile)
+        self.assertTrue(
+            get_pool(self.sm.repo.git_dir) is self.sm.catfile)
+        self.assertEqual(sm.get(TestPerson, self.person.uuid), self.person)
+
+    def test_forked_pool(self):
+        pool = get_pool(self.sm.repo.git_dir)
+        with patch('os.getpid', return_value=-1):
+            forked_pool = self.sm.catfile
+            self.assertFalse(forked_pool is pool)
+            self.assertEqual(
+                self.sm.get(TestPerson, self.person.uuid), self.person)
+            close_pools()
+        self.assertEqual(forked_pool.idle, [])
+        self.assertTrue(get_pool(self.sm.repo.git_dir) is pool)
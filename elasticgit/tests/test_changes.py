@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+
+from elasticgit.tests.base import ModelBaseTest, TestPerson
+from elasticgit.changes import (
+    ChangeFeed, FileTransport, UnixSocketTransport)
+from elasticgit.utils import fqcn
+
+
+class TestChangeFeed(ModelBaseTest):
+
+    def setUp(self):
+        self.changes = []
+        self.change_feed = ChangeFeed([self.changes.extend])
+        self.workspace = self.mk_workspace(local=True)
+        self.workspace.publish_changes(self.change_feed)
+
+    def blob_sha(self, commit, model):
+        return self.workspace.repo.commit(commit).tree[
+            self.workspace.sm.git_name(model)].hexsha
+
+    def test_save_and_delete(self):
+        person = TestPerson({'age': 1, 'name': 'Foo'})
+        self.workspace.save(person, 'Saving Foo')
+        added = self.workspace.sm.head_sha()
+        self.workspace.save(person.update({'age': 2}), 'Updating Foo')
+        updated = self.workspace.sm.head_sha()
+        self.workspace.delete(person, 'Deleting Foo')
+        deleted = self.workspace.sm.head_sha()
+
+        self.assertEqual(
+            [(c['model'], c['uuid']) for c in self.changes],
+            [(fqcn(TestPerson), person.uuid)] * 3)
+        self.assertEqual(
+            [(c['old_sha'], c['new_sha'], c['commit'])
+             for c in self.changes], [
+                (None, self.blob_sha(added, person), added),
+                (self.blob_sha(added, person),
+                 self.blob_sha(updated, person), updated),
+                (self.blob_sha(updated, person), None, deleted)])
+
+    def test_store_many(self):
+        people = [TestPerson({'age': i, 'name': 'Name %s' % (i,)})
+                  for i in range(3)]
+        commit = self.workspace.sm.store_many(people, 'Saving people.')
+        self.assertEqual(
+            sorted((c['uuid'], c['new_sha']) for c in self.changes),
+            sorted((person.uuid, self.blob_sha(commit.hexsha, person))
+                   for person in people))
+
+    def test_index_diff(self):
+        person = TestPerson({'age': 1, 'name': 'Foo'})
+        self.workspace.sm.store(person, 'Saving Foo')
+        old_commit = self.workspace.repo.head.commit
+        self.workspace.sm.store(person.update({'age': 2}), 'Updating Foo')
+        new_commit = self.workspace.repo.head.commit
+        del self.changes[:]
+
+        self.workspace.index_diff(old_commit.diff(new_commit))
+        [change] = self.changes
+        self.assertEqual(change['uuid'], person.uuid)
+        self.assertEqual(
+            change['old_sha'], self.blob_sha(old_commit.hexsha, person))
+        self.assertEqual(
+            change['new_sha'], self.blob_sha(new_commit.hexsha, person))
+        self.assertEqual(change['commit'], new_commit.hexsha)
+
+
+class TestTransports(ModelBaseTest):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def assert_delivered(self, publisher, subscriber):
+        received = []
+        ChangeFeed([], transports=[publisher]).publish(
+            [{'uuid': str(i)} for i in range(250)])
+        feed = ChangeFeed([received.extend], transports=[subscriber])
+        self.assertEqual(feed.poll(), 250)
+        self.assertEqual([change['uuid'] for change in received],
+                         map(str, range(250)))
+        self.assertEqual(feed.poll(), 0)
+
+    def test_file_transport(self):
+        path = os.path.join(self.directory, 'changes.jsonl')
+        self.assert_delivered(FileTransport(path), FileTransport(path))
+
+    def test_file_transport_skips_existing(self):
+        path = os.path.join(self.directory, 'changes.jsonl')
+        FileTransport(path).send('source', [{'uuid': 'foo'}])
+        self.assertEqual(FileTransport(path).receive(), [])
+
+    def test_unix_socket_transport(self):
+        publisher = UnixSocketTransport(self.directory, batch_size=100)
+        subscriber = UnixSocketTransport(self.directory)
+        subscriber.listen()
+        self.addCleanup(subscriber.close)
+        self.assert_delivered(publisher, subscriber)
+
+    def test_unix_socket_transport_stale(self):
+        stale = UnixSocketTransport(self.directory)
+        stale.listen()
+        stale.sock.close()
+        UnixSocketTransport(self.directory).send('source', [{'uuid': 'foo'}])
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_own_changes(self):
+        path = os.path.join(self.directory, 'changes.jsonl')
+        received = []
+        feed = ChangeFeed([received.append], transports=[FileTransport(path)])
+        feed.publish([{'uuid': 'foo'}])
+        self.assertEqual(len(received), 1)
+        self.assertEqual(feed.poll(), 0)
+        self.assertEqual(len(received), 1)
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import subprocess
+
+from unittest import TestCase
+
+
+HEAVY_MODULES = [
+    'git', 'elasticutils', 'elasticsearch', 'requests', 'unidecode',
+    'pkg_resources', 'jinja2', 'avro', 'IPython',
+]
+
+
+class TestImports(TestCase):
+
+    def loaded_modules(self, statement):
+        code = '\n'.join([
+            'import sys, json',
+            statement,
+            'print json.dumps(sorted(sys.modules.keys()))',
+        ])
+        output = subprocess.check_output(
+            [sys.executable, '-c', code],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(
+                os.path.abspath(__file__)))))
+        return set(name.split('.')[0] for name in json.loads(output))
+
+    def assertNotLoaded(self, statement):
+        loaded = self.loaded_modules(statement)
+        self.assertEqual(
+            [name for name in HEAVY_MODULES if name in loaded], [])
+
+    def test_models(self):
+        self.assertNotLoaded('import elasticgit.models')
+
+    def test_package(self):
+        self.assertNotLoaded(
+            'import elasticgit; elasticgit.__version__')
+
+    def test_tools(self):
+        self.assertNotLoaded('import elasticgit.tools')
+
+    def test_lazy_attributes(self):
+        self.assertNotLoaded('import elasticgit; elasticgit.utils')
+        loaded = self.loaded_modules('from elasticgit import EG')
+        self.assertTrue('git' in loaded)
+        self.assertTrue('elasticutils' in loaded)
+
+    def test_lazy_objects(self):
+        import elasticgit
+        from elasticgit import workspace
+        self.assertTrue(sys.modules['elasticgit'] is elasticgit)
+        self.assertTrue(elasticgit.EG is workspace.EG)
+        self.assertTrue(elasticgit.F is workspace.F)
+        self.assertTrue(elasticgit.Q is workspace.Q)
+        self.assertTrue(issubclass(elasticgit.Q, workspace.Q))
+        self.assertTrue(isinstance(elasticgit.F(a=1), workspace.F))
+        self.assertRaises(AttributeError, getattr, elasticgit, 'missing')
+        self.assertTrue('EG' in dir(elasticgit))
+
+    def test_version(self):
+        import elasticgit
+        from elasticgit.models import version_info
+        self.assertEqual(
+            elasticgit.__version__, version_info['package_version'])
@@ -0,0 +1,83 @@
+from elasticgit.tests.base import ModelBaseTest, TestPerson
+from elasticgit.instrumentation import (
+    Instrumentation, MetricsCollector, NULL_INSTRUMENTATION)
+from elasticgit.utils import fqcn
+
+
+class TestInstrumentation(ModelBaseTest):
+
+    def setUp(self):
+        self.events = []
+        self.collector = MetricsCollector()
+        self.instrumentation = Instrumentation([
+            self.collector,
+            lambda *args: self.events.append(args),
+        ])
+        self.workspace = self.mk_workspace(local=True)
+        self.workspace.instrument(self.instrumentation)
+
+    def operations(self):
+        return [operation for operation, _, _, _ in self.events]
+
+    def test_default(self):
+        workspace = self.mk_workspace(name='%s_default' % (self.id(),),
+                                      local=True)
+        self.assertTrue(workspace.sm.instrumentation is NULL_INSTRUMENTATION)
+        self.assertTrue(workspace.im.instrumentation is NULL_INSTRUMENTATION)
+
+    def test_save(self):
+        person = TestPerson({'age': 1, 'name': 'Foo'})
+        self.workspace.save(person, 'Saving Foo')
+        self.assertEqual(self.operations(), [
+            'serialize', 'git_index', 'commit', 'store_data', 'index',
+            'save'])
+        for operation, duration, tags, error in self.events:
+            self.assertEqual(tags['model'], fqcn(TestPerson))
+            self.assertFalse(error)
+            self.assertTrue(duration >= 0)
+        [(_, _, index_tags, _)] = [
+            event for event in self.events if event[0] == 'index']
+        self.assertEqual(
+            index_tags['index'], self.workspace.im.index_name('master'))
+
+    def test_read_and_delete(self):
+        person = TestPerson({'age': 1, 'name': 'Foo'})
+        self.workspace.save(person, 'Saving Foo')
+        self.workspace.refresh_index()
+        self.events[:] = []
+
+        self.workspace.sm.get(TestPerson, person.uuid)
+        list(self.workspace.sm.iterate(TestPerson))
+        self.workspace.S(TestPerson).count()
+        self.workspace.delete(person, 'Deleting Foo')
+        self.assertEqual(self.operations(), [
+            'get_data', 'get_data', 'iterate', 'search', 'delete_data',
+            'raw_unindex', 'delete'])
+
+    def test_error(self):
+        self.assertRaises(
+            Exception, self.workspace.sm.get, TestPerson, 'does-not-exist')
+        [(operation, _, tags, error)] = self.events
+        self.assertEqual(operation, 'get_data')
+        self.assertTrue(error)
+
+    def test_collector(self):
+        for i in range(3):
+            self.workspace.save(
+                TestPerson({'age': i, 'name': 'Foo'}), 'Saving Foo')
+        stats = dict(
+            (operation, metric)
+            for operation, tags, metric in self.collector.stats())
+        self.assertEqual(stats['save']['count'], 3)
+        self.assertEqual(stats['save']['errors'], 0)
+        self.assertTrue(stats['save']['total'] >= stats['commit']['total'])
+        self.assertTrue(
+            'elasticgit.save.count:3|c|#model:%s' % (fqcn(TestPerson),)
+            in self.collector.statsd())
+        self.assertTrue(
+            'elasticgit_operation_seconds_count{model="%s",'
+            'operation="save"} 3' % (fqcn(TestPerson),)
+            in self.collector.prometheus())
+
+        self.collector.reset()
+        self.assertEqual(self.collector.stats(), [])
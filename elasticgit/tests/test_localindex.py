@@ -0,0 +1,159 @@
+import os
+
+from mock import patch
+
+from elasticgit.tests.base import ModelBaseTest, TestPerson, TestPage
+from elasticgit.localindex import (
+    LocalIndexManager, LocalIndexException, LocalS)
+
+
+class TestLocalIndex(ModelBaseTest):
+
+    def setUp(self):
+        self.workspace = self.mk_workspace(local=True)
+
+    def mk_people(self):
+        people = [
+            TestPerson({'age': 10, 'name': 'Foo'}),
+            TestPerson({'age': 20, 'name': 'Bar'}),
+            TestPerson({'age': 30, 'name': 'Baz Foo'}),
+        ]
+        for person in people:
+            self.workspace.save(person, 'Saving %s' % (person.name,))
+        self.workspace.refresh_index()
+        return people
+
+    def test_setup(self):
+        self.assertTrue(self.workspace.exists())
+        self.assertTrue(self.workspace.index_ready())
+        self.assertTrue(isinstance(self.workspace.S(TestPerson), LocalS))
+
+    def test_query(self):
+        self.mk_people()
+        self.assertEqual(self.workspace.S(TestPerson).count(), 3)
+        self.assertEqual(
+            self.workspace.S(TestPerson).query(name__match='foo').count(), 2)
+        self.assertEqual(
+            self.workspace.S(TestPerson).filter(name='foo').count(), 2)
+        # analyzed fields are indexed lowercased, as with Elasticsearch
+        self.assertEqual(
+            self.workspace.S(TestPerson).filter(name='Foo').count(), 0)
+
+    def test_filter_range_and_order_by(self):
+        self.mk_people()
+        people = self.workspace.S(TestPerson).filter(
+            age__gte=20).order_by('-age')
+        self.assertEqual([p.age for p in people], [30, 20])
+        people = self.workspace.S(TestPerson).order_by('age')
+        self.assertEqual([p.age for p in people[1:]], [20, 30])
+
+    def test_not_analyzed(self):
+        page = TestPage({'title': 'A Page', 'slug': 'a-page',
+                         'language': 'eng_GB'})
+        self.workspace.save(page, 'Saving a page')
+        [result] = self.workspace.S(TestPage).filter(language='eng_GB')
+        self.assertEqual(result.to_object(), page)
+        self.assertEqual(result.get_object(), page)
+
+    def test_delete(self):
+        person, _, _ = self.mk_people()
+        self.workspace.delete(person, 'Deleting a person')
+        self.assertEqual(self.workspace.S(TestPerson).count(), 2)
+        self.assertEqual(
+            self.workspace.S(TestPerson).filter(uuid=person.uuid).count(), 0)
+
+    def test_persistence(self):
+        people = self.mk_people()
+        person = TestPerson({'age': 40, 'name': 'Journaled'})
+        self.workspace.save(person, 'Saving a person')
+
+        im = LocalIndexManager(
+            self.workspace.sm, self.workspace.index_prefix)
+        s = LocalS(im.get_mapping_type(TestPerson))
+        self.assertEqual(
+            set([p.uuid for p in s.everything()]),
+            set([p.uuid for p in people + [person]]))
+
+    def test_sync(self):
+        person = TestPerson({'age': 10, 'name': 'Foo'})
+        self.workspace.sm.store(person, 'Saving without indexing')
+        updated, removed = self.workspace.sync(TestPerson)
+        self.assertEqual(updated, set([person.uuid]))
+        self.assertEqual(removed, set([]))
+        self.assertEqual(self.workspace.S(TestPerson).count(), 1)
+
+    def test_custom_mapping(self):
+        self.workspace.setup_custom_mapping(TestPerson, {
+            'properties': {
+                'name': {'type': 'string', 'index': 'not_analyzed'},
+                'age': {'type': 'integer'},
+            }
+        })
+        self.mk_people()
+        self.assertEqual(
+            self.workspace.S(TestPerson).filter(name='Baz Foo').count(), 1)
+        self.assertEqual(
+            self.workspace.get_mapping(TestPerson)['properties']['name'],
+            {'type': 'string', 'index': 'not_analyzed'})
+
+    def test_only(self):
+        self.mk_people()
+        [person] = self.workspace.S(TestPerson).filter(age=10).only('name')
+        obj = person.to_object()
+        self.assertTrue(obj.is_partial())
+        self.assertEqual(obj.name, 'Foo')
+        self.assertEqual(obj.age, None)
+
+    def test_get_objects(self):
+        people = self.mk_people()
+        self.assertEqual(
+            self.workspace.S(TestPerson).order_by('-age').get_objects(),
+            people[::-1])
+
+    def test_unsupported(self):
+        self.assertRaises(
+            LocalIndexException,
+            self.workspace.S(TestPerson).filter(name__fuzzy='foo').count)
+
+    def test_index_without_setup(self):
+        branch = self.workspace.sm.active_branch()
+        self.workspace.im.destroy_index(branch, TestPerson)
+        self.assertFalse(self.workspace.im.index_exists(branch))
+        person = TestPerson({'age': 10, 'name': 'Foo'})
+        self.workspace.save(person, 'Saving a person')
+        self.assertTrue(self.workspace.im.index_exists(branch))
+        self.assertEqual(self.workspace.S(TestPerson).count(), 1)
+        self.assertTrue(self.workspace.im.index_ready(branch, TestPerson))
+
+    def test_journal_compaction(self):
+        branch = self.workspace.sm.active_branch()
+        index = self.workspace.im.get_index(branch)
+        people = self.mk_people()
+        self.workspace.save(
+            people[1].update({'age': 21}), 'Updating a person')
+
+        reader = LocalIndexManager(
+            self.workspace.sm, self.workspace.index_prefix)
+        s = LocalS(reader.get_mapping_type(TestPerson))
+        self.assertEqual(s.count(), 3)
+
+        with patch.object(index, 'journal_size', 1024):
+            self.workspace.save(
+                people[0].update({'name': 'A' * 1024}), 'Growing a person')
+        self.assertEqual(os.path.getsize(index.journal_path), 0)
+        self.workspace.delete(people[1], 'Deleting a person')
+
+        s = LocalS(reader.get_mapping_type(TestPerson))
+        self.assertEqual(
+            set([p.uuid for p in s.everything()]),
+            set([people[0].uuid, people[2].uuid]))
+
+    def test_iter_all(self):
+        people = self.mk_people()
+        s = self.workspace.S(TestPerson).order_by('age')
+        with patch.object(LocalS, '_results', wraps=s._results) as results:
+            self.assertEqual(
+                [p.uuid for p in s.iter_all(batch_size=2)],
+                [p.uuid for p in people])
+        self.assertEqual(
+            [len(args[1]) for args, _ in results.call_args_list], [2, 1])
@@ -3,6 +3,8 @@
 import os
 
 from elasticgit import EG
+from elasticgit.workspace import Workspace
+from elasticgit.search import GIT_METADATA_MAPPING
 from elasticgit.models import IntegerField
 from elasticgit.tests.base import ModelBaseTest, TestPage, TestPerson
 
@@ -40,6 +42,89 @@ class TestManager(ModelBaseTest):
             mapping_type.get_mapping_type_name(),
             'confmodel-config-TempModelType')
 
+    def test_index_per_model(self):
+        workspace = Workspace(
+            self.workspace.repo, {'urls': ['http://localhost']},
+            '%s-per-model' % (self.workspace.index_prefix,),
+            index_per_model=True, index_settings={
+                TestPerson: {'number_of_replicas': 0},
+            })
+        self.addCleanup(workspace.im.destroy_index, 'master')
+        workspace.save(TestPerson({'age': 1, 'name': 'Name'}), 'Person')
+        workspace.save(TestPage({
+            'title': 'Title', 'slug': 'title', 'language': 'eng_GB'}),
+            'Page')
+        workspace.refresh_index()
+
+        person_index = workspace.im.index_name('master', TestPerson)
+        self.assertEqual(
+            workspace.im.get_mapping_type(TestPerson).get_index(),
+            person_index)
+        self.assertEqual(
+            person_index,
+            '%s-master-elasticgit.tests.base.testperson' % (
+                workspace.index_prefix,))
+        self.assertTrue(workspace.im.index_exists('master', TestPerson))
+        self.assertTrue(workspace.im.index_exists('master', TestPage))
+        self.assertEqual(workspace.S(TestPerson).count(), 1)
+        self.assertEqual(workspace.S(TestPage).count(), 1)
+
+        settings = workspace.im.es.indices.get_settings(index=person_index)
+        self.assertEqual(
+            settings[person_index]['settings']['index'][
+                'number_of_replicas'], '0')
+
+    def test_index_per_model_branches(self):
+        workspace = Workspace(
+            self.workspace.repo, {'urls': ['http://localhost']},
+            '%s-branches' % (self.workspace.index_prefix,),
+            index_per_model=True)
+        self.addCleanup(workspace.im.destroy_index, 'master')
+        self.addCleanup(workspace.im.destroy_index, 'master-2', TestPerson)
+        workspace.save(TestPerson({'age': 1, 'name': 'Name'}), 'Person')
+        workspace.im.create_index('master-2', TestPerson)
+
+        # NOTE: the indexes of the branch named master-2 are not
+        #       indexes of the master branch.
+        self.assertEqual(
+            workspace.im.indexes('master'),
+            workspace.im.index_name('master', TestPerson))
+        workspace.im.destroy_index('master')
+        self.assertTrue(workspace.im.index_exists('master-2', TestPerson))
+
+        # NOTE: a model class without instances is searchable, searching
+        #       it does not create its index.
+        self.assertEqual(workspace.S(TestPage).count(), 0)
+        self.assertEqual(list(workspace.S(TestPage).iter_all()), [])
+        self.assertFalse(workspace.im.index_exists('master', TestPage))
+
+    def test_git_metadata(self):
+        workspace = Workspace(
+            self.workspace.repo, {'urls': ['http://localhost']},
+            self.workspace.index_prefix, git_metadata=True)
+        self.assertTrue(workspace.setup_mapping(TestPerson))
+        first = TestPerson({'age': 1, 'name': 'First'})
+        second = TestPerson({'age': 2, 'name': 'Second'})
+        workspace.save(first, 'Saving the first person')
+        workspace.save(second, 'Saving the second person')
+        workspace.refresh_index()
+
+        head = workspace.repo.head.commit.hexsha
+        [latest] = workspace.S(TestPerson).filter(**{'_git.commit': head})
+        self.assertEqual(latest.uuid, second.uuid)
+        metadata = latest.get_git_metadata()
+        self.assertEqual(metadata['author']['name'], 'Test Kees')
+        self.assertEqual(
+            metadata['blob'],
+            workspace.repo.head.commit.tree[
+                workspace.sm.git_name(second)].hexsha)
+        self.assertEqual(
+            workspace.S(TestPerson).order_by('-_git.timestamp').count(), 2)
+        self.assertEqual(
+            workspace.get_mapping(TestPerson)['properties']['_git'][
+                'properties']['commit'],
+            GIT_METADATA_MAPPING['properties']['commit'])
+
     def test_indexable(self):
         model_class = self.mk_model({
             'age': IntegerField('An age')
@@ -115,3 +115,34 @@ class TestModel(ModelBaseTest):
                     'b': {'type': 'string'},
                 }
             })
+
+    def test_partial(self):
+        model_class = self.mk_model({
+            'age': IntegerField('An age'),
+            'name': TextField('A name'),
+        })
+        model = model_class({'name': 'foo', 'uuid': 'the-uuid'})
+        self.assertFalse(model.is_partial())
+        self.assertEqual(model.missing_fields(), [])
+
+        self.assertIs(model.set_partial(['name', 'uuid']), model)
+        self.assertTrue(model.is_partial())
+        self.assertTrue(model.is_read_only())
+        self.assertEqual(model.missing_fields(), ['_version', 'age'])
+        self.assertRaises(ConfigError, model.update, {'age': 1})
+
+    def test_partial_required(self):
+        model_class = self.mk_model({
+            'age': IntegerField('An age'),
+            'title': TextField('A title', required=True),
+        })
+        self.assertRaises(ConfigError, model_class, {'age': 1})
+        model = model_class(
+            {'age': 1, 'uuid': 'the-uuid'}, partial=['age', 'uuid'])
+        self.assertTrue(model.is_partial())
+        self.assertTrue(model.is_read_only())
+        self.assertEqual(model.age, 1)
+        self.assertEqual(model.title, None)
+        self.assertEqual(model.missing_fields(), ['_version', 'title'])
+        self.assertRaises(
+            ConfigError, model_class, {'age': 'foo'}, partial=['age'])
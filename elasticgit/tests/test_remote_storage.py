@@ -108,6 +108,28 @@ class TestRemoteStorage(ModelBaseTest):
                 'GET', 'http://www.example.org/repos/foo/%s.json' % (
                     fqcn(TestPerson),))
 
+    def test_iterate_only(self):
+        with patch.object(self.rsm, 'mk_request') as mock:
+            response = Response()
+            response.encoding = 'utf-8'
+            response._content = json.dumps([{
+                'uuid': 'person1',
+                'age': 1,
+                'name': 'person1'
+            }])
+            mock.return_value = response
+            [person1] = self.rsm.iterate(TestPerson, only=['name'])
+            self.assertEqual(person1.uuid, 'person1')
+            self.assertEqual(person1.name, 'person1')
+            self.assertEqual(person1.age, None)
+            self.assertTrue(person1.is_partial())
+            self.assertEqual(person1.missing_fields(), ['age'])
+
+            mock.assert_called_with(
+                'GET', 'http://www.example.org/repos/foo/%s.json?%s' % (
+                    fqcn(TestPerson),
+                    urllib.urlencode({'only': '_version,name,uuid'})))
+
     def test_get(self):
         with patch.object(self.rsm, 'mk_request') as mock:
             response = Response()
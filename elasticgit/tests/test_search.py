@@ -2,14 +2,17 @@ import os
 import json
 from datetime import datetime
 
-from mock import patch
+from mock import patch, Mock
 from requests import Response
 
 from elasticutils import S as SBase
+from elasticsearch.client import Elasticsearch
 
 from elasticgit.tests.base import ModelBaseTest, TestPerson
 from elasticgit.search import (
-    ReadOnlyModelMappingType, index_name, S, SM, RepoHelper)
+    ReadOnlyModelMappingType, index_name, S, SM, RepoHelper, msearch,
+    SearchException, ESManager)
+from elasticgit.storage import RemoteStorageManager
 
 
 class TestSearch(ModelBaseTest):
@@ -62,6 +65,56 @@ class TestSearch(ModelBaseTest):
             self.assertEqual(helper.active_branch_name(), 'foo')
             self.assertEqual(helper.default_index_prefix(), 'repo1')
 
+    def test_repo_helper_head_sha(self):
+        helper = RepoHelper('http://localhost/repos/head_sha.json')
+        with patch.object(helper.rsm, 'mk_request') as mock:
+            response = Response()
+            response.encoding = 'utf-8'
+            response._content = json.dumps({'commit': 'abc'})
+            mock.return_value = response
+            self.assertEqual(helper.head_sha(), 'abc')
+            self.assertEqual(helper.head_sha(), 'abc')
+            self.assertEqual(mock.call_count, 1)
+
+            helper.head_sha_ttl = 0
+            self.assertEqual(helper.head_sha(), 'abc')
+            self.assertEqual(mock.call_count, 2)
+
+    def test_remote_index_version(self):
+        rsm = RemoteStorageManager(
+            'http://localhost/repos/index_version.json')
+        im = ESManager(rsm, None, 'index_version')
+        with patch.object(rsm, 'mk_request') as mock:
+            response = Response()
+            response.encoding = 'utf-8'
+            response._content = json.dumps({'commit': 'abc'})
+            mock.return_value = response
+            self.assertEqual(im.index_version('index_version-master'), 'abc')
+            self.assertEqual(im.index_version('index_version-master'), 'abc')
+            self.assertEqual(mock.call_count, 1)
+
+    def test_index_version(self):
+        sm = self.workspace1.sm
+        im = ESManager(sm, None, self.index_prefix1)
+        MappingType = Mock()
+        MappingType.get_index.return_value = 'index'
+        written = sm.store(TestPerson({'age': 1, 'name': 'Foo'}), 'Save 1')
+
+        im.finish_write(MappingType, refresh_index=False)
+        self.assertEqual(im.index_version('index'), None)
+        im.pending_writes['index'] = (written.hexsha, 0)
+        self.assertEqual(im.index_version('index'), written.hexsha)
+
+        # NOTE: commits not indexed yet, like pulled ones, do not
+        #       change the version of the index.
+        sm.store(TestPerson({'age': 2, 'name': 'Bar'}), 'Save 2')
+        self.assertEqual(im.index_version('index'), written.hexsha)
+        self.assertEqual(im.index_version('other'), sm.head_sha())
+
+        im.finish_write(MappingType, refresh_index=True)
+        self.assertTrue(MappingType.refresh_index.called)
+        self.assertEqual(im.index_version('index'), sm.head_sha())
+
     def test_get_repo_indexes(self):
         index1 = index_name(self.index_prefix1, self.repo1.active_branch.name)
         index2 = index_name(self.index_prefix2, self.repo2.active_branch.name)
@@ -173,6 +226,61 @@ class TestSearch(ModelBaseTest):
             persons,
             [person1, person2])
 
+    def test_multi(self):
+        for age in [10, 20]:
+            self.workspace1.save(
+                TestPerson({'age': age, 'name': 'Foo'}), 'Saving a person')
+        self.workspace2.save(
+            TestPerson({'age': 30, 'name': 'Foo'}), 'Saving a person')
+        self.workspace1.im.es.indices.refresh()
+
+        searches = SM(
+            TestPerson,
+            in_=[self.repo1.working_dir, self.repo2.working_dir],
+            index_prefixes=[self.index_prefix1, self.index_prefix2]) \
+            .order_by('-age')[:1].multi()
+        self.assertEqual(
+            [s_obj.get_indexes() for s_obj in searches],
+            [[index_name(self.index_prefix1, 'master')],
+             [index_name(self.index_prefix2, 'master')]])
+
+        [results1, results2] = msearch(searches)
+        self.assertEqual(
+            [result.to_object().age for result in results1], [20])
+        self.assertEqual(
+            [result.to_object().age for result in results2], [30])
+        self.assertEqual(results1.count, 2)
+
+    def test_msearch_error(self):
+        s_obj = SM(TestPerson, in_=[self.repo1.working_dir],
+                   index_prefixes=['does-not-exist'])
+        self.assertRaises(SearchException, msearch, [s_obj])
+
+    def test_iter_all(self):
+        people = [TestPerson({'age': i, 'name': 'Foo'}) for i in range(5)]
+        self.workspace1.sm.store_many(people, 'Saving people')
+        self.workspace1.reindex(TestPerson)
+        self.workspace1.refresh_index()
+
+        s_obj = self.workspace1.S(TestPerson).only('uuid')[:1]
+        results = list(s_obj.iter_all(batch_size=2))
+        self.assertEqual(
+            sorted(result.uuid for result in results),
+            sorted(person.uuid for person in people))
+        self.assertTrue(results[0].to_object().is_partial())
+
+    def test_iter_all_interrupted(self):
+        for i in range(3):
+            self.workspace1.save(
+                TestPerson({'age': i, 'name': 'Foo'}), 'Saving a person')
+        self.workspace1.refresh_index()
+
+        iterator = self.workspace1.S(TestPerson).iter_all(batch_size=1)
+        next(iterator)
+        with patch.object(Elasticsearch, 'clear_scroll') as clear_scroll:
+            iterator.close()
+        self.assertEqual(clear_scroll.call_count, 1)
+
     def test_mapping_type_metadata(self):
         person = TestPerson({
             'age': 12,
@@ -185,3 +293,28 @@ class TestSearch(ModelBaseTest):
         self.assertEqual(person.es_meta.index,
                          '%s-master' % self.workspace1.index_prefix)
         self.assertEqual(person.to_object().es_meta, person.es_meta)
+
+    def test_only(self):
+        person = TestPerson({
+            'age': 12,
+            'name': 'Foo'
+        })
+        self.workspace1.save(person, 'Saving person')
+        self.workspace1.refresh_index()
+
+        s_obj = self.workspace1.S(TestPerson).only('name')
+        self.assertEqual(
+            s_obj.build_search()['_source'],
+            {'include': ['_version', 'name', 'uuid']})
+
+        [result] = s_obj
+        partial_person = result.to_object()
+        self.assertEqual(partial_person.uuid, person.uuid)
+        self.assertEqual(partial_person.name, 'Foo')
+        self.assertEqual(partial_person.age, None)
+        self.assertTrue(partial_person.is_partial())
+        self.assertEqual(partial_person.missing_fields(), ['age'])
+
+    def test_only_unknown_field(self):
+        s_obj = SM(TestPerson, in_=[]).only('foo')
+        self.assertRaises(ValueError, s_obj.build_search)
@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
 
+import json
 import os
 import shutil
 
-from elasticgit.tests.base import ModelBaseTest, TestPerson
+from collections import OrderedDict
+from datetime import datetime
+
+from mock import patch
+
+from elasticgit.tests.base import (
+    ModelBaseTest, TestPerson, TestPage, TestFallbackPerson)
 from elasticgit import EG
 from elasticgit.storage import StorageException, StorageManager
 from elasticgit.istorage import IStorageManager
@@ -61,6 +68,92 @@ class TestStorage(ModelBaseTest):
             StorageException, self.sm.store, p, 'Crashing a person.')
         self.assertTrue(self.sm.store(new_p, 'Saving a person.'))
 
+    def test_store_many(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(3)]
+        self.sm.store(people[0], 'Saving a person.')
+        commit = self.sm.store_many(
+            iter(people[1:]), 'Saving people.',
+            author=('Foo Bar', 'foo@example.org'))
+        self.assertEqual(commit.message, 'Saving people.')
+        self.assertEqual(commit.author.name, 'Foo Bar')
+        self.assertEqual(commit.committer.name, 'Foo Bar')
+        self.assertEqual(
+            sorted(self.sm.uuids(TestPerson)),
+            sorted(person.uuid for person in people))
+        for person in people:
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.workspace.working_dir,
+                self.sm.git_name(person))))
+        self.assertEqual(self.sm.store_many([], 'Nothing.'), None)
+        self.assertEqual(self.sm.head_sha(), commit.hexsha)
+
+    def test_store_unchanged(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        other = TestPerson({'age': 2, 'name': 'Other'})
+        commit = self.sm.store(person, 'Saving a person.')
+        self.assertEqual(
+            self.sm.store(TestPerson(dict(person)), 'Saving it again.'),
+            None)
+        self.assertEqual(self.sm.head_sha(), commit.hexsha)
+
+        commit = self.sm.store_many(
+            [TestPerson(dict(person)), other], 'Saving people.')
+        self.assertEqual(
+            [c['commit'] for c in self.sm.history(person.uuid)],
+            [commit.parents[0].hexsha])
+        self.assertEqual(
+            [c['commit'] for c in self.sm.history(other.uuid)],
+            [commit.hexsha])
+        self.assertEqual(
+            self.sm.store_many([TestPerson(dict(other))], 'Again.'), None)
+        self.assertEqual(self.sm.head_sha(), commit.hexsha)
+
+        changed = TestPerson(dict(other)).update({'age': 3})
+        self.assertEqual(
+            self.sm.changed_models([TestPerson(dict(person)), changed]),
+            [changed])
+
+    def test_store_unchanged_unsorted(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        data = dict(person)
+        commit = self.sm.store_data(
+            self.sm.git_name(person),
+            json.dumps(OrderedDict(
+                (key, data[key]) for key in sorted(data, reverse=True))),
+            'Saving a person in an older format.')
+        self.assertEqual(
+            self.sm.store(TestPerson(dict(person)), 'Saving it again.'),
+            None)
+        self.assertEqual(self.sm.head_sha(), commit.hexsha)
+
+        self.assertTrue(
+            self.sm.store(person.update({'age': 2}), 'Updating it.'))
+        self.assertEqual(
+            self.sm.get_data(self.sm.git_name(person)),
+            self.sm.serialize(person.update({'age': 2})))
+
+    def test_store_many_readonly(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        head_sha = self.sm.head_sha()
+        self.assertRaises(
+            StorageException, self.sm.store_many, [
+                person.update({'age': 2}), person], 'Saving people.')
+        self.assertEqual(self.sm.head_sha(), head_sha)
+
+    def test_delete_many(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(3)]
+        self.sm.store_many(people, 'Saving people.')
+        commit = self.sm.delete_many(
+            TestPerson, [people[0].uuid, people[1].uuid, 'unknown'],
+            'Deleting people.')
+        self.assertEqual(commit.message, 'Deleting people.')
+        self.assertEqual(self.sm.uuids(TestPerson), [people[2].uuid])
+        self.assertFalse(os.path.isfile(os.path.join(
+            self.workspace.working_dir, self.sm.git_name(people[0]))))
+        self.assertEqual(
+            self.sm.delete_many(TestPerson, ['unknown'], 'Nothing.'), None)
+        self.assertEqual(self.sm.head_sha(), commit.hexsha)
+
     def test_delete(self):
         p = TestPerson({
             'age': 1,
@@ -128,6 +221,278 @@ class TestStorage(ModelBaseTest):
             set([reloaded_person1.uuid, reloaded_person2.uuid]),
             set([person1.uuid, person2.uuid]))
 
+    def test_iterate_only(self):
+        person = TestPerson({
+            'age': 1,
+            'name': 'Test Kees 1'
+        })
+        self.sm.store(person, 'Saving person')
+        [partial_person] = self.sm.iterate(TestPerson, only=['name'])
+        self.assertEqual(partial_person.uuid, person.uuid)
+        self.assertEqual(partial_person.name, 'Test Kees 1')
+        self.assertEqual(partial_person.age, None)
+        self.assertTrue(partial_person.is_partial())
+        self.assertTrue(partial_person.is_read_only())
+        self.assertEqual(partial_person.missing_fields(), ['age'])
+
+    def test_iterate_only_fallbacks(self):
+        person = TestFallbackPerson({'age': 1, 'nick': 'Kees'})
+        self.sm.store(person, 'Saving person')
+        [partial_person] = self.sm.iterate(TestFallbackPerson, only=['name'])
+        self.assertEqual(partial_person.name, 'Kees')
+        self.assertEqual(partial_person.missing_fields(), ['age'])
+
+    def test_lookup(self):
+        self.sm.register_lookup(TestPage, 'slug', 'language')
+        page1 = TestPage({'title': 'One', 'slug': 'one', 'language': 'eng'})
+        page2 = TestPage({'title': 'Two', 'slug': 'two', 'language': 'eng'})
+        self.sm.store(page1, 'Saving page 1')
+        self.assertEqual(self.sm.lookup(TestPage, 'slug', 'one'),
+                         [page1.uuid])
+
+        self.sm.store(page2, 'Saving page 2')
+        self.assertEqual(self.sm.lookup(TestPage, 'language', 'eng'),
+                         sorted([page1.uuid, page2.uuid]))
+
+        self.sm.delete(page1, 'Deleting page 1')
+        self.assertEqual(self.sm.lookup(TestPage, 'slug', 'one'), [])
+        self.assertEqual(self.sm.lookup(TestPage, 'language', 'eng'),
+                         [page2.uuid])
+
+        # loaded from disk by a fresh storage manager
+        sm = StorageManager(self.workspace.repo)
+        lookup_index = sm.register_lookup(TestPage, 'slug', 'language')
+        lookup_index.load()
+        self.assertEqual(lookup_index.commit, self.sm.head_sha())
+        self.assertEqual(sm.lookup(TestPage, 'slug', 'two'), [page2.uuid])
+
+    def test_lookup_unregistered(self):
+        self.assertRaises(
+            StorageException, self.sm.lookup, TestPage, 'slug', 'one')
+        self.sm.register_lookup(TestPage, 'slug')
+        self.assertRaises(
+            ValueError, self.sm.lookup, TestPage, 'title', 'One')
+
+    def test_get_many(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(3)]
+        for person in people:
+            self.sm.store(person, 'Saving a person')
+        uuids = self.sm.uuids(TestPerson)
+        self.assertEqual(
+            sorted(uuids), sorted(person.uuid for person in people))
+        self.assertEqual(list(self.sm.iter_uuids(TestPerson)), uuids)
+        self.assertEqual(list(self.sm.iter_uuids(TestPage)), [])
+        self.assertEqual(self.sm.get_many(TestPerson, uuids), [
+            self.sm.get(TestPerson, uuid) for uuid in uuids])
+        self.assertRaises(
+            GitCommandError, self.sm.get_many, TestPerson, ['foo'])
+
+    def test_model_classes(self):
+        self.assertEqual(self.sm.model_classes(), [])
+        self.sm.store(TestPerson({'age': 1, 'name': 'Name'}), 'Saving')
+        self.sm.store_data('foo/bar/baz.json', '{}', 'Not a model')
+        self.assertEqual(self.sm.model_classes(), [TestPerson])
+
+    def test_sharded_layout(self):
+        self.assertEqual(self.sm.layout, 'flat')
+        self.sm.store_data('.elasticgit/layout', 'sharded\n', 'Sharding.')
+        sm = StorageManager(self.workspace.repo)
+        self.assertEqual(sm.layout, 'sharded')
+        person = TestPerson({'age': 1, 'name': 'Name', 'uuid': 'abcdef'})
+        sm.store(person, 'Saving a person.')
+        self.assertEqual(
+            sm.git_name(person),
+            'elasticgit.tests.base/TestPerson/ab/cd/abcdef.json')
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.workspace.working_dir, sm.git_name(person))))
+        self.assertEqual(sm.get(TestPerson, 'abcdef'), person)
+        self.assertEqual(list(sm.iterate(TestPerson)), [person])
+        self.assertEqual(sm.uuids(TestPerson), ['abcdef'])
+        self.assertEqual(
+            sm.path_info(sm.git_name(person)), (TestPerson, 'abcdef'))
+        sm.delete(person, 'Deleting a person.')
+        self.assertEqual(sm.uuids(TestPerson), [])
+
+    def test_relayout(self):
+        self.sm.register_lookup(TestPerson, 'name')
+        people = [TestPerson({'age': i, 'name': 'Name %s' % (i,)})
+                  for i in range(3)]
+        for person in people:
+            self.sm.store(person, 'Saving a person.')
+        self.sm.store_data('README.md', '# Hello World', 'Read me')
+        self.assertEqual(self.sm.lookup(TestPerson, 'name', 'Name 1'),
+                         [people[1].uuid])
+
+        commit = self.sm.relayout('sharded', 'Sharding.')
+        self.assertEqual(commit.message, 'Sharding.')
+        self.assertEqual(self.sm.layout, 'sharded')
+        self.assertEqual(
+            StorageManager(self.workspace.repo).layout, 'sharded')
+        self.assertEqual(self.sm.relayout('sharded', 'Again.'), None)
+        for person in people:
+            self.assertTrue(self.sm.git_name(person).endswith(
+                '/%s/%s/%s.json' % (
+                    person.uuid[:2], person.uuid[2:4], person.uuid)))
+            self.assertTrue(os.path.isfile(os.path.join(
+                self.workspace.working_dir, self.sm.git_name(person))))
+            self.assertEqual(self.sm.get(TestPerson, person.uuid), person)
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.workspace.working_dir, 'README.md')))
+        self.assertEqual(self.sm.lookup(TestPerson, 'name', 'Name 1'),
+                         [people[1].uuid])
+
+        self.sm.relayout('flat', 'Flattening.')
+        self.assertEqual(
+            sorted(self.sm.uuids(TestPerson)),
+            sorted(person.uuid for person in people))
+        self.assertEqual(self.sm.get(TestPerson, people[0].uuid), people[0])
+
+    def test_get_at(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        first = self.sm.store(person, 'Saving a person.').hexsha
+        updated = person.update({'age': 2})
+        self.sm.store(updated, 'Updating a person.')
+        self.assertEqual(self.sm.get(TestPerson, person.uuid).age, 2)
+        self.assertEqual(
+            self.sm.get(TestPerson, person.uuid, at=first).age, 1)
+        self.assertEqual(
+            [p.age for p in self.sm.get_many(
+                TestPerson, [person.uuid], at=first)], [1])
+        self.assertEqual(
+            [p.age for p in self.sm.iterate(TestPerson, at=first)], [1])
+        self.assertEqual(
+            [p.age for p in self.sm.iterate(
+                TestPerson, only=['age'], at=first)], [1])
+        self.assertEqual(
+            list(self.sm.iterate(TestPerson, at='HEAD~2')), [])
+        self.assertEqual(self.sm._trees.keys(), [first])
+
+    def test_snapshot(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        first = self.sm.store(person, 'Saving a person.').hexsha
+        with self.sm.snapshot() as commit:
+            self.assertEqual(commit, first)
+            self.sm.store(person.update({'age': 2}), 'Updating a person.')
+            self.assertEqual(self.sm.get(TestPerson, person.uuid).age, 1)
+            self.assertEqual(
+                [p.age for p in self.sm.iterate(TestPerson)], [1])
+        self.assertEqual(self.sm.get(TestPerson, person.uuid).age, 2)
+
+    def test_snapshot_ref(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        first = self.sm.store(person, 'Saving a person.').hexsha
+        with self.sm.snapshot(at='master') as commit:
+            self.assertEqual(commit, first)
+            self.sm.store(person.update({'age': 2}), 'Updating a person.')
+            self.assertEqual(self.sm.get(TestPerson, person.uuid).age, 1)
+
+    def test_history(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        other = TestPerson({'age': 1, 'name': 'Other'})
+        added = self.sm.store(person, 'Saving a person.').hexsha
+        self.sm.store(other, 'Saving another person.')
+        self.assertEqual(
+            [c['commit'] for c in self.sm.history(person.uuid)], [added])
+
+        # NOTE: later commits are indexed when the history is next read.
+        history_index = self.sm.history_index()
+        with patch.object(history_index, 'update') as update:
+            updated = self.sm.store(
+                person.update({'age': 2}), 'Updating a person.').hexsha
+            deleted = self.sm.delete(person, 'Deleting a person.').hexsha
+        self.assertFalse(update.called)
+        history = self.sm.history(person.uuid)
+        self.assertEqual(
+            [(c['commit'], c['status']) for c in history],
+            [(deleted, 'D'), (updated, 'M'), (added, 'A')])
+        self.assertEqual(
+            [c['commit'] for c in self.sm.history(person.uuid, limit=1)],
+            [deleted])
+
+        sm = StorageManager(self.workspace.repo)
+        self.assertEqual(sm.history(person.uuid), history)
+        self.assertEqual(sm.history('unknown'), [])
+
+    def test_history_reset(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        added = self.sm.store(person, 'Saving a person.').hexsha
+        self.sm.store(person.update({'age': 2}), 'Updating a person.')
+        self.assertEqual(len(self.sm.history(person.uuid)), 2)
+        self.workspace.repo.git.reset('--hard', added)
+        self.assertEqual(
+            [c['commit'] for c in self.sm.history(person.uuid)], [added])
+
+    def test_history_shared(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        other = StorageManager(self.workspace.repo)
+        added = self.sm.store(person, 'Saving a person.').hexsha
+        self.assertEqual(len(self.sm.history(person.uuid)), 1)
+        updated = other.store(
+            person.update({'age': 2}), 'Updating a person.').hexsha
+        self.assertEqual(len(other.history(person.uuid)), 2)
+        deleted = self.sm.delete(person, 'Deleting a person.').hexsha
+        self.assertEqual(len(self.sm.history(person.uuid)), 3)
+
+        # NOTE: commits journaled by either are only indexed once.
+        sm = StorageManager(self.workspace.repo)
+        self.assertEqual(
+            [c['commit'] for c in sm.history(person.uuid)],
+            [deleted, updated, added])
+
+    def test_git_metadata(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        other = TestPerson({'age': 1, 'name': 'Other'})
+        added = self.sm.store(
+            person, 'Saving a person.',
+            author=('Foo Bar', 'foo@example.org'))
+        self.sm.store(other, 'Saving another person.')
+
+        [metadata] = self.sm.git_metadata(TestPerson, [person.uuid])
+        self.assertEqual(metadata['commit'], added.hexsha)
+        self.assertEqual(
+            metadata['blob'], added.tree[self.sm.git_name(person)].hexsha)
+        self.assertEqual(
+            metadata['author'],
+            {'name': 'Foo Bar', 'email': 'foo@example.org'})
+        self.assertEqual(
+            metadata['timestamp'],
+            datetime.utcfromtimestamp(added.committed_date).strftime(
+                '%Y-%m-%dT%H:%M:%SZ'))
+
+        history_index = self.sm.history_index()
+        with patch.object(
+                history_index, 'update', wraps=history_index.update) as mock:
+            self.assertEqual(
+                [m['commit'] for m in self.sm.git_metadata(
+                    TestPerson, [person.uuid, other.uuid])],
+                [added.hexsha, self.sm.head_sha()])
+            self.assertEqual(mock.call_count, 1)
+
+    def test_git_metadata_authors(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        self.sm.store(
+            person, 'Saving a person.',
+            author=('Foo Bar', 'foo@example.org'))
+        with patch.object(Repo, 'commit') as commit:
+            [metadata] = self.sm.git_metadata(TestPerson, [person.uuid])
+        self.assertFalse(commit.called)
+        self.assertEqual(
+            metadata['author'],
+            {'name': 'Foo Bar', 'email': 'foo@example.org'})
+
+        # NOTE: journals written by older versions have no authors.
+        path = self.sm.history_index().path
+        with open(path, 'r') as fp:
+            entries = [json.loads(line) for line in fp]
+        with open(path, 'w') as fp:
+            for entry in entries:
+                fp.write('%s\n' % (json.dumps(entry[:3]),))
+        sm = StorageManager(self.workspace.repo)
+        [metadata] = sm.git_metadata(TestPerson, [person.uuid])
+        self.assertEqual(
+            metadata['author'],
+            {'name': 'Foo Bar', 'email': 'foo@example.org'})
+
     def test_load(self):
         person = TestPerson({
             'age': 1,
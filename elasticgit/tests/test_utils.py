@@ -1,6 +1,8 @@
-from elasticgit.tests.base import ModelBaseTest
+from elasticgit.tests.base import ModelBaseTest, TestPerson
 from elasticgit.models import IntegerField, TextField
-from elasticgit.utils import introspect_properties
+from elasticgit.utils import (
+    introspect_properties, load_model_class, clear_model_class_cache)
+from elasticgit import utils
 
 
 class TestUtils(ModelBaseTest):
@@ -19,3 +21,29 @@ class TestUtils(ModelBaseTest):
 
     def test_introspect_string(self):
         self.assertMappingType(TextField, 'string')
+
+    def test_load_model_class(self):
+        clear_model_class_cache()
+        self.addCleanup(clear_model_class_cache)
+        self.assertEqual(
+            load_model_class('elasticgit.tests.base.TestPerson'), TestPerson)
+        self.assertEqual(load_model_class('does_not_exist.Foo'), None)
+        self.assertEqual(load_model_class('elasticgit.utils.fqcn'), None)
+        self.assertEqual(utils._model_classes, {
+            'elasticgit.tests.base.TestPerson': TestPerson,
+            'does_not_exist.Foo': None,
+            'elasticgit.utils.fqcn': None,
+        })
+
+        def load_class(class_path):
+            raise AssertionError('Should have been cached.')
+
+        self.patch_load_class(load_class)
+        self.assertEqual(
+            load_model_class('elasticgit.tests.base.TestPerson'), TestPerson)
+        self.assertEqual(load_model_class('does_not_exist.Foo'), None)
+
+    def patch_load_class(self, load_class):
+        original = utils.load_class
+        utils.load_class = load_class
+        self.addCleanup(setattr, utils, 'load_class', original)
@@ -1,6 +1,8 @@
 import types
 import os
 
+from StringIO import StringIO
+
 from elasticgit.tests.base import ModelBaseTest, TestPerson, TestPage
 from elasticgit.search import ReadWriteModelMappingType
 from elasticgit.workspace import RemoteWorkspace, Workspace, S
@@ -66,6 +68,43 @@ class TestWorkspace(ModelBaseTest):
             u'scheme': 'http',
         })
 
+    def test_export_import(self):
+        people = [TestPerson({'age': i, 'name': 'Name %s' % (i,)})
+                  for i in range(3)]
+        for person in people:
+            self.workspace.save(person, 'Saving a person.')
+
+        fp = StringIO()
+        self.assertEqual(self.workspace.export(TestPerson, fp), 3)
+
+        workspace = self.mk_workspace(
+            name='%s_import' % (self.id(),),
+            index_prefix='%s_import' % (self.workspace.index_prefix,))
+        commits = len(list(workspace.repo.iter_commits()))
+        fp.seek(0)
+        self.assertEqual(
+            workspace.import_(fp, batch_size=2, refresh_index=True), 3)
+        self.assertEqual(
+            len(list(workspace.repo.iter_commits())), commits + 2)
+        self.assertEqual(
+            sorted(workspace.sm.iterate(TestPerson), key=lambda m: m.uuid),
+            sorted(people, key=lambda m: m.uuid))
+        self.assertEqual(
+            sorted(result.uuid for result in workspace.S(TestPerson)),
+            sorted(person.uuid for person in people))
+
+    def test_history(self):
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        self.workspace.save(person, 'Saving a person.')
+        self.workspace.save(person.update({'age': 2}), 'Updating a person.')
+        commits = [c.hexsha for c in self.workspace.repo.iter_commits(
+            'master', max_count=2)]
+        self.assertEqual(
+            [c['commit'] for c in self.workspace.history(person)], commits)
+        self.assertEqual(
+            [c['commit'] for c in self.workspace.history(
+                person.uuid, limit=1)], commits[:1])
+
 
 class TestEG(ModelBaseTest):
 
@@ -100,6 +139,102 @@ class TestEG(ModelBaseTest):
         self.assertEqual(commit.committer.name, 'Kees Test')
         self.assertEqual(commit.committer.email, 'kees@example.org')
 
+    def test_delete_many(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(3)]
+        for person in people:
+            self.workspace.save(person, 'Saving a person.')
+        self.workspace.refresh_index()
+        commits = len(list(self.workspace.repo.iter_commits()))
+
+        statuses = self.workspace.delete_many(
+            TestPerson, [people[0], people[1].uuid, 'unknown'],
+            'Deleting people.', refresh_index=True)
+        self.assertEqual(statuses, {
+            people[0].uuid: {'git': 'deleted', 'index': 'deleted'},
+            people[1].uuid: {'git': 'deleted', 'index': 'deleted'},
+            'unknown': {'git': 'not_found', 'index': 'not_found'},
+        })
+        self.assertEqual(
+            len(list(self.workspace.repo.iter_commits())), commits + 1)
+        self.assertEqual(self.workspace.sm.uuids(TestPerson), [people[2].uuid])
+        self.assertEqual(
+            [result.uuid for result in self.workspace.S(TestPerson)],
+            [people[2].uuid])
+
+    def test_delete_where(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(5)]
+        for person in people:
+            self.workspace.save(person, 'Saving a person.')
+        self.workspace.refresh_index()
+        self.workspace.delete_page_size = 2
+
+        statuses = self.workspace.delete_where(
+            self.workspace.S(TestPerson).filter(age__gte=2),
+            'Deleting people.', refresh_index=True)
+        self.assertEqual(
+            sorted(statuses.keys()),
+            sorted(person.uuid for person in people[2:]))
+        self.assertEqual(
+            sorted(self.workspace.sm.uuids(TestPerson)),
+            sorted(person.uuid for person in people[:2]))
+        self.assertEqual(self.workspace.S(TestPerson).count(), 2)
+
+    def test_msearch(self):
+        self.workspace.save(
+            TestPerson({'age': 1, 'name': 'Name'}), 'Saving a person.')
+        self.workspace.save(TestPage({
+            'title': 'Title', 'slug': 'title', 'language': 'eng_GB'}),
+            'Saving a page.')
+        self.workspace.refresh_index()
+
+        people, pages, none = self.workspace.msearch([
+            self.workspace.S(TestPerson),
+            self.workspace.S(TestPage),
+            self.workspace.S(TestPerson).filter(age=2),
+        ])
+        self.assertEqual(
+            [type(result.to_object()) for result in people], [TestPerson])
+        self.assertEqual(
+            [result.to_object().title for result in pages], ['Title'])
+        self.assertEqual(list(none), [])
+
+    def test_get_objects(self):
+        people = [TestPerson({'age': i, 'name': 'Name'}) for i in range(3)]
+        for person in people:
+            self.workspace.save(person, 'Saving a person.')
+        self.workspace.refresh_index()
+
+        results = self.workspace.S(TestPerson).order_by('-age').execute()
+        with patch.object(self.workspace.sm, 'get') as get:
+            self.assertEqual(results.get_objects(), people[::-1])
+            self.assertEqual(
+                [result.object for result in results], people[::-1])
+        self.assertFalse(get.called)
+
+    def test_save_unchanged(self):
+        workspace = self.workspace
+        person = TestPerson({'age': 1, 'name': 'Name'})
+        self.assertTrue(workspace.save(person, 'Saving a person.'))
+        workspace.refresh_index()
+
+        with patch.object(workspace.im, 'index') as index:
+            self.assertEqual(
+                workspace.save(TestPerson(dict(person)), 'Saving it again.'),
+                None)
+        self.assertFalse(index.called)
+
+        fp = StringIO()
+        workspace.export(TestPerson, fp)
+        fp.seek(0)
+        with patch.object(workspace.im, 'bulk_index') as bulk_index:
+            self.assertEqual(workspace.import_(fp), 1)
+        self.assertFalse(bulk_index.called)
+
+        workspace.save(person.update({'age': 2}), 'Updating a person.')
+        workspace.refresh_index()
+        [result] = workspace.S(TestPerson)
+        self.assertEqual(result.age, 2)
+
     def is_file(self, workspace, model, suffix):
         return os.path.isfile(
             os.path.join(
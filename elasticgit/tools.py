@@ -5,6 +5,8 @@ from elasticgit.commands.gitmodel import MigrateGitModelRepo
 from elasticgit.commands.shell import EGShell
 from elasticgit.commands.version import VersionTool
 from elasticgit.commands.resync import ResyncTool
+from elasticgit.commands.transfer import ExportTool, ImportTool
+from elasticgit.commands.relayout import RelayoutTool
 
 
 def add_command(subparsers, dispatcher_class):  # pragma: no cover
@@ -27,6 +29,9 @@ def get_parser():  # pragma: no cover
     add_command(subparsers, EGShell)
     add_command(subparsers, VersionTool)
     add_command(subparsers, ResyncTool)
+    add_command(subparsers, ExportTool)
+    add_command(subparsers, ImportTool)
+    add_command(subparsers, RelayoutTool)
 
     return parser
 
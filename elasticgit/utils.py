@@ -1,3 +1,13 @@
+import os
+import logging
+
+log = logging.getLogger(__name__)
+
+#: Model classes resolved by :py:func:`load_model_class`, ``None`` for
+#: class paths that are not model classes.
+_model_classes = {}
+
+
 def introspect_properties(model_class):
     """
 
@@ -41,6 +51,53 @@ def load_class(class_path):
     return getattr(mod, class_name)
 
 
+def load_model_class(class_path):
+    """
+    Load a :py:class:`elasticgit.models.Model` subclass by it's class path.
+    Both the classes found and the class paths that turn out not to be
+    model classes are remembered, the reason for the latter is logged
+    the first time only.
+
+    :param str class_path:
+        The dotted.path.to.TheClass
+    :returns:
+        The model class or ``None``.
+
+    >>> from elasticgit.utils import load_model_class
+    >>> load_model_class('elasticgit.tests.base.TestPerson')
+    <class 'elasticgit.tests.base.TestPerson'>
+    >>> load_model_class('elasticgit.tests.base.ModelBaseTest')
+    >>>
+
+    """
+    try:
+        return _model_classes[class_path]
+    except KeyError:
+        pass
+
+    from elasticgit.models import Model
+
+    model_class = None
+    try:
+        model_class = load_class(class_path)
+        if not (isinstance(model_class, type) and
+                issubclass(model_class, Model)):
+            log.warn('%s is not a model class.' % (class_path,))
+            model_class = None
+    except (ImportError, AttributeError, ValueError), e:
+        log.warn('Unable to load %s: %s' % (class_path, e))
+    _model_classes[class_path] = model_class
+    return model_class
+
+
+def clear_model_class_cache():
+    """
+    Forget the model classes resolved by :py:func:`load_model_class`,
+    for when modules have been added or reloaded.
+    """
+    _model_classes.clear()
+
+
 def fqcn(klass):
     """
     Given a class give it's fully qualified class name in dotted notation.
@@ -56,3 +113,54 @@ def fqcn(klass):
 
     """
     return '%s.%s' % (klass.__module__, klass.__name__)
+
+
+def projected_fields(model_class, fields):
+    """
+    Normalize a list of field names to load for a partial
+    :py:class:`elasticgit.models.Model` instance. The ``uuid`` is
+    always included since a model cannot be identified without it,
+    as is the ``_version`` it is checked against and the fields the
+    fallbacks of the requested ones are built from.
+
+    :param elasticgit.models.Model model_class:
+    :param list fields:
+        The field names to project.
+    :returns: list
+
+    >>> from elasticgit.utils import projected_fields
+    >>> from elasticgit.tests.base import TestPerson
+    >>> projected_fields(TestPerson, ['name'])
+    ['_version', 'name', 'uuid']
+    >>>
+
+    """
+    unknown = set(fields) - set(model_class._fields.keys())
+    if unknown:
+        raise ValueError('%r has no fields named %s.' % (
+            model_class, ', '.join(sorted(unknown))))
+    projected = set(fields) | set(['_version', 'uuid'])
+    for name in fields:
+        for fallback in model_class._fields[name].fallbacks:
+            projected.update(fallback.required_fields)
+            projected.update(getattr(fallback, 'optional_fields', ()))
+    return sorted(projected)
+
+
+def package_version():
+    """
+    Return the version of elastic-git. This is read from the ``VERSION``
+    file of a source checkout, only falling back to the slower
+    ``pkg_resources`` for installed packages.
+
+    :returns: str
+    """
+    checkout = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    version_file = os.path.join(checkout, 'VERSION')
+    if (os.path.isfile(version_file) and
+            os.path.isfile(os.path.join(checkout, 'setup.py'))):
+        with open(version_file, 'r') as fp:
+            return fp.read().strip()
+
+    import pkg_resources
+    return pkg_resources.get_distribution('elastic-git').version
@@ -1,5 +1,6 @@
 import os
 import warnings
+import itertools
 from urlparse import urljoin
 
 from unidecode import unidecode
@@ -9,7 +10,10 @@ from git import Repo
 from elasticutils import get_es, Q, F
 
 from elasticgit.storage import StorageManager, RemoteStorageManager
-from elasticgit.search import ESManager, S
+from elasticgit.search import ESManager, S, msearch
+from elasticgit.localindex import LocalIndexManager, LocalS
+from elasticgit.instrumentation import NULL_INSTRUMENTATION
+from elasticgit.changes import NULL_CHANGE_FEED, diff_changes
 
 import logging
 
@@ -28,16 +32,66 @@ class Workspace(object):
         to get an Elasticsearch connection
     :param str index_prefix:
         The prefix to use when generating index names for Elasticsearch
+    :param elasticgit.cache.QueryCache query_cache:
+        An optional cache for the results of queries made with :py:func:`S`
+    :param elasticgit.instrumentation.Instrumentation instrumentation:
+        An optional instrumentation to time operations with.
+    :param elasticgit.changes.ChangeFeed change_feed:
+        An optional change feed to publish changed objects to.
+    :param bool index_per_model:
+        Whether to put every model class in an Elasticsearch index of
+        its own, see :py:class:`elasticgit.search.ESManager`.
+    :param dict index_settings:
+        The settings for the index of each model class.
+    :param bool git_metadata:
+        Whether to add Git metadata to the Elasticsearch documents,
+        see :py:class:`elasticgit.search.ESManager`.
     """
 
-    def __init__(self, repo, es, index_prefix):
+    instrumentation = NULL_INSTRUMENTATION
+    change_feed = NULL_CHANGE_FEED
+    #: How many search results :py:func:`delete_where` fetches at a time.
+    delete_page_size = 1000
+
+    def __init__(self, repo, es, index_prefix, query_cache=None,
+                 instrumentation=None, change_feed=None,
+                 index_per_model=False, index_settings=None,
+                 git_metadata=False):
         self.repo = repo
         self.sm = StorageManager(repo)
         self.es_settings = es
         self.im = ESManager(
-            self.sm, get_es(**self.es_settings), index_prefix)
+            self.sm, get_es(**self.es_settings), index_prefix,
+            index_per_model=index_per_model, index_settings=index_settings,
+            git_metadata=git_metadata)
         self.working_dir = self.repo.working_dir
         self.index_prefix = index_prefix
+        self.query_cache = query_cache
+        if instrumentation is not None:
+            self.instrument(instrumentation)
+        if change_feed is not None:
+            self.publish_changes(change_feed)
+
+    def instrument(self, instrumentation):
+        """
+        Time the storage, indexing and search operations of this
+        workspace with the given instrumentation.
+
+        :param elasticgit.instrumentation.Instrumentation instrumentation:
+        """
+        self.instrumentation = instrumentation
+        self.sm.instrumentation = instrumentation
+        self.im.instrumentation = instrumentation
+
+    def publish_changes(self, change_feed):
+        """
+        Publish the objects changed by this workspace's saves, deletes
+        and pulls to the given change feed, once they are committed.
+
+        :param elasticgit.changes.ChangeFeed change_feed:
+        """
+        self.change_feed = change_feed
+        self.sm.change_feed = change_feed
 
     def setup(self, name, email):
         """
@@ -97,11 +151,19 @@ class Workspace(object):
         :param tuple committer:
             The committer information (name, email address).
             Defaults to the author if unspecified.
+        :returns:
+            The commit or ``None`` if the model instance was already
+            stored with the same data. Nothing changed in Git then and
+            the model instance is not indexed again.
         """
         if isinstance(message, unicode):
             message = unidecode(message)
-        self.sm.store(model, message, author=author, committer=committer)
-        self.im.index(model)
+        with self.instrumentation.timer('save', model=model.__class__):
+            commit = self.sm.store(
+                model, message, author=author, committer=committer)
+            if commit is not None:
+                self.im.index(model)
+        return commit
 
     def delete(self, model, message, author=None, committer=None):
         """
@@ -121,8 +183,78 @@ class Workspace(object):
         """
         if isinstance(message, unicode):
             message = unidecode(message)
-        self.sm.delete(model, message, author=author, committer=committer)
-        self.im.unindex(model)
+        with self.instrumentation.timer('delete', model=model.__class__):
+            self.sm.delete(
+                model, message, author=author, committer=committer)
+            self.im.unindex(model)
+
+    def delete_many(self, model_class, models_or_uuids, message,
+                    author=None, committer=None, refresh_index=False):
+        """
+        Delete several instances of a model class from Git in a single
+        commit and from the Elasticsearch index with a single bulk
+        request.
+
+        :param elasticgit.models.Model model_class:
+            The model class
+        :param list models_or_uuids:
+            The :py:class:`elasticgit.models.Model` instances or their
+            UUIDs.
+        :param str message:
+            The commit message to remove the models from Git with.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :param bool refresh_index:
+            Whether or not to refresh the index afterwards.
+        :returns:
+            A dictionary of UUIDs to their status, a dictionary with
+            a ``git`` key that is ``deleted`` or ``not_found`` and an
+            ``index`` key as returned by
+            :py:func:`elasticgit.search.ESManager.bulk_unindex`.
+        """
+        if isinstance(message, unicode):
+            message = unidecode(message)
+        uuids = [uuid if isinstance(uuid, basestring) else uuid.uuid
+                 for uuid in models_or_uuids]
+        with self.instrumentation.timer('delete_many', model=model_class):
+            existing = set(self.sm.uuids(model_class))
+            self.sm.delete_many(
+                model_class, [uuid for uuid in uuids if uuid in existing],
+                message, author=author, committer=committer)
+            index_statuses = self.im.bulk_unindex(
+                model_class, uuids, refresh_index=refresh_index)
+        return dict((uuid, {
+            'git': 'deleted' if uuid in existing else 'not_found',
+            'index': index_statuses.get(uuid),
+        }) for uuid in uuids)
+
+    def delete_where(self, s, message, author=None, committer=None,
+                     refresh_index=False):
+        """
+        Delete the instances of a model class matching a search, see
+        :py:func:`delete_many`.
+
+        ::
+
+            workspace.delete_where(
+                workspace.S(Page).filter(expired=True),
+                'Removing expired pages.')
+
+        :param elasticgit.search.S s:
+            The search, as returned by :py:func:`S`.
+        :param str message:
+            The commit message to remove the models from Git with.
+        :returns: dict
+        """
+        uuids = [result.uuid for result in s.only('uuid').iter_all(
+            batch_size=self.delete_page_size)]
+        return self.delete_many(
+            s.type.model_class, uuids, message, author=author,
+            committer=committer, refresh_index=refresh_index)
 
     def fast_forward(self, branch_name='master', remote_name='origin'):
         warnings.warn('This method is deprecated, use pull() instead',
@@ -130,6 +262,11 @@ class Workspace(object):
         return self.pull(branch_name=branch_name, remote_name=remote_name)
 
     def index_diff(self, diff_index):
+        self._index_diff(diff_index)
+        self.change_feed.publish(
+            diff_changes(diff_index, self.sm.head_sha()))
+
+    def _index_diff(self, diff_index):
         # NOTE: This is probably more complicated than it needs to be
         #       If we have multiple remotes GitPython gets confused about
         #       deletes. It marks things as deletes because it may not
@@ -212,8 +349,8 @@ class Workspace(object):
             been indexed. Defaults to ``True``
 
         """
-        if not self.im.index_exists(self.sm.active_branch()):
-            self.im.create_index(self.sm.active_branch())
+        if not self.im.index_exists(self.sm.active_branch(), model_class):
+            self.im.create_index(self.sm.active_branch(), model_class)
         iterator = self.sm.iterate(model_class)
         for model in iterator:
             yield self.im.index(model)
@@ -229,6 +366,121 @@ class Workspace(object):
         return list(
             self.reindex_iter(model_class, refresh_index=refresh_index))
 
+    def snapshot(self, at=None):
+        """
+        Pin all reads from Git in the current thread to a single commit,
+        so objects loaded while for example rendering a page all come
+        from the same commit even if the workspace is pulled meanwhile.
+
+        ::
+
+            with workspace.snapshot() as commit:
+                page = workspace.S(Page).filter(slug='foo')[0].get_object()
+
+        :param str at:
+            The commit to pin, defaults to the current one.
+        :returns:
+            A context manager giving the commit SHA.
+        """
+        return self.sm.snapshot(at=at)
+
+    def history(self, model_or_uuid, limit=None):
+        """
+        Return the commits that changed a model instance, newest first,
+        from a Git derived index that is updated incrementally instead of
+        a ``git log`` walking the whole history.
+
+        ::
+
+            for change in workspace.history(page, limit=10):
+                print change['commit'], change['timestamp']
+
+        :param model_or_uuid:
+            The :py:class:`elasticgit.models.Model` instance or its UUID.
+        :param int limit:
+            The maximum number of commits to return.
+        :returns:
+            A list of dictionaries with the ``commit`` SHA, the commit
+            ``timestamp`` and the ``status`` of the change, see
+            :py:func:`elasticgit.storage.history.HistoryIndex.history`.
+        """
+        uuid = (model_or_uuid if isinstance(model_or_uuid, basestring)
+                else model_or_uuid.uuid)
+        return self.sm.history(uuid, limit=limit)
+
+    def export(self, model_class, fp, codec='deflate'):
+        """
+        Write all instances of a model class that Git knows about to an
+        Avro object container file, see :py:func:`import_`.
+
+        :param elasticgit.models.Model model_class:
+        :param file fp:
+            The file to write to.
+        :param str codec:
+            The block compression codec, ``null`` or ``deflate``.
+        :returns: int, the number of instances exported.
+        """
+        from elasticgit.commands.avro import write_models
+
+        with self.instrumentation.timer('export', model=model_class):
+            return write_models(
+                model_class, self.sm.iterate(model_class), fp, codec=codec)
+
+    def import_(self, fp, message=None, batch_size=500, author=None,
+                committer=None, refresh_index=False):
+        """
+        Save and index the instances in an Avro object container file
+        written by :py:func:`export`. Every batch of instances is stored
+        in a single commit and indexed with a single bulk request.
+
+        :param file fp:
+            The file to read from.
+        :param str message:
+            The commit message, defaults to one saying how many
+            instances of which model class were imported.
+        :param int batch_size:
+            The number of instances to commit and index at a time.
+        :param tuple author:
+            The author information (name, email address)
+            Defaults repo default if unspecified.
+        :param tuple committer:
+            The committer information (name, email address).
+            Defaults to the author if unspecified.
+        :param bool refresh_index:
+            Whether or not to refresh the index after everything has
+            been indexed.
+        :returns: int, the number of instances imported.
+        """
+        from elasticgit.commands.avro import read_models
+
+        if isinstance(message, unicode):
+            message = unidecode(message)
+
+        model_class, models = read_models(fp)
+        if not self.im.index_exists(self.sm.active_branch(), model_class):
+            self.im.create_index(self.sm.active_branch(), model_class)
+
+        count = 0
+        with self.instrumentation.timer('import', model=model_class):
+            while True:
+                batch = list(itertools.islice(models, batch_size))
+                if not batch:
+                    break
+                count += len(batch)
+                # NOTE: instances stored unchanged are not indexed again.
+                batch = self.sm.changed_models(batch)
+                if not batch:
+                    continue
+                self.sm.store_many(
+                    batch, message or 'Imported %d %s objects.' % (
+                        len(batch), model_class.__name__),
+                    author=author, committer=committer)
+                self.im.bulk_index(model_class, batch)
+
+        if refresh_index:
+            self.refresh_index()
+        return count
+
     def refresh_index(self):
         """
         Manually refresh the Elasticsearch index. In production this is
@@ -266,7 +518,7 @@ class Workspace(object):
                                            refresh_index=refresh_index):
             reindexed_uuids.add(model_obj.uuid)
 
-        for result in self.S(model_class).everything():
+        for result in self.S(model_class).only('uuid').iter_all():
             if result.uuid not in reindexed_uuids:
                 self.im.raw_unindex(model_class, result.uuid)
                 removed_uuids.add(result.uuid)
@@ -303,6 +555,30 @@ class Workspace(object):
         """
         return self.im.get_mapping(self.sm.active_branch(), model_class)
 
+    def register_lookup(self, model_class, *fields):
+        """
+        Maintain a Git derived index for exact match lookups on the given
+        fields of a model class, see :py:func:`lookup`.
+
+        :param elasticgit.models.Model model_class:
+        :param str fields:
+            The names of the fields to index.
+        """
+        return self.sm.register_lookup(model_class, *fields)
+
+    def lookup(self, model_class, field, value):
+        """
+        Find the UUIDs of a model class' instances with a field matching
+        the given value from the Git derived index, without an
+        Elasticsearch round-trip.
+
+        :param elasticgit.models.Model model_class:
+        :param str field:
+        :param object value:
+        :returns: list
+        """
+        return self.sm.lookup(model_class, field, value)
+
     def S(self, model_class):
         """
         Get a :py:class:`elasticutils.S` object for the given
@@ -315,8 +591,27 @@ class Workspace(object):
         :param elasticgit.models.Model model_class:
             The class to provide a search interface for.
         """
-        return S(
-            self.im.get_mapping_type(model_class)).es(**self.es_settings)
+        s = S(self.im.get_mapping_type(model_class)).es(**self.es_settings)
+        if self.query_cache is not None:
+            s = s.cache(self.query_cache)
+        if self.instrumentation is not NULL_INSTRUMENTATION:
+            s = s.instrument(self.instrumentation)
+        return s
+
+    def msearch(self, searches):
+        """
+        Run several independent searches, for example the ones for all
+        the widgets on a page, in a single Elasticsearch request.
+
+        :param list searches:
+            The :py:class:`elasticgit.search.S` instances to run, as
+            returned by :py:func:`S` or
+            :py:func:`elasticgit.search.SM.multi`.
+        :returns:
+            A list with the results of each search, in order.
+        """
+        return msearch(searches, es=self.im.es,
+                       instrumentation=self.instrumentation)
 
 
 class RemoteWorkspace(Workspace):
@@ -326,7 +621,8 @@ class RemoteWorkspace(Workspace):
 
     This is a read only version of the :py:class:`Workspace`
     """
-    def __init__(self, url, es=None, index_prefix=None):
+    def __init__(self, url, es=None, index_prefix=None, query_cache=None,
+                 instrumentation=None):
         """
         :param str url:
             The URL of the unicore.distribute server.
@@ -337,6 +633,11 @@ class RemoteWorkspace(Workspace):
             provided.
         :param str index_prefix:
             The prefix to use when generating index names for Elasticsearch
+        :param elasticgit.cache.QueryCache query_cache:
+            An optional cache for the results of queries made with
+            :py:func:`S`
+        :param elasticgit.instrumentation.Instrumentation instrumentation:
+            An optional instrumentation to time operations with.
         """
         self.sm = RemoteStorageManager(url)
         self.index_prefix = index_prefix or self.sm.repo_name
@@ -345,6 +646,9 @@ class RemoteWorkspace(Workspace):
             self.sm,
             es=get_es(**self.es_settings),
             index_prefix=self.index_prefix)
+        self.query_cache = query_cache
+        if instrumentation is not None:
+            self.instrument(instrumentation)
 
     def reindex_changes(self, changes):
         changed_model_set = set([])
@@ -404,6 +708,62 @@ class RemoteWorkspace(Workspace):
             self.im.index(obj)
 
 
+class LocalWorkspace(Workspace):
+    """
+    A workspace that searches an index kept in the repository's ``.git``
+    directory instead of Elasticsearch, for deployments where running
+    Elasticsearch is not an option.
+
+    Searching is done with :py:class:`elasticgit.localindex.LocalS`
+    which supports a subset of the :py:class:`elasticgit.search.S` API.
+
+    :param git.Repo repo:
+        A :py:class:`git.Repo` instance.
+    :param str index_prefix:
+        The prefix to use when generating index names
+    :param elasticgit.instrumentation.Instrumentation instrumentation:
+        An optional instrumentation to time operations with.
+    :param elasticgit.changes.ChangeFeed change_feed:
+        An optional change feed to publish changed objects to.
+    """
+
+    def __init__(self, repo, index_prefix, instrumentation=None,
+                 change_feed=None):
+        self.repo = repo
+        self.sm = StorageManager(repo)
+        self.es_settings = {}
+        self.im = LocalIndexManager(self.sm, index_prefix)
+        self.working_dir = self.repo.working_dir
+        self.index_prefix = index_prefix
+        self.query_cache = None
+        if instrumentation is not None:
+            self.instrument(instrumentation)
+        if change_feed is not None:
+            self.publish_changes(change_feed)
+
+    def S(self, model_class):
+        """
+        Get a :py:class:`elasticgit.localindex.LocalS` object for the
+        given model class.
+
+        :param elasticgit.models.Model model_class:
+            The class to provide a search interface for.
+        """
+        return LocalS(self.im.get_mapping_type(model_class)).instrument(
+            self.instrumentation)
+
+    def msearch(self, searches):
+        """
+        Run several independent searches of the local index.
+
+        :param list searches:
+            The :py:class:`elasticgit.localindex.LocalS` instances to run.
+        :returns:
+            A list with the results of each search, in order.
+        """
+        return [s.execute() for s in searches]
+
+
 class EG(object):
 
     """
@@ -411,7 +771,10 @@ class EG(object):
 
     """
     @classmethod
-    def workspace(cls, workdir, es={}, index_prefix=None):
+    def workspace(cls, workdir, es={}, index_prefix=None, query_cache=None,
+                  instrumentation=None, change_feed=None,
+                  index_per_model=False, index_settings=None,
+                  git_metadata=False):
         """
         Create a workspace
 
@@ -424,6 +787,19 @@ class EG(object):
         :param str index_prefix:
             The index_prefix use when generating index names for
             Elasticsearch
+        :param elasticgit.cache.QueryCache query_cache:
+            An optional cache for query results.
+        :param elasticgit.instrumentation.Instrumentation instrumentation:
+            An optional instrumentation to time operations with.
+        :param elasticgit.changes.ChangeFeed change_feed:
+            An optional change feed to publish changed objects to.
+        :param bool index_per_model:
+            Whether to put every model class in an Elasticsearch index
+            of its own.
+        :param dict index_settings:
+            The settings for the index of each model class.
+        :param bool git_metadata:
+            Whether to add Git metadata to the Elasticsearch documents.
         :returns:
             :py:class:`.Workspace`
         """
@@ -431,7 +807,40 @@ class EG(object):
         repo = (cls.read_repo(workdir)
                 if cls.is_repo(workdir)
                 else cls.init_repo(workdir))
-        return Workspace(repo, es, index_prefix)
+        return Workspace(repo, es, index_prefix, query_cache=query_cache,
+                         instrumentation=instrumentation,
+                         change_feed=change_feed,
+                         index_per_model=index_per_model,
+                         index_settings=index_settings,
+                         git_metadata=git_metadata)
+
+    @classmethod
+    def local_workspace(cls, workdir, index_prefix=None,
+                        instrumentation=None, change_feed=None):
+        """
+        Create a workspace that does not need Elasticsearch, see
+        :py:class:`.LocalWorkspace`
+
+        :param str workdir:
+            The path to the directory where a git repository can
+            be found or needs to be created when
+            :py:meth:`.Workspace.setup` is called.
+        :param str index_prefix:
+            The index_prefix use when generating index names
+        :param elasticgit.instrumentation.Instrumentation instrumentation:
+            An optional instrumentation to time operations with.
+        :param elasticgit.changes.ChangeFeed change_feed:
+            An optional change feed to publish changed objects to.
+        :returns:
+            :py:class:`.LocalWorkspace`
+        """
+        index_prefix = index_prefix or os.path.basename(workdir)
+        repo = (cls.read_repo(workdir)
+                if cls.is_repo(workdir)
+                else cls.init_repo(workdir))
+        return LocalWorkspace(
+            repo, index_prefix, instrumentation=instrumentation,
+            change_feed=change_feed)
 
     @classmethod
     def dot_git_path(cls, workdir):